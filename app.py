@@ -7,6 +7,7 @@ import streamlit as st
 import os
 from datetime import datetime
 import json
+import uuid
 
 # Configuração da página
 st.set_page_config(
@@ -17,16 +18,26 @@ st.set_page_config(
 )
 
 # Importações locais
-from src.chatbot import ChatbotAI
+from src.analytics import conversation_stats
+from src.chatbot import ChatbotAI, ResponseStreamError
 from src.config import load_config
-from src.database import ConversationDB
+from src.export import encode_ndjson, iter_export_records
+from src.sharding import open_database
 from src.personalities import PERSONALIDADES
 from src.utils import format_message, export_conversation
 
+@st.cache_resource
+def get_database():
+    """Banco de conversas compartilhado por todas as sessões do processo."""
+    return open_database(load_config())
+
 def initialize_session_state():
     """Inicializa o estado da sessão do Streamlit."""
     if 'chatbot' not in st.session_state:
         config = load_config()
+        # Limites de requisições e tokens por sessão; sem uma chave própria,
+        # todas as sessões dividiriam os limites da chave de API
+        config['rate_limit_key'] = f"session:{uuid.uuid4().hex}"
         st.session_state.chatbot = ChatbotAI(config)
     
     if 'conversation_history' not in st.session_state:
@@ -35,8 +46,12 @@ def initialize_session_state():
     if 'current_personality' not in st.session_state:
         st.session_state.current_personality = 'assistente_geral'
     
+    # ID da conversa gravada turno a turno no banco (criado na primeira resposta)
+    if 'conversation_id' not in st.session_state:
+        st.session_state.conversation_id = None
+    
     if 'db' not in st.session_state:
-        st.session_state.db = ConversationDB()
+        st.session_state.db = get_database()
 
 def render_sidebar():
     """Renderiza a barra lateral com configurações."""
@@ -57,6 +72,7 @@ def render_sidebar():
     if selected_personality != st.session_state.current_personality:
         st.session_state.current_personality = selected_personality
         st.session_state.chatbot.set_personality(selected_personality)
+        st.session_state.conversation_id = None
         st.rerun()
     
     # Configurações do modelo
@@ -92,15 +108,19 @@ def render_sidebar():
     if st.sidebar.button("🗑️ Limpar Conversa Atual"):
         st.session_state.conversation_history = []
         st.session_state.chatbot.clear_memory()
+        st.session_state.conversation_id = None
         st.rerun()
     
     if st.sidebar.button("💾 Salvar Conversa"):
-        if st.session_state.conversation_history:
-            conversation_id = st.session_state.db.save_conversation(
-                st.session_state.conversation_history,
-                st.session_state.current_personality
+        if st.session_state.conversation_id:
+            # As mensagens já são gravadas a cada turno; aqui só o resumo do histórico
+            st.session_state.chatbot.wait_for_summary(timeout=10)
+            st.session_state.db.append_messages(
+                st.session_state.conversation_id,
+                [],
+                history_summary=st.session_state.chatbot.history_summary
             )
-            st.sidebar.success(f"Conversa salva! ID: {conversation_id}")
+            st.sidebar.success(f"Conversa salva! ID: {st.session_state.conversation_id}")
     
     # Exportar conversa
     if st.sidebar.button("📥 Exportar Conversa"):
@@ -112,6 +132,22 @@ def render_sidebar():
                 file_name=f"conversa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
+        
+        if st.session_state.conversation_id:
+            # Lida do banco e comprimida em blocos; o download_button guarda os
+            # bytes em memória, o que cabe para uma conversa. Exportações
+            # grandes ficam com a linha de comando (python -m src.cli export)
+            st.session_state.db.flush()
+            records = iter_export_records(
+                st.session_state.db,
+                conversation_ids=[st.session_state.conversation_id]
+            )
+            st.sidebar.download_button(
+                label="🗜️ Baixar NDJSON (gzip)",
+                data=b"".join(encode_ndjson(records, compress=True)),
+                file_name=f"conversa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson.gz",
+                mime="application/gzip"
+            )
 
 def render_main_chat():
     """Renderiza a interface principal do chat."""
@@ -150,37 +186,56 @@ def render_main_chat():
         with st.chat_message("user"):
             st.write(user_input)
         
-        # Gerar resposta do chatbot
+        # Gerar resposta do chatbot, exibindo os trechos à medida que chegam
         with st.chat_message("assistant"):
-            with st.spinner("Pensando..."):
-                try:
-                    response = st.session_state.chatbot.generate_response(user_input)
-                    st.write(response)
-                    
-                    # Adicionar resposta ao histórico
-                    assistant_message = {
-                        'role': 'assistant',
-                        'content': response,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    st.session_state.conversation_history.append(assistant_message)
-                    
-                except Exception as e:
-                    st.error(f"Erro ao gerar resposta: {str(e)}")
-                    st.info("Verifique se sua API Key do OpenAI está configurada corretamente.")
+            placeholder = st.empty()
+            placeholder.markdown("Pensando...")
+            try:
+                response = ""
+                for delta in st.session_state.chatbot.stream_response(user_input):
+                    response += delta
+                    placeholder.markdown(response + "▌")
+                
+                response = response.strip()
+                placeholder.markdown(response)
+                
+                # Adicionar resposta ao histórico
+                assistant_message = {
+                    'role': 'assistant',
+                    'content': response,
+                    'timestamp': datetime.now().isoformat()
+                }
+                st.session_state.conversation_history.append(assistant_message)
+                
+                # Gravar o turno no banco (custo proporcional apenas ao turno)
+                if st.session_state.conversation_id is None:
+                    st.session_state.conversation_id = str(uuid.uuid4())
+                st.session_state.db.append_messages(
+                    st.session_state.conversation_id,
+                    [user_message, assistant_message],
+                    st.session_state.current_personality
+                )
+                
+            except ResponseStreamError as e:
+                # Trechos parciais e a mensagem de erro não vão para o histórico nem para o banco
+                placeholder.empty()
+                st.error(str(e))
+            
+            except Exception as e:
+                placeholder.empty()
+                st.error(f"Erro ao gerar resposta: {str(e)}")
+                st.info("Verifique se sua API Key do OpenAI está configurada corretamente.")
 
 def render_stats():
     """Renderiza estatísticas da conversa."""
     if st.session_state.conversation_history:
         st.sidebar.subheader("📊 Estatísticas")
         
-        total_messages = len(st.session_state.conversation_history)
-        user_messages = len([m for m in st.session_state.conversation_history if m['role'] == 'user'])
-        assistant_messages = len([m for m in st.session_state.conversation_history if m['role'] == 'assistant'])
+        stats = conversation_stats(st.session_state.conversation_history)
         
-        st.sidebar.metric("Total de Mensagens", total_messages)
-        st.sidebar.metric("Suas Mensagens", user_messages)
-        st.sidebar.metric("Respostas do Bot", assistant_messages)
+        st.sidebar.metric("Total de Mensagens", stats["total_messages"])
+        st.sidebar.metric("Suas Mensagens", stats["user_messages"])
+        st.sidebar.metric("Respostas do Bot", stats["assistant_messages"])
 
 def main():
     """Função principal da aplicação."""
@@ -0,0 +1,107 @@
+"""
+Benchmark de vazão: caminho síncrono vs. AsyncChatbotAI contra um servidor
+falso da API do OpenAI (não consome créditos nem precisa de rede).
+
+Uso:
+    python benchmarks/async_throughput.py --requests 200 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.async_chatbot import AsyncChatbotAI
+from src.client import AsyncClientPool
+from src.chatbot import ChatbotAI
+
+def build_mock_handler(latency: float) -> type:
+    """Cria um handler que imita /v1/chat/completions com latência fixa."""
+    class ChatCompletions(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Cabeçalhos e corpo saem em escritas separadas; sem isso o Nagle atrasa a resposta
+        disable_nagle_algorithm = True
+        
+        def log_message(self, format: str, *args) -> None:
+            pass
+        
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            body = json.dumps({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "gpt-3.5-turbo",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "Resposta simulada."},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 3, "total_tokens": 13}
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+    
+    return ChatCompletions
+
+def start_mock_server(latency: float, port: int) -> None:
+    """Sobe o servidor falso (uma thread por conexão) em uma thread própria."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), build_mock_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+def run_sync(config: dict, total: int) -> float:
+    """Executa as requisições pelo caminho síncrono atual."""
+    chatbot = ChatbotAI(config)
+    start = time.perf_counter()
+    for i in range(total):
+        chatbot.clear_memory()
+        chatbot.generate_response(f"Pergunta {i}")
+    return time.perf_counter() - start
+
+async def run_async(config: dict, total: int, pool: AsyncClientPool) -> float:
+    """Executa as requisições como conversas assíncronas simultâneas."""
+    chatbots = [AsyncChatbotAI(config, pool=pool) for _ in range(total)]
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        chatbot.agenerate_response(f"Pergunta {i}")
+        for i, chatbot in enumerate(chatbots)
+    ))
+    elapsed = time.perf_counter() - start
+    await pool.close()
+    return elapsed
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência simulada (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    
+    config = {
+        "openai_api_key": "sk-benchmark-mock-key-000000",
+        "openai_api_base": f"http://127.0.0.1:{args.port}/v1"
+    }
+    
+    start_mock_server(args.latency, args.port)
+    
+    sync_time = run_sync(config, args.requests)
+    async_time = asyncio.run(run_async(config, args.requests, AsyncClientPool(limit=args.requests)))
+    
+    print(f"📊 {args.requests} requisições, latência simulada de {args.latency}s")
+    print(f"   Síncrono:   {sync_time:.2f}s ({args.requests / sync_time:.1f} req/s)")
+    print(f"   Assíncrono: {async_time:.2f}s ({args.requests / async_time:.1f} req/s)")
+    print(f"   Ganho:      {sync_time / async_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark da importação: um arquivo por vez com save_conversation
+(uma transação por conversa, sem deduplicação) vs. bulk_import.
+
+Uso:
+    python benchmarks/bulk_import.py --files 2000 --messages 20 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+from src.importer import bulk_import
+
+def naive_import(db, paths):
+    """Lê cada arquivo exportado pelo app e salva a conversa individualmente."""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        db.save_conversation(data['conversation'], "assistente_geral")
+
+def write_archive(directory, files, messages):
+    """Gera arquivos no formato de exportação do app, 5% deles repetidos."""
+    paths = []
+    for n in range(files):
+        index = n if n % 20 else max(n - 1, 0)
+        conversation = [
+            {
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"Conversa {index}, mensagem {i}: como funciona o Pix entre bancos? " * 3,
+                "timestamp": datetime(2024, 1, 15, 10, 0, i % 60).isoformat()
+            }
+            for i in range(messages)
+        ]
+        path = os.path.join(directory, f"conversa_{n:06d}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"export_info": {"total_messages": messages}, "conversation": conversation},
+                      f, indent=2, ensure_ascii=False)
+        paths.append(path)
+    return paths
+
+def timed(fn):
+    """Tempo (s) de uma chamada e o seu resultado."""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = os.path.join(tmpdir, "archive")
+        os.makedirs(archive)
+        paths = write_archive(archive, args.files, args.messages)
+        
+        runs = [("save_conversation por arquivo", lambda db: naive_import(db, paths))]
+        for workers in sorted({1, args.workers}):
+            runs.append((f"bulk_import workers={workers}",
+                         lambda db, workers=workers: bulk_import(db, [archive], workers=workers)))
+        
+        print(f"📥 Importação de {args.files} arquivos ({args.files * args.messages} mensagens)")
+        for index, (label, run) in enumerate(runs):
+            db = ConversationDB(os.path.join(tmpdir, f"bench_{index}.db"))
+            elapsed, report = timed(lambda: run(db))
+            total = db.get_statistics()['total_conversations']
+            db.close()
+            extra = f"  {report['duplicates']} duplicadas ignoradas" if report else ""
+            print(f"   {label:32s} {elapsed:6.2f}s  {args.files / elapsed:8.0f} arquivos/s  "
+                  f"{total} conversas{extra}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark das estatísticas de conversas: várias passagens pelo histórico
+(comportamento anterior) vs. conversation_stats, e archive_stats em lotes.
+
+Uso:
+    python benchmarks/conversation_analytics.py --messages 2000 --conversations 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from list_pagination import timed
+from src.analytics import archive_stats, conversation_stats
+from src.database import ConversationDB
+from src.tokens import count_tokens_batch
+
+PERSONALITIES = ["assistente_geral", "professor", "programador", "humorista"]
+
+def legacy_stats(history):
+    """get_conversation_stats anterior: filtros por papel, soma e contagem separados."""
+    user_messages = [msg for msg in history if msg.get('role') == 'user']
+    assistant_messages = [msg for msg in history if msg.get('role') == 'assistant']
+    total_characters = sum(len(msg.get('content', '')) for msg in history)
+    estimated_tokens = sum(count_tokens_batch(msg.get('content', '') for msg in history))
+    start_time = datetime.fromisoformat(history[0]['timestamp'])
+    end_time = datetime.fromisoformat(history[-1]['timestamp'])
+    return (len(history), len(user_messages), len(assistant_messages),
+            total_characters, estimated_tokens, str(end_time - start_time))
+
+def make_history(total: int):
+    """Histórico sintético alternando usuário e assistente."""
+    start = datetime(2024, 1, 15, 10)
+    return [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Mensagem {i}: como declarar o imposto de renda em {2000 + i % 25}?",
+            "timestamp": (start + timedelta(seconds=i * 30)).isoformat()
+        }
+        for i in range(total)
+    ]
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--conversations", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    
+    history = make_history(args.messages)
+    legacy = timed(lambda: legacy_stats(history), repeat=10)
+    current = timed(lambda: conversation_stats(history), repeat=10)
+    
+    print(f"📊 Estatísticas de uma conversa com {args.messages} mensagens")
+    print(f"   várias passagens: {legacy:8.2f} ms")
+    print(f"   uma passagem:     {current:8.2f} ms")
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = ConversationDB(os.path.join(tmpdir, "bench.db"))
+        conversation = make_history(6)
+        start = time.perf_counter()
+        for i in range(args.conversations):
+            db.append_messages(f"conv-{i:08d}", conversation, PERSONALITIES[i % len(PERSONALITIES)])
+        print(f"📦 {args.conversations} conversas inseridas em {time.perf_counter() - start:.1f}s")
+        
+        tracemalloc.start()
+        start = time.perf_counter()
+        stats = archive_stats(db, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        db.close()
+    
+    print(f"🗄️ archive_stats (lotes de {args.chunk_size}): {elapsed * 1000:.0f} ms, "
+          f"pico de {peak / 1024 / 1024:.1f} MiB")
+    print(stats.to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark da exportação: documento JSON montado em memória e codificado em
+base64 (comportamento anterior) vs. export_ndjson em streaming.
+
+Uso:
+    python benchmarks/conversation_export.py --conversations 2000 --messages 50
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+from src.export import export_ndjson
+
+def legacy_export(db, path):
+    """Todas as conversas em um documento JSON com indent=2, depois em base64."""
+    conversations = [
+        db.load_conversation(header['id'])
+        for header in db.iter_conversations()
+    ]
+    document = json.dumps({
+        "export_info": {"timestamp": datetime.now().isoformat()},
+        "conversations": conversations
+    }, indent=2, ensure_ascii=False)
+    encoded = base64.b64encode(document.encode()).decode()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(encoded)
+
+def measure(fn):
+    """Tempo (s) e pico de memória alocada (MiB) de uma chamada."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=50)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = ConversationDB(os.path.join(tmpdir, "bench.db"))
+        messages = [
+            {
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"Mensagem {i}: explique como declarar o imposto de renda, passo a passo. " * 3,
+                "timestamp": datetime(2024, 1, 15, 10, 0, i % 60).isoformat()
+            }
+            for i in range(args.messages)
+        ]
+        for i in range(args.conversations):
+            db.append_messages(f"conv-{i:08d}", messages, "assistente_geral")
+        
+        results = [
+            ("JSON + base64 (anterior)", measure(lambda: legacy_export(db, os.path.join(tmpdir, "legacy.txt")))),
+            ("NDJSON", measure(lambda: export_ndjson(db, os.path.join(tmpdir, "export.ndjson")))),
+            ("NDJSON + gzip", measure(lambda: export_ndjson(db, os.path.join(tmpdir, "export.ndjson.gz"))))
+        ]
+        sizes = [os.path.getsize(os.path.join(tmpdir, name))
+                 for name in ("legacy.txt", "export.ndjson", "export.ndjson.gz")]
+        db.close()
+    
+    total = args.conversations * args.messages
+    print(f"📤 Exportação de {args.conversations} conversas ({total} mensagens)")
+    for (label, (elapsed, peak)), size in zip(results, sizes):
+        print(f"   {label:26s} {elapsed:6.2f}s  pico {peak:8.1f} MiB  arquivo {size / 1024 / 1024:7.1f} MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark da compressão do conteúdo das mensagens: tamanho do banco e custo
+de escrita e leitura, sem compressão vs. zlib com dicionário treinado.
+
+Uso:
+    python benchmarks/db_compression.py --conversations 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+
+QUESTIONS = [
+    "Como funciona o imposto de renda para quem é autônomo?",
+    "Quais documentos preciso para abrir uma empresa no Brasil?",
+    "Pode me explicar a diferença entre lista e tupla em Python?",
+    "Qual a melhor forma de estudar para o ENEM em seis meses?",
+    "Como calcular o preço de venda de um produto com margem de lucro?",
+]
+ANSWERS = [
+    "Claro! Vou explicar passo a passo. Primeiro, é importante entender que {topic} "
+    "depende de alguns fatores. Em geral, recomendo organizar as informações, "
+    "verificar as regras atualizadas e, se necessário, consultar um especialista. "
+    "Posso detalhar algum desses pontos para você?",
+    "Ótima pergunta! Sobre {topic}, o mais importante é começar pelo básico: "
+    "defina seus objetivos, separe os documentos necessários e acompanhe os prazos. "
+    "Se quiser, posso montar um exemplo prático com números.",
+]
+
+def conversations(count: int, turns: int = 8):
+    """Gera conversas sintéticas em português, repetitivas como um chat real."""
+    rng = random.Random(42)
+    for _ in range(count):
+        messages = []
+        for t in range(turns):
+            question = rng.choice(QUESTIONS)
+            messages.append({"role": "user", "content": question, "timestamp": f"2024-01-15T10:00:{2 * t:02d}"})
+            messages.append({
+                "role": "assistant",
+                "content": rng.choice(ANSWERS).format(topic=question.rstrip("?").lower()),
+                "timestamp": f"2024-01-15T10:00:{2 * t + 1:02d}"
+            })
+        yield messages
+
+def database_size(path: str) -> int:
+    """Tamanho do banco após checkpoint do WAL."""
+    return os.path.getsize(path)
+
+def run(path: str, data: list, compression: bool, train_from: list) -> dict:
+    """Grava e lê as conversas, medindo tempos e tamanho."""
+    db = ConversationDB(path, compression=compression)
+    if compression:
+        # Dicionário treinado com uma amostra separada, como em produção
+        for messages in train_from:
+            db.save_conversation(messages, "assistente_geral")
+        db.train_compression_dictionary()
+        with db._connect() as conn:
+            conn.execute("DELETE FROM conversations")
+    
+    start = time.perf_counter()
+    ids = [db.save_conversation(messages, "assistente_geral") for messages in data]
+    write = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for conversation_id in ids:
+        db.load_conversation(conversation_id)
+    read = time.perf_counter() - start
+    
+    with db._connect() as conn:
+        content_bytes = conn.execute("SELECT SUM(length(CAST(content AS BLOB))) FROM messages").fetchone()[0]
+    db.vacuum()
+    db.close()
+    
+    return {"write": write, "read": read, "content": content_bytes, "file": database_size(path)}
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=2000)
+    args = parser.parse_args()
+    
+    data = list(conversations(args.conversations))
+    sample = list(conversations(200))
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain = run(os.path.join(tmpdir, "plain.db"), data, False, sample)
+        compressed = run(os.path.join(tmpdir, "compressed.db"), data, True, sample)
+    
+    print(f"📊 {args.conversations} conversas ({args.conversations * 16} mensagens)")
+    print(f"   {'':<26} {'sem compressão':>15} {'zlib + dicionário':>18}")
+    print(f"   {'conteúdo (KiB)':<26} {plain['content'] / 1024:>15.0f} {compressed['content'] / 1024:>18.0f}"
+          f"  ({compressed['content'] / plain['content']:.0%})")
+    print(f"   {'arquivo após VACUUM (KiB)':<26} {plain['file'] / 1024:>15.0f} {compressed['file'] / 1024:>18.0f}"
+          f"  ({compressed['file'] / plain['file']:.0%})")
+    print(f"   {'escrita (s)':<26} {plain['write']:>15.3f} {compressed['write']:>18.3f}")
+    print(f"   {'leitura (s)':<26} {plain['read']:>15.3f} {compressed['read']:>18.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark da abertura de uma conversa muito longa: load_conversation
+(todas as mensagens em memória) vs. load_tail e iter_messages.
+
+Uso:
+    python benchmarks/db_long_conversation.py --messages 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+
+def measure(fn) -> tuple:
+    """Tempo (ms) e pico de memória alocada (KiB) de uma chamada."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--tail", type=int, default=50)
+    args = parser.parse_args()
+    
+    messages = [
+        {"role": "user" if i % 2 == 0 else "assistant",
+         "content": f"Mensagem {i}: " + "texto de exemplo " * 20,
+         "timestamp": f"2024-01-15T10:{i // 60 % 60:02d}:{i % 60:02d}"}
+        for i in range(args.messages)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = ConversationDB(os.path.join(tmpdir, "bench.db"))
+        conversation_id = db.save_conversation(messages, "assistente_geral")
+        del messages
+        
+        def scan():
+            for _ in db.iter_messages(conversation_id):
+                pass
+        
+        results = {
+            "load_conversation": measure(lambda: db.load_conversation(conversation_id)),
+            f"load_tail({args.tail})": measure(lambda: db.load_tail(conversation_id, args.tail)),
+            "iter_messages (todas)": measure(scan),
+        }
+        db.close()
+    
+    print(f"📊 Conversa com {args.messages} mensagens")
+    print(f"   {'operação':<24} {'tempo':>10} {'pico de memória':>16}")
+    for name, (elapsed, peak) in results.items():
+        print(f"   {name:<24} {elapsed:>8.2f}ms {peak:>13.0f}KiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark de escritas concorrentes de vários processos (workers do app):
+um arquivo SQLite vs. conversas distribuídas em N shards.
+
+Uso:
+    python benchmarks/db_sharded_writes.py --workers 8 --turns 500 --shards 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+from src.sharding import ShardedConversationDB
+
+TURN = [
+    {"role": "user", "content": "Olá! Como funciona o imposto de renda?", "timestamp": "2024-01-15T10:00:00"},
+    {"role": "assistant", "content": "O imposto de renda é calculado sobre...", "timestamp": "2024-01-15T10:00:05"}
+]
+
+def worker(args: tuple) -> float:
+    """Grava 'turns' turnos, cada um em sua transação, em 10 conversas próprias."""
+    path, sharded, turns, synchronous = args
+    db = ShardedConversationDB(path, busy_timeout_ms=60000) if sharded else ConversationDB(path, busy_timeout_ms=60000)
+    for shard in (db.shards if sharded else [db]):
+        shard._connect().execute(f"PRAGMA synchronous = {synchronous}")
+    
+    conversations = [str(uuid.uuid4()) for _ in range(10)]
+    start = time.perf_counter()
+    for i in range(turns):
+        db.append_messages(conversations[i % 10], TURN, "assistente_geral")
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+def run(path: str, sharded: bool, workers: int, turns: int, synchronous: str) -> float:
+    """Executa os workers em paralelo e retorna turnos gravados por segundo."""
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        pool.map(worker, [(path, sharded, turns, synchronous)] * workers)
+    return workers * turns / (time.perf_counter() - start)
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--synchronous", choices=["OFF", "NORMAL", "FULL"], default="FULL")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        single_path = os.path.join(tmpdir, "single.db")
+        ConversationDB(single_path).close()
+        shard_dir = os.path.join(tmpdir, "shards")
+        ShardedConversationDB(shard_dir, shards=args.shards).close()
+        
+        single = run(single_path, False, args.workers, args.turns, args.synchronous)
+        sharded = run(shard_dir, True, args.workers, args.turns, args.synchronous)
+    
+    print(f"📊 {args.workers} processos x {args.turns} turnos, synchronous={args.synchronous}")
+    print(f"   arquivo único:  {single:>8.0f} turnos/s")
+    print(f"   {args.shards} shards:      {sharded:>8.0f} turnos/s ({sharded / single:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark de muitas chamadas pequenas ao ConversationDB: conexão nova por
+chamada com journal de rollback (comportamento anterior) vs. conexão
+persistente por thread em modo WAL.
+
+Uso:
+    python benchmarks/db_small_calls.py --calls 2000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+
+MESSAGES = [
+    {"role": "user", "content": "Olá! Como funciona o imposto de renda?", "timestamp": "2024-01-15T10:00:00"},
+    {"role": "assistant", "content": "O imposto de renda é calculado sobre...", "timestamp": "2024-01-15T10:00:05"}
+]
+
+class LegacyDB(ConversationDB):
+    """ConversationDB com o comportamento anterior: uma conexão nova por chamada."""
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = DELETE")
+        return conn
+
+def run(db: ConversationDB, calls: int) -> dict:
+    """Executa o mesmo roteiro de chamadas e mede cada tipo."""
+    timings = {}
+    
+    start = time.perf_counter()
+    ids = [db.save_conversation(MESSAGES, "assistente_geral") for _ in range(calls // 4)]
+    timings["save_conversation"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for conversation_id in ids:
+        db.load_conversation(conversation_id)
+    timings["load_conversation"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(calls // 4):
+        db.list_conversations(limit=20)
+    timings["list_conversations"] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(calls // 4):
+        db.get_statistics()
+    timings["get_statistics"] = time.perf_counter() - start
+    
+    return timings
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        legacy = run(LegacyDB(os.path.join(tmpdir, "legacy.db")), args.calls)
+        pooled_db = ConversationDB(os.path.join(tmpdir, "pooled.db"))
+        pooled = run(pooled_db, args.calls)
+        pooled_db.close()
+    
+    print(f"📊 {args.calls} chamadas ({args.calls // 4} de cada tipo)")
+    print(f"   {'operação':<20} {'antes':>10} {'depois':>10} {'ganho':>8}")
+    for name in legacy:
+        print(f"   {name:<20} {legacy[name]:>9.3f}s {pooled[name]:>9.3f}s {legacy[name] / pooled[name]:>7.1f}x")
+    
+    total_legacy, total_pooled = sum(legacy.values()), sum(pooled.values())
+    print(f"   {'total':<20} {total_legacy:>9.3f}s {total_pooled:>9.3f}s {total_legacy / total_pooled:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark de get_statistics em um banco grande: COUNT(*) e GROUP BY a cada
+chamada (comportamento anterior) vs. contadores mantidos por triggers.
+
+Uso:
+    python benchmarks/db_statistics.py --conversations 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from list_pagination import populate, timed
+from src.database import ConversationDB
+
+class LegacyDB(ConversationDB):
+    """ConversationDB com o get_statistics anterior, que varre as tabelas."""
+    
+    def get_statistics(self):
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            total_conversations = cursor.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            total_messages = cursor.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            by_personality = dict(cursor.execute("""
+                SELECT personality, COUNT(*) as count FROM conversations
+                GROUP BY personality ORDER BY count DESC
+            """).fetchall())
+            last = cursor.execute("SELECT created_at FROM conversations ORDER BY created_at DESC LIMIT 1").fetchone()
+            return {
+                "total_conversations": total_conversations,
+                "total_messages": total_messages,
+                "conversations_by_personality": by_personality,
+                "last_conversation_date": last[0] if last else None
+            }
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=1000000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "bench.db")
+        db = ConversationDB(db_path)
+        populate(db, args.conversations)
+        
+        legacy_db = LegacyDB(db_path)
+        legacy = timed(legacy_db.get_statistics)
+        current = timed(db.get_statistics)
+        
+        assert legacy_db.get_statistics() == db.get_statistics()
+        legacy_db.close()
+        db.close()
+    
+    print(f"📊 get_statistics com {args.conversations} conversas")
+    print(f"   antes:  {legacy:10.2f} ms")
+    print(f"   depois: {current:10.2f} ms ({legacy / current:.0f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark da latência de append_messages vista pela thread do chat:
+gravação síncrona (uma transação por chamada) vs. escritor em segundo plano.
+
+Uso:
+    python benchmarks/db_write_behind.py --turns 2000 --durability full
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+
+TURN = [
+    {"role": "user", "content": "Olá! Como funciona o imposto de renda?", "timestamp": "2024-01-15T10:00:00"},
+    {"role": "assistant", "content": "O imposto de renda é calculado sobre...", "timestamp": "2024-01-15T10:00:05"}
+]
+
+def run(db: ConversationDB, turns: int) -> dict:
+    """Grava 'turns' turnos em 20 conversas e mede cada chamada."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(turns):
+        call_start = time.perf_counter()
+        db.append_messages(f"sessao-{i % 20}", TURN, "assistente_geral")
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    
+    flush_start = time.perf_counter()
+    db.flush()
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+    
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1],
+        "total_s": time.perf_counter() - start,
+        "final_flush_ms": flush_ms
+    }
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--durability", choices=["off", "normal", "full"], default="full")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sync_db = ConversationDB(os.path.join(tmpdir, "sync.db"))
+        sync_db._connect().execute(f"PRAGMA synchronous = {args.durability.upper()}")
+        sync = run(sync_db, args.turns)
+        sync_db.close()
+        
+        behind_db = ConversationDB(os.path.join(tmpdir, "behind.db"))
+        writer = behind_db.start_writer(durability=args.durability)
+        behind = run(behind_db, args.turns)
+        writer_stats = writer.stats()
+        behind_db.close()
+    
+    print(f"📊 {args.turns} turnos, durabilidade '{args.durability}'")
+    print(f"   {'':<22} {'síncrono':>10} {'segundo plano':>14}")
+    print(f"   {'p50 por chamada (ms)':<22} {sync['p50_ms']:>10.3f} {behind['p50_ms']:>14.3f}")
+    print(f"   {'p99 por chamada (ms)':<22} {sync['p99_ms']:>10.3f} {behind['p99_ms']:>14.3f}")
+    print(f"   {'total (s)':<22} {sync['total_s']:>10.3f} {behind['total_s']:>14.3f}")
+    print(f"   lotes gravados: {writer_stats['flushes']}, "
+          f"flush médio {writer_stats['avg_flush_ms']:.2f} ms, máximo {writer_stats['max_flush_ms']:.2f} ms, "
+          f"fila máxima {writer_stats['max_queue_depth']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark da listagem de conversas em um banco grande: ORDER BY sem índice
+com LIMIT/OFFSET (comportamento anterior) vs. paginação por chave com
+índices de cobertura.
+
+Uso:
+    python benchmarks/list_pagination.py --conversations 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import ConversationDB
+
+PERSONALITIES = ["assistente_geral", "professor", "desenvolvedor", "consultor_negocios"]
+
+def populate(db: ConversationDB, total: int) -> None:
+    """Insere conversas sintéticas diretamente, em lotes."""
+    start = datetime(2023, 1, 1)
+    with db._connect() as conn:
+        batch = []
+        for i in range(total):
+            created_at = (start + timedelta(seconds=i * 7)).isoformat()
+            batch.append((str(uuid.uuid4()), PERSONALITIES[i % len(PERSONALITIES)],
+                          created_at, created_at, 2, created_at, created_at))
+            if len(batch) == 10000:
+                conn.executemany("""
+                    INSERT INTO conversations
+                    (id, personality, start_time, end_time, message_count, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, batch)
+                batch.clear()
+        if batch:
+            conn.executemany("""
+                INSERT INTO conversations
+                (id, personality, start_time, end_time, message_count, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+        conn.commit()
+
+def legacy_page(db: ConversationDB, limit: int, offset: int, personality: str = None) -> list:
+    """Consulta anterior, com OFFSET para chegar à página pedida."""
+    query = "SELECT id, personality, start_time, end_time, message_count, created_at FROM conversations"
+    params = []
+    if personality:
+        query += " WHERE personality = ?"
+        params.append(personality)
+    query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+    with db._connect() as conn:
+        return conn.execute(query, params).fetchall()
+
+def timed(fn, repeat: int = 3) -> float:
+    """Melhor tempo de 'repeat' execuções, em milissegundos."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=1000000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+    
+    depths = [0, 10, 100, 1000]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = ConversationDB(os.path.join(tmpdir, "bench.db"))
+        
+        start = time.perf_counter()
+        populate(db, args.conversations)
+        print(f"📦 {args.conversations} conversas inseridas em {time.perf_counter() - start:.1f}s")
+        
+        # Cursores de cada profundidade, obtidos percorrendo as páginas
+        cursors = {0: None}
+        cursor = None
+        for page in range(1, max(depths) + 1):
+            cursor = db.list_conversations_page(args.page_size, cursor=cursor)['next_cursor']
+            if page in depths:
+                cursors[page] = cursor
+        
+        keyset = {d: timed(lambda: db.list_conversations_page(args.page_size, cursor=cursors[d])) for d in depths}
+        keyset_filtered = {d: timed(lambda: db.list_conversations_page(args.page_size, "professor", cursor=cursors[d]))
+                           for d in depths}
+        
+        with db._connect() as conn:
+            conn.execute("DROP INDEX idx_conversations_created")
+            conn.execute("DROP INDEX idx_conversations_personality_created")
+            conn.execute("CREATE INDEX idx_conversations_personality ON conversations (personality)")
+        
+        legacy = {d: timed(lambda: legacy_page(db, args.page_size, d * args.page_size)) for d in depths}
+        legacy_filtered = {d: timed(lambda: legacy_page(db, args.page_size, d * args.page_size, "professor"))
+                           for d in depths}
+        db.close()
+    
+    print(f"📊 Latência por página ({args.page_size} conversas), em ms")
+    print(f"   {'página':>7} {'antes':>10} {'depois':>10} {'antes (filtro)':>15} {'depois (filtro)':>16}")
+    for d in depths:
+        print(f"   {d + 1:>7} {legacy[d]:>10.2f} {keyset[d]:>10.2f} {legacy_filtered[d]:>15.2f} {keyset_filtered[d]:>16.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark do limitador: lista de timestamps reconstruída a cada chamada
+(check_rate_limit anterior) vs. RateLimiter em memória e em SQLite.
+
+Uso:
+    python benchmarks/rate_limiter.py --calls 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.ratelimit import RateLimiter
+
+def legacy_check(history, max_requests, time_window):
+    """check_rate_limit anterior, sem o st.session_state."""
+    now = time.time()
+    cutoff = now - time_window
+    history[:] = [t for t in history if t > cutoff]
+    if len(history) >= max_requests:
+        return False
+    history.append(now)
+    return True
+
+def per_call_us(fn, calls: int) -> float:
+    """Tempo médio por chamada, em microssegundos."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--max-requests", type=int, default=100000)
+    args = parser.parse_args()
+    
+    history = []
+    legacy = per_call_us(lambda: legacy_check(history, args.max_requests, 60), args.calls)
+    
+    memory = RateLimiter(max_requests=args.max_requests, tokens_per_day=10 ** 9)
+    in_memory = per_call_us(lambda: memory.acquire("ana", 100), args.calls)
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        shared = RateLimiter(max_requests=args.max_requests, tokens_per_day=10 ** 9,
+                             db_path=os.path.join(tmpdir, "limits.db"))
+        calls = min(args.calls, args.max_requests)
+        in_sqlite = per_call_us(lambda: shared.acquire("ana", 100), calls)
+    
+    print(f"⏱️ Verificações com limite de {args.max_requests} requisições/min")
+    print(f"   lista de timestamps: {legacy:8.1f} µs")
+    print(f"   RateLimiter memória: {in_memory:8.1f} µs")
+    print(f"   RateLimiter SQLite:  {in_sqlite:8.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark da contagem de tokens: precisão (contra o tiktoken, se instalado)
+e vazão de count, do cache e de count_tokens_batch.
+
+Uso:
+    python benchmarks/token_counting.py --texts 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.tokens import TokenCounter, heuristic_count, tiktoken
+
+SAMPLES = {
+    "português": [
+        "Olá! Você poderia me ajudar com a declaração do imposto de renda deste ano?",
+        "A fotossíntese é o processo pelo qual as plantas convertem luz em energia química.",
+        "Para abrir uma empresa, é necessário escolher o regime tributário e registrar o CNPJ.",
+        "Não se esqueça de revisar as informações antes de enviar: atenção às deduções!",
+    ],
+    "inglês": [
+        "The quick brown fox jumps over the lazy dog.",
+        "Could you explain how list comprehensions work in Python?",
+    ],
+    "código": [
+        "def fibonacci(n):\n    if n < 2:\n        return n\n    return fibonacci(n - 1) + fibonacci(n - 2)\n",
+        "SELECT id, personality FROM conversations WHERE created_at < ? ORDER BY created_at DESC;",
+        "const total = items.reduce((acc, item) => acc + item.price * item.qty, 0);",
+    ],
+    "emoji": [
+        "Parabéns pelo aniversário! 🎉🎂🥳 Que seu dia seja incrível! 🚀✨",
+        "Status: ✅ concluído, ⚠️ pendente, ❌ falhou 😅",
+    ],
+}
+
+def accuracy() -> None:
+    """Erro relativo médio de len // 4 e da heurística contra o tiktoken."""
+    if tiktoken is None:
+        print("⚠️  tiktoken não instalado: precisão não medida (pip install tiktoken)")
+        return
+    
+    reference = TokenCounter()
+    if reference.backend != "tiktoken":
+        print("⚠️  vocabulário do tiktoken indisponível (sem rede?): precisão não medida")
+        return
+    
+    print("🎯 Erro relativo médio contra o tiktoken (cl100k_base)")
+    print(f"   {'categoria':<12} {'len // 4':>10} {'heurística':>11}")
+    for category, texts in SAMPLES.items():
+        naive_error = heuristic_error = 0.0
+        for text in texts:
+            expected = reference.count(text)
+            naive_error += abs(len(text) // 4 - expected) / expected
+            heuristic_error += abs(heuristic_count(text) - expected) / expected
+        print(f"   {category:<12} {naive_error / len(texts):>10.0%} {heuristic_error / len(texts):>11.0%}")
+
+def throughput(total: int) -> None:
+    """Textos por segundo em cada forma de contagem."""
+    rng = random.Random(42)
+    pool = [text for texts in SAMPLES.values() for text in texts]
+    # Metade dos textos é única, metade se repete (como o histórico reenviado)
+    texts = [f"{rng.choice(pool)} #{i}" if i % 2 else rng.choice(pool) for i in range(total)]
+    
+    counter = TokenCounter(cache_size=total)
+    print(f"⚡ Vazão com {total} textos (backend: {counter.backend})")
+    
+    start = time.perf_counter()
+    for text in texts:
+        counter.count(text)
+    first = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for text in texts:
+        counter.count(text)
+    cached = time.perf_counter() - start
+    
+    batch_counter = TokenCounter(cache_size=total)
+    start = time.perf_counter()
+    batch_counter.count_batch(texts)
+    batch = time.perf_counter() - start
+    
+    for name, elapsed in (("count (1ª vez)", first), ("count (em cache)", cached), ("count_batch", batch)):
+        print(f"   {name:<18} {total / elapsed:>12,.0f} textos/s")
+
+def main():
+    """Função principal do benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=20000)
+    args = parser.parse_args()
+    
+    accuracy()
+    throughput(args.texts)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Estatísticas de conversas do AI Chatbot Brasileiro
+
+conversation_stats calcula as métricas de uma conversa em uma única
+passagem pelo histórico; archive_stats agrega todo o banco por
+personalidade, lendo as conversas em lotes para um DataFrame do pandas.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+try:
+    import pandas as pd
+except ImportError:  # pragma: no cover - depende do ambiente
+    pd = None
+
+from .tokens import get_token_counter
+
+# Colunas somadas entre lotes em archive_stats (a duração máxima usa max)
+_ARCHIVE_TOTALS = {
+    "conversations": "sum",
+    "messages": "sum",
+    "user_messages": "sum",
+    "assistant_messages": "sum",
+    "characters": "sum",
+    "duration_total": "sum",
+    "duration_count": "sum",
+    "duration_max": "max"
+}
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Converte um timestamp ISO (com ou sem 'Z') em datetime; None se inválido."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        return None
+
+def conversation_stats(messages: Iterable[Mapping[str, Any]]) -> Dict[str, Any]:
+    """
+    Calcula as estatísticas de uma conversa em uma única passagem.
+    
+    Aceita dicionários ou objetos Message; os tokens vêm do contador
+    compartilhado, cujo cache torna baratas as chamadas repetidas a cada
+    atualização da interface.
+    
+    Args:
+        messages: Mensagens da conversa, em ordem
+    
+    Returns:
+        Dicionário com total de mensagens, mensagens por papel, caracteres,
+        tokens estimados, primeiro e último timestamp e duração
+    """
+    counter = get_token_counter()
+    total = user = assistant = characters = tokens = 0
+    first = last = None
+    
+    for message in messages:
+        total += 1
+        role = message.get('role')
+        if role == 'user':
+            user += 1
+        elif role == 'assistant':
+            assistant += 1
+        
+        content = message.get('content', '')
+        characters += len(content)
+        tokens += counter.count(content)
+        
+        timestamp = message.get('timestamp')
+        if total == 1:
+            first = timestamp
+        last = timestamp
+    
+    duration = None
+    start, end = _parse_timestamp(first), _parse_timestamp(last)
+    if start is not None and end is not None:
+        try:
+            duration = str(end - start)
+        except TypeError:
+            # Um timestamp com fuso e outro sem: duração indefinida
+            pass
+    
+    return {
+        "total_messages": total,
+        "user_messages": user,
+        "assistant_messages": assistant,
+        "total_characters": characters,
+        "estimated_tokens": tokens,
+        "start_time": first,
+        "end_time": last,
+        "duration": duration
+    }
+
+def archive_stats(db: Any, chunk_size: int = 5000) -> "pd.DataFrame":
+    """
+    Agrega as conversas de todo o banco por personalidade.
+    
+    As métricas por conversa são lidas em lotes de 'chunk_size'
+    (db.iter_conversation_metrics) e cada lote é reduzido a uma linha por
+    personalidade antes de ler o próximo, então a memória usada não cresce
+    com o tamanho do arquivo.
+    
+    Args:
+        db: ConversationDB ou ShardedConversationDB
+        chunk_size: Conversas lidas por lote
+    
+    Returns:
+        DataFrame indexado por personalidade com conversas, mensagens,
+        mensagens por papel, caracteres, médias por conversa e duração
+        média/máxima em segundos
+    
+    Raises:
+        RuntimeError: Se o pandas não estiver instalado
+    """
+    if pd is None:
+        raise RuntimeError("archive_stats requer o pandas (pip install pandas)")
+    
+    totals = None
+    for rows in db.iter_conversation_metrics(chunk_size):
+        chunk = pd.DataFrame.from_records(rows)
+        start = pd.to_datetime(chunk['start_time'], errors='coerce', format='ISO8601')
+        end = pd.to_datetime(chunk['end_time'], errors='coerce', format='ISO8601')
+        chunk['duration'] = (end - start).dt.total_seconds()
+        
+        partial = chunk.groupby('personality').agg(
+            conversations=('id', 'size'),
+            messages=('messages', 'sum'),
+            user_messages=('user_messages', 'sum'),
+            assistant_messages=('assistant_messages', 'sum'),
+            characters=('characters', 'sum'),
+            duration_total=('duration', 'sum'),
+            duration_count=('duration', 'count'),
+            duration_max=('duration', 'max')
+        )
+        totals = partial if totals is None else (
+            pd.concat([totals, partial]).groupby(level=0).agg(_ARCHIVE_TOTALS)
+        )
+    
+    if totals is None:
+        totals = pd.DataFrame(columns=list(_ARCHIVE_TOTALS), dtype=float)
+        totals.index.name = 'personality'
+    
+    summary = totals[["conversations", "messages", "user_messages",
+                      "assistant_messages", "characters"]].copy()
+    conversations = totals['conversations'].where(totals['conversations'] > 0)
+    summary['avg_messages'] = totals['messages'] / conversations
+    summary['avg_turns'] = totals['user_messages'] / conversations
+    summary['avg_characters'] = totals['characters'] / conversations
+    summary['avg_duration_seconds'] = totals['duration_total'] / (
+        totals['duration_count'].where(totals['duration_count'] > 0)
+    )
+    summary['max_duration_seconds'] = totals['duration_max']
+    
+    return summary.sort_values('conversations', ascending=False)
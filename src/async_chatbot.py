@@ -0,0 +1,239 @@
+"""
+Versão assíncrona do AI Chatbot Brasileiro
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .chatbot import ChatbotAI, ResponseStreamError
+from .client import AsyncClientPool, OpenAIClient, get_default_pool
+from .ratelimit import RateLimitExceeded
+
+class AsyncChatbotAI(ChatbotAI):
+    """
+    Chatbot com chamadas assíncronas à API do OpenAI.
+    
+    Mantém a mesma memória e preparação de mensagens de ChatbotAI, mas não
+    ocupa uma thread por requisição em andamento.
+    """
+    
+    def __init__(self, config: Dict[str, Any], pool: Optional[AsyncClientPool] = None):
+        """
+        Inicializa o chatbot assíncrono.
+        
+        Args:
+            config: Dicionário com configurações
+            pool: Pool de conexões a usar (padrão: pool compartilhado do processo)
+        """
+        self.pool = pool or get_default_pool()
+        super().__init__(config)
+    
+    def _build_client(self) -> OpenAIClient:
+        """Cria o cliente OpenAI ligado ao pool assíncrono desta instância."""
+        return OpenAIClient.from_config(self.config, async_pool=self.pool)
+    
+    async def _areserve_rate_limit(self, messages: List[Dict[str, str]]) -> int:
+        """_reserve_rate_limit fora do event loop quando o limitador usa SQLite."""
+        if self.rate_limiter.db_path:
+            return await asyncio.to_thread(self._reserve_rate_limit, messages)
+        return self._reserve_rate_limit(messages)
+    
+    async def _asettle_rate_limit(self, reserved: int, response: Any = None,
+                                  reply: Optional[str] = None) -> None:
+        """_settle_rate_limit fora do event loop quando o limitador usa SQLite."""
+        if reserved and self.rate_limiter.db_path:
+            await asyncio.to_thread(self._settle_rate_limit, reserved, response, reply)
+        else:
+            self._settle_rate_limit(reserved, response, reply)
+    
+    async def _acache_get(self, cache_key: Optional[str]) -> Optional[str]:
+        """response_cache.get fora do event loop quando o cache usa SQLite."""
+        if not cache_key:
+            return None
+        if self.response_cache.db_path:
+            return await asyncio.to_thread(self.response_cache.get, cache_key)
+        return self.response_cache.get(cache_key)
+    
+    async def _acache_set(self, cache_key: Optional[str], response: str) -> None:
+        """response_cache.set fora do event loop quando o cache usa SQLite."""
+        if not cache_key:
+            return
+        if self.response_cache.db_path:
+            await asyncio.to_thread(self.response_cache.set, cache_key, response)
+        else:
+            self.response_cache.set(cache_key, response)
+    
+    async def _acomplete(self, messages: List[Dict[str, str]], use_cache: bool = True) -> str:
+        """
+        Versão assíncrona de _complete: resposta para mensagens já preparadas,
+        sem alterar a memória da conversa.
+        
+        Args:
+            messages: Mensagens já preparadas para a API
+            use_cache: Se False, ignora o cache de respostas nesta requisição
+        
+        Returns:
+            Resposta gerada (ou do cache)
+        """
+        cache_key = self._cache_key(messages) if use_cache else None
+        cached_response = await self._acache_get(cache_key)
+        if cached_response is not None:
+            return cached_response
+        
+        reserved = await self._areserve_rate_limit(messages)
+        try:
+            response = await self.client.achat_completion(**self._completion_params(messages))
+        except Exception:
+            await self._asettle_rate_limit(reserved)
+            raise
+        
+        assistant_response = response.choices[0].message.content.strip()
+        await self._asettle_rate_limit(reserved, response, assistant_response)
+        await self._acache_set(cache_key, assistant_response)
+        return assistant_response
+    
+    async def _arespond(self, user_input: str, use_cache: bool = True) -> str:
+        """
+        Gera uma resposta de forma assíncrona, propagando erros da API.
+        
+        Args:
+            user_input: Mensagem do usuário
+            use_cache: Se False, ignora o cache de respostas nesta requisição
+        
+        Returns:
+            Resposta gerada pelo chatbot
+        """
+        messages = self.prepare_messages(user_input)
+        self.add_to_memory("user", user_input)
+        
+        assistant_response = await self._acomplete(messages, use_cache)
+        self.add_to_memory("assistant", assistant_response)
+        self.maybe_summarize_history()
+        
+        return assistant_response
+    
+    async def agenerate_response(self, user_input: str, use_cache: bool = True) -> str:
+        """
+        Gera uma resposta de forma assíncrona.
+        
+        Args:
+            user_input: Mensagem do usuário
+            use_cache: Se False, ignora o cache de respostas nesta requisição
+        
+        Returns:
+            Resposta gerada pelo chatbot
+        """
+        try:
+            return await self._arespond(user_input, use_cache)
+        except Exception as e:
+            return self._error_message(e)
+    
+    async def agenerate_many(self, prompts: List[str], personality: Optional[str] = None,
+                             max_concurrency: int = 16, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Versão assíncrona de generate_many: as requisições rodam como tarefas
+        no event loop, limitadas por um semáforo. Como em generate_many, itens
+        recusados pelo limite de requisições aguardam 'retry_after'.
+        
+        Args:
+            prompts: Lista de mensagens a responder
+            personality: Personalidade a usar (padrão: a personalidade atual)
+            max_concurrency: Número máximo de requisições simultâneas
+            use_cache: Se False, ignora o cache de respostas
+        
+        Returns:
+            Lista de resultados na mesma ordem dos prompts
+        """
+        personality = personality or self.current_personality
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run(index: int, prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                start = time.perf_counter()
+                response, error = None, None
+                while True:
+                    try:
+                        response = await self._acomplete(self._batch_messages(personality, prompt), use_cache)
+                    except RateLimitExceeded as e:
+                        if e.limit == 'requests':
+                            await asyncio.sleep(e.retry_after)
+                            continue
+                        error = f"{type(e).__name__}: {e}"
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                    break
+                
+                return {
+                    "index": index,
+                    "prompt": prompt,
+                    "personality": personality,
+                    "response": response,
+                    "error": error,
+                    "latency": time.perf_counter() - start
+                }
+        
+        return list(await asyncio.gather(*(run(i, p) for i, p in enumerate(prompts))))
+    
+    async def astream_response(self, user_input: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Gera uma resposta assíncrona em modo streaming.
+        
+        Respostas em cache são entregues de uma só vez, como um único trecho.
+        
+        Args:
+            user_input: Mensagem do usuário
+            use_cache: Se False, ignora o cache de respostas nesta requisição
+        
+        Yields:
+            Trechos (deltas) da resposta
+        
+        Raises:
+            ResponseStreamError: Se a geração falha
+        """
+        messages = self.prepare_messages(user_input)
+        self.add_to_memory("user", user_input)
+        
+        cache_key = self._cache_key(messages) if use_cache else None
+        cached_response = await self._acache_get(cache_key)
+        if cached_response is not None:
+            self.add_to_memory("assistant", cached_response)
+            self.maybe_summarize_history()
+            yield cached_response
+            return
+        
+        chunks = []
+        reserved = 0
+        stream = None
+        completed = False
+        try:
+            reserved = await self._areserve_rate_limit(messages)
+            stream = await self.client.achat_completion(
+                stream=True,
+                **self._completion_params(messages)
+            )
+            
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+            
+            completed = True
+        except Exception as e:
+            raise ResponseStreamError(self._error_message(e)) from e
+        finally:
+            if not completed:
+                # Erro ou consumidor que parou de iterar (aclose): acertar a cota
+                await self._asettle_rate_limit(reserved, reply="".join(chunks) if chunks else None)
+                if hasattr(stream, 'close'):
+                    await stream.close()
+        
+        assistant_response = "".join(chunks).strip()
+        await self._asettle_rate_limit(reserved, reply=assistant_response)
+        self.add_to_memory("assistant", assistant_response)
+        self.maybe_summarize_history()
+        
+        await self._acache_set(cache_key, assistant_response)
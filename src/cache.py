@@ -0,0 +1,261 @@
+"""
+Cache de respostas do AI Chatbot Brasileiro
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+# Respostas expiradas são apagadas do SQLite a cada PURGE_EVERY gravações
+PURGE_EVERY = 500
+
+def _normalize_text(text: str) -> str:
+    """
+    Normaliza os espaços para que perguntas quase idênticas coincidam.
+    
+    A caixa é preservada: em código e em nomes, "Foo" e "foo" são perguntas diferentes.
+    """
+    return re.sub(r'\s+', ' ', text.strip())
+
+class ResponseCache:
+    """
+    Cache de respostas em duas camadas: LRU em memória com TTL e uma camada
+    persistente em SQLite, compartilhada entre processos.
+    """
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400,
+                 db_path: Optional[str] = None):
+        """
+        Inicializa o cache.
+        
+        Args:
+            max_entries: Número máximo de respostas mantidas em memória
+            ttl_seconds: Tempo de vida de cada resposta em segundos
+            db_path: Caminho do banco SQLite da camada persistente (None = só memória)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._db_ready = False
+        self._writes = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+    
+    @staticmethod
+    def make_key(model: str, temperature: float, top_p: float, max_tokens: int,
+                 messages: List[Dict[str, str]]) -> str:
+        """
+        Gera a chave do cache a partir dos parâmetros da requisição.
+        
+        O prompt da personalidade entra na chave como a mensagem de sistema
+        das mensagens preparadas.
+        
+        Args:
+            model: Modelo do OpenAI
+            temperature: Temperatura da amostragem
+            top_p: Parâmetro top_p
+            max_tokens: Limite de tokens da resposta
+            messages: Mensagens preparadas para a API
+        
+        Returns:
+            Hash SHA-256 hexadecimal
+        """
+        payload = {
+            "model": model,
+            "temperature": round(float(temperature), 4),
+            "top_p": round(float(top_p), 4),
+            "max_tokens": int(max_tokens),
+            "messages": [
+                [msg['role'], _normalize_text(msg['content'])] for msg in messages
+            ]
+        }
+        encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão persistente da thread atual (em modo autocommit),
+        criando a tabela da camada persistente na primeira utilização.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        if not self._db_ready:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        
+        if not self._db_ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_response_cache_expires 
+                ON response_cache(expires_at)
+            """)
+            self._db_ready = True
+        
+        self._local.conn = conn
+        return conn
+    
+    def _remember(self, key: str, response: str, expires_at: float) -> None:
+        """Insere uma resposta na camada em memória, respeitando o limite."""
+        with self._lock:
+            self._entries[key] = (response, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        Busca uma resposta no cache.
+        
+        Args:
+            key: Chave gerada por make_key
+        
+        Returns:
+            Resposta em cache ou None se ausente/expirada
+        """
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return response
+                del self._entries[key]
+        
+        if self.db_path:
+            row = self._connect().execute(
+                "SELECT response, expires_at FROM response_cache WHERE key = ?",
+                (key,)
+            ).fetchone()
+            
+            if row and row[1] > now:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return row[0]
+        
+        with self._lock:
+            self.misses += 1
+        return None
+    
+    def set(self, key: str, response: str) -> None:
+        """
+        Armazena uma resposta nas duas camadas do cache.
+        
+        Args:
+            key: Chave gerada por make_key
+            response: Resposta a armazenar
+        """
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, response, expires_at)
+        
+        if self.db_path:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO response_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at)
+            )
+            self._writes += 1
+            if self._writes % PURGE_EVERY == 0:
+                self.purge_expired()
+    
+    def purge_expired(self) -> int:
+        """
+        Remove as respostas expiradas (memória e disco).
+        
+        Returns:
+            Número de respostas removidas do disco
+        """
+        now = time.time()
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+        
+        if not self.db_path:
+            return 0
+        return self._connect().execute(
+            "DELETE FROM response_cache WHERE expires_at <= ?", (now,)
+        ).rowcount
+    
+    def clear(self) -> None:
+        """Remove todas as respostas do cache (memória e disco)."""
+        with self._lock:
+            self._entries.clear()
+        
+        if self.db_path:
+            self._connect().execute("DELETE FROM response_cache")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna os contadores do cache.
+        
+        Returns:
+            Dicionário com acertos, falhas e tamanho em memória
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._entries)
+            }
+
+_shared_caches: Dict[Tuple[Optional[str], int, float], ResponseCache] = {}
+_shared_lock = threading.Lock()
+
+def get_response_cache(config: Dict[str, Any]) -> ResponseCache:
+    """
+    Retorna o cache compartilhado do processo para a configuração dada.
+    
+    Instâncias de ChatbotAI com a mesma configuração de cache (por exemplo,
+    uma por sessão do Streamlit) compartilham a mesma camada em memória.
+    
+    Args:
+        config: Configurações do chatbot
+    
+    Returns:
+        Instância compartilhada de ResponseCache
+    """
+    db_path = config.get('database_path') if config.get('cache_persistent', True) else None
+    key = (
+        db_path,
+        int(config.get('cache_max_entries', 1000)),
+        float(config.get('cache_ttl_seconds', 86400))
+    )
+    
+    with _shared_lock:
+        if key not in _shared_caches:
+            _shared_caches[key] = ResponseCache(max_entries=key[1], ttl_seconds=key[2], db_path=db_path)
+        return _shared_caches[key]
@@ -3,12 +3,34 @@ Classe principal do AI Chatbot Brasileiro
 """
 
 import openai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
 import json
+import threading
+import time
 
+from .analytics import conversation_stats
 from .personalities import get_personality_prompt
 from .config import DEFAULT_CONFIG
+from .cache import ResponseCache, get_response_cache
+from .client import OpenAIClient
+from .ratelimit import RateLimitExceeded, get_rate_limiter, rate_limit_key
+from .resilience import CircuitOpenError
+from .tokens import count_message_tokens, count_tokens, REPLY_OVERHEAD_TOKENS
+from .memory import ConversationMemory, Message
+from .prompt import PromptPrefix
+
+SUMMARY_PROMPT = """Você resume conversas entre um usuário e um assistente.
+Atualize o resumo existente incorporando as novas mensagens. Preserve fatos,
+nomes, números, decisões e pedidos em aberto; descarte cumprimentos e
+repetições. Responda apenas com o resumo, em português, em no máximo um parágrafo."""
+
+# Executor compartilhado para resumir históricos em segundo plano
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chatbot-summary")
+
+class ResponseStreamError(Exception):
+    """Falha durante uma resposta em streaming; a mensagem é o texto a exibir ao usuário."""
 
 class ChatbotAI:
     """
@@ -23,14 +45,28 @@ class ChatbotAI:
             config: Dicionário com configurações
         """
         self.config = {**DEFAULT_CONFIG, **config}
-        self.conversation_memory = []
+        self.conversation_memory = ConversationMemory(self.config.get('max_conversation_history', 20))
+        self.history_summary = ""
         self.current_personality = "assistente_geral"
+        self.prompt_prefix = PromptPrefix()
+        self.response_cache = get_response_cache(self.config)
+        self.rate_limiter = get_rate_limiter(self.config)
+        self.rate_limit_key = rate_limit_key(self.config)
         
-        # Configurar cliente OpenAI
-        if self.config.get('openai_api_key'):
-            openai.api_key = self.config['openai_api_key']
-        else:
+        # Estado do resumo em segundo plano
+        self._summary_lock = threading.Lock()
+        self._summary_future: Optional[Future] = None
+        self._summary_folded: Optional[Tuple[int, List[Message]]] = None
+        self._memory_generation = 0
+        
+        # Configurar cliente OpenAI próprio desta instância
+        if not self.config.get('openai_api_key'):
             raise ValueError("OpenAI API Key não configurada")
+        self.client = self._build_client()
+    
+    def _build_client(self) -> OpenAIClient:
+        """Cria o cliente OpenAI a partir das configurações atuais."""
+        return OpenAIClient.from_config(self.config)
     
     def set_personality(self, personality_key: str) -> None:
         """
@@ -41,7 +77,7 @@ class ChatbotAI:
         """
         self.current_personality = personality_key
         # Limpar memória ao trocar personalidade para evitar conflitos
-        self.conversation_memory = []
+        self.clear_memory()
     
     def update_config(self, new_config: Dict[str, Any]) -> None:
         """
@@ -51,115 +87,585 @@ class ChatbotAI:
             new_config: Novas configurações a serem aplicadas
         """
         self.config.update(new_config)
+        
+        if 'max_conversation_history' in new_config:
+            self.conversation_memory.resize(new_config['max_conversation_history'])
+        
+        # Recriar o cliente se credenciais ou endpoint mudaram
+        client_keys = {
+            'openai_api_key', 'openai_api_keys', 'openai_organization', 'openai_api_base',
+            'request_timeout', 'fallback_models', 'max_retries', 'retry_base_delay',
+            'retry_max_delay', 'circuit_failure_threshold', 'circuit_reset_timeout'
+        }
+        if client_keys & new_config.keys():
+            self.client = self._build_client()
+        
+        limit_keys = {
+            'max_requests_per_minute', 'max_tokens_per_day', 'rate_limit_key',
+            'rate_limit_persistent', 'openai_api_key', 'database_path'
+        }
+        if limit_keys & new_config.keys():
+            self.rate_limiter = get_rate_limiter(self.config)
+            self.rate_limit_key = rate_limit_key(self.config)
     
     def add_to_memory(self, role: str, content: str) -> None:
         """
         Adiciona uma mensagem à memória da conversa.
         
+        A contagem de tokens da mensagem é calculada uma única vez aqui e
+        reaproveitada em todas as chamadas de prepare_messages. Ao atingir
+        'max_conversation_history', a mensagem mais antiga é descartada em O(1)
+        (o orçamento de tokens é aplicado em prepare_messages).
+        
         Args:
             role: 'user' ou 'assistant'
             content: Conteúdo da mensagem
         """
-        self.conversation_memory.append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Limitar tamanho da memória para evitar excesso de tokens
-        max_memory = self.config.get('max_conversation_history', 20)
-        if len(self.conversation_memory) > max_memory:
-            # Manter sempre o prompt do sistema e as últimas mensagens
-            system_messages = [msg for msg in self.conversation_memory if msg['role'] == 'system']
-            recent_messages = self.conversation_memory[-(max_memory-len(system_messages)):]
-            self.conversation_memory = system_messages + recent_messages
+        self.conversation_memory.append(Message(role, content, count_message_tokens(content)))
     
     def clear_memory(self) -> None:
-        """Limpa a memória da conversa."""
-        self.conversation_memory = []
+        """Limpa a memória da conversa e o resumo do histórico."""
+        with self._summary_lock:
+            self.conversation_memory.clear()
+            self.history_summary = ""
+            # Descarta resumos em andamento da conversa anterior
+            self._memory_generation += 1
+    
+    def _summary_message(self) -> Optional[Dict[str, str]]:
+        """Retorna a mensagem de sistema com o resumo do histórico, se houver."""
+        if not self.history_summary:
+            return None
+        return {
+            "role": "system",
+            "content": f"Resumo da conversa até aqui: {self.history_summary}"
+        }
+    
+    def _summarize(self, previous_summary: str, messages: List[Message]) -> str:
+        """
+        Gera um novo resumo incorporando as mensagens ao resumo anterior.
+        
+        Args:
+            previous_summary: Resumo atual (pode ser vazio)
+            messages: Mensagens a incorporar
+            
+        Returns:
+            Resumo atualizado
+        """
+        transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+        prompt = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Resumo atual:\n{previous_summary or '(vazio)'}\n\nNovas mensagens:\n{transcript}"}
+        ]
+        max_tokens = self.config.get('summary_max_tokens', 300)
+        
+        # O resumo também conta nos limites de requisições e tokens
+        reserved = self._reserve_rate_limit(prompt, max_tokens)
+        try:
+            response = self.client.chat_completion(
+                model=self.config.get('summary_model') or self.config.get('openai_model', 'gpt-3.5-turbo'),
+                messages=prompt,
+                max_tokens=max_tokens,
+                temperature=0.0
+            )
+        except Exception:
+            self._settle_rate_limit(reserved)
+            raise
+        
+        summary = response.choices[0].message.content.strip()
+        self._settle_rate_limit(reserved, response, summary, max_tokens)
+        return summary
+    
+    def _apply_summary(self) -> None:
+        """
+        Aplica o resumo concluído em segundo plano: troca o resumo e remove da
+        memória as mensagens incorporadas.
+        
+        A thread de resumo só calcula o texto; a memória é alterada aqui, na
+        thread da conversa, para não concorrer com add_to_memory nem com a
+        montagem do prompt.
+        """
+        with self._summary_lock:
+            future = self._summary_future
+            if future is None or not future.done() or self._summary_folded is None:
+                return
+            generation, folded = self._summary_folded
+            self._summary_folded = None
+            
+            # Resumo de uma conversa já limpa ou que falhou: nada a aplicar
+            if generation != self._memory_generation or future.exception() is not None:
+                return
+            
+            self.conversation_memory.discard_oldest(folded)
+            self.history_summary = future.result()
+    
+    def maybe_summarize_history(self) -> Optional[Future]:
+        """
+        Agenda o resumo das mensagens mais antigas, se o modo estiver ativo.
+        
+        Quando o histórico passa de 'summary_threshold' mensagens, tudo exceto
+        as 'summary_keep_recent' mais recentes é incorporado ao resumo em uma
+        thread de segundo plano, mantendo o prompt com tamanho quase constante.
+        O resultado é aplicado na próxima chamada de prepare_messages,
+        maybe_summarize_history ou wait_for_summary.
+        
+        Returns:
+            Future do resumo agendado ou None se nada foi agendado
+        """
+        if not self.config.get('summarize_history', False):
+            return None
+        
+        self._apply_summary()
+        with self._summary_lock:
+            if self._summary_future is not None and not self._summary_future.done():
+                return None
+            
+            if len(self.conversation_memory) <= self.config.get('summary_threshold', 12):
+                return None
+            
+            keep_recent = self.config.get('summary_keep_recent', 6)
+            folded = self.conversation_memory.oldest(len(self.conversation_memory) - keep_recent)
+            
+            self._summary_folded = (self._memory_generation, folded)
+            self._summary_future = _summary_executor.submit(
+                self._summarize, self.history_summary, folded
+            )
+            return self._summary_future
+    
+    def wait_for_summary(self, timeout: Optional[float] = None) -> None:
+        """
+        Aguarda o resumo em segundo plano terminar (por exemplo, antes de salvar).
+        
+        Args:
+            timeout: Tempo máximo de espera em segundos
+        """
+        future = self._summary_future
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                # Falhas no resumo não devem interromper a conversa
+                pass
+            self._apply_summary()
+    
+    def history_token_budget(self, system_prompt: str, user_input: str) -> int:
+        """
+        Calcula quantos tokens do histórico cabem no prompt.
+        
+        O orçamento é a janela de contexto do modelo menos o espaço reservado
+        para a resposta (max_tokens), o prompt do sistema e a mensagem atual.
+        
+        Args:
+            system_prompt: Prompt do sistema da personalidade atual
+            user_input: Mensagem atual do usuário
+            
+        Returns:
+            Número de tokens disponíveis para o histórico
+        """
+        budget = (
+            self.config.get('context_window_tokens', 4096)
+            - self.config.get('max_tokens', 150)
+            - REPLY_OVERHEAD_TOKENS
+            - count_message_tokens(system_prompt)
+            - count_message_tokens(user_input)
+        )
+        return max(budget, 0)
     
     def prepare_messages(self, user_input: str) -> List[Dict[str, str]]:
         """
         Prepara as mensagens para envio à API do OpenAI.
         
+        O prefixo (prompt do sistema, resumo e histórico) é mantido de forma
+        incremental entre turnos e só muda no início quando a personalidade
+        ou o resumo mudam, ou quando o histórico precisa ser cortado para
+        caber no orçamento de tokens do contexto.
+        
         Args:
             user_input: Mensagem do usuário
             
         Returns:
             Lista de mensagens formatadas para a API
         """
-        messages = []
+        self._apply_summary()
         
-        # Adicionar prompt do sistema com a personalidade atual
+        # Prompt do sistema com a personalidade atual
         system_prompt = get_personality_prompt(self.current_personality)
-        messages.append({
-            "role": "system",
-            "content": system_prompt
-        })
+        budget = self.history_token_budget(system_prompt, user_input)
+        
+        summary_message = self._summary_message()
+        if summary_message:
+            budget = max(budget - count_message_tokens(summary_message['content']), 0)
         
-        # Adicionar histórico da conversa (apenas conteúdo, sem timestamp)
-        for msg in self.conversation_memory:
-            if msg['role'] in ['user', 'assistant']:
-                messages.append({
-                    "role": msg['role'],
-                    "content": msg['content']
-                })
+        def head() -> List[Dict[str, str]]:
+            messages = [{"role": "system", "content": system_prompt}]
+            if summary_message:
+                messages.append(summary_message)
+            return messages
+        
+        head_key = (self.current_personality, self.history_summary, self._memory_generation)
+        prefix = self.prompt_prefix.build(head_key, head, self.conversation_memory, budget)
         
         # Adicionar mensagem atual do usuário
-        messages.append({
+        messages = prefix + [{
             "role": "user",
             "content": user_input
-        })
+        }]
         
+        self.prompt_prefix.record_request(messages)
         return messages
     
-    def generate_response(self, user_input: str) -> str:
+    def get_prefix_stats(self) -> Dict[str, Any]:
+        """
+        Retorna quanto do prompt de cada requisição foi reaproveitado da anterior.
+        
+        Returns:
+            Dicionário com mensagens/caracteres reaproveitados e taxas de reuso
+        """
+        return self.prompt_prefix.stats()
+    
+    def _completion_params(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Monta os parâmetros da chamada à API do OpenAI.
+        
+        Args:
+            messages: Mensagens já preparadas para a API
+            
+        Returns:
+            Dicionário com os parâmetros da requisição
+        """
+        return {
+            "model": self.config.get('openai_model', 'gpt-3.5-turbo'),
+            "messages": messages,
+            "max_tokens": self.config.get('max_tokens', 150),
+            "temperature": self.config.get('temperature', 0.7),
+            "top_p": self.config.get('top_p', 1.0),
+            "frequency_penalty": 0.0,
+            "presence_penalty": 0.0
+        }
+    
+    def _reserve_rate_limit(self, messages: List[Dict[str, str]],
+                            max_tokens: Optional[int] = None) -> int:
+        """
+        Consome uma requisição do limite e reserva na cota diária os tokens
+        que a chamada pode usar (prompt + max_tokens).
+        
+        Args:
+            messages: Mensagens já preparadas para a API
+            max_tokens: Limite da resposta (padrão: 'max_tokens' da configuração)
+        
+        Returns:
+            Tokens reservados (0 se não há limite de tokens)
+        
+        Raises:
+            RateLimitExceeded: Se o limite ou a cota foram atingidos
+        """
+        reserved = 0
+        if self.rate_limiter.tokens_per_day:
+            reserved = sum(count_message_tokens(msg['content']) for msg in messages)
+            reserved += REPLY_OVERHEAD_TOKENS + (max_tokens or self.config.get('max_tokens', 150))
+        self.rate_limiter.acquire(self.rate_limit_key, reserved)
+        return reserved
+    
+    def _settle_rate_limit(self, reserved: int, response: Any = None,
+                           reply: Optional[str] = None, max_tokens: Optional[int] = None) -> None:
+        """
+        Troca a reserva de tokens pelo uso real da chamada.
+        
+        Usa 'usage.total_tokens' da resposta quando disponível; sem ele, conta
+        os tokens da resposta. Sem resposta (falha), devolve a reserva.
+        
+        Args:
+            reserved: Tokens reservados por _reserve_rate_limit
+            response: Resposta da API (não streaming)
+            reply: Texto da resposta
+            max_tokens: Limite da resposta usado na reserva
+        """
+        if not reserved:
+            return
+        
+        total_tokens = getattr(getattr(response, 'usage', None), 'total_tokens', None)
+        if isinstance(total_tokens, int):
+            used = total_tokens
+        elif reply is not None:
+            used = reserved - (max_tokens or self.config.get('max_tokens', 150)) + count_tokens(reply)
+        else:
+            used = 0
+        self.rate_limiter.adjust_tokens(self.rate_limit_key, used - reserved)
+    
+    def _cache_key(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Calcula a chave de cache da requisição.
+        
+        Respostas amostradas (temperature > 0) não são cacheadas, a menos que
+        'cache_sampled_responses' esteja habilitado.
+        
+        Args:
+            messages: Mensagens já preparadas para a API
+            
+        Returns:
+            Chave do cache ou None se o cache não se aplica
+        """
+        if not self.config.get('cache_enabled', True):
+            return None
+        
+        params = self._completion_params(messages)
+        if params['temperature'] > 0 and not self.config.get('cache_sampled_responses', False):
+            return None
+        
+        return ResponseCache.make_key(
+            params['model'],
+            params['temperature'],
+            params['top_p'],
+            params['max_tokens'],
+            messages
+        )
+    
+    @staticmethod
+    def _error_message(error: Exception) -> str:
+        """
+        Converte uma exceção da API em mensagem amigável para o usuário.
+        
+        Args:
+            error: Exceção capturada
+            
+        Returns:
+            Mensagem de erro formatada
+        """
+        if isinstance(error, openai.AuthenticationError):
+            return "❌ Erro de autenticação: Verifique sua API Key do OpenAI."
+        
+        if isinstance(error, RateLimitExceeded):
+            if error.limit == 'tokens':
+                return "📊 Cota diária de tokens esgotada. Tente novamente amanhã."
+            return f"⏳ Limite de requisições atingido. Tente novamente em {max(1, round(error.retry_after))}s."
+        
+        if isinstance(error, CircuitOpenError):
+            return "🚧 Serviço do OpenAI temporariamente indisponível. Tente novamente em instantes."
+        
+        if isinstance(error, openai.RateLimitError):
+            return "⏳ Limite de requisições atingido. Tente novamente em alguns minutos."
+        
+        if isinstance(error, openai.APIError):
+            return f"❌ Erro na API do OpenAI: {str(error)}"
+        
+        return f"❌ Erro inesperado: {str(error)}"
+    
+    def _complete(self, messages: List[Dict[str, str]], use_cache: bool = True) -> str:
+        """
+        Obtém a resposta para mensagens já preparadas, consultando o cache e
+        respeitando os limites de uso, sem alterar a memória da conversa.
+        
+        Args:
+            messages: Mensagens já preparadas para a API
+            use_cache: Se False, ignora o cache de respostas nesta requisição
+            
+        Returns:
+            Resposta gerada (ou do cache)
+        """
+        # Consultar o cache de respostas
+        cache_key = self._cache_key(messages) if use_cache else None
+        cached_response = self.response_cache.get(cache_key) if cache_key else None
+        if cached_response is not None:
+            return cached_response
+        
+        # Fazer chamada para a API do OpenAI, dentro dos limites de uso
+        reserved = self._reserve_rate_limit(messages)
+        try:
+            response = self.client.chat_completion(**self._completion_params(messages))
+        except Exception:
+            self._settle_rate_limit(reserved)
+            raise
+        
+        # Extrair resposta
+        assistant_response = response.choices[0].message.content.strip()
+        self._settle_rate_limit(reserved, response, assistant_response)
+        
+        if cache_key:
+            self.response_cache.set(cache_key, assistant_response)
+        return assistant_response
+    
+    def _respond(self, user_input: str, use_cache: bool = True) -> str:
+        """
+        Gera uma resposta, propagando erros da API.
+        
+        Args:
+            user_input: Mensagem do usuário
+            use_cache: Se False, ignora o cache de respostas nesta requisição
+            
+        Returns:
+            Resposta gerada pelo chatbot
+        """
+        # Preparar mensagens para a API (antes de registrar a entrada,
+        # para não enviar a mensagem do usuário duas vezes)
+        messages = self.prepare_messages(user_input)
+        
+        # Adicionar mensagem do usuário à memória
+        self.add_to_memory("user", user_input)
+        
+        assistant_response = self._complete(messages, use_cache)
+        
+        # Adicionar resposta à memória
+        self.add_to_memory("assistant", assistant_response)
+        self.maybe_summarize_history()
+        
+        return assistant_response
+    
+    def generate_response(self, user_input: str, use_cache: bool = True) -> str:
         """
         Gera uma resposta usando a API do OpenAI.
         
         Args:
             user_input: Mensagem do usuário
+            use_cache: Se False, ignora o cache de respostas nesta requisição
             
         Returns:
             Resposta gerada pelo chatbot
         """
         try:
-            # Adicionar mensagem do usuário à memória
-            self.add_to_memory("user", user_input)
-            
-            # Preparar mensagens para a API
-            messages = self.prepare_messages(user_input)
-            
-            # Fazer chamada para a API do OpenAI
-            response = openai.ChatCompletion.create(
-                model=self.config.get('openai_model', 'gpt-3.5-turbo'),
-                messages=messages,
-                max_tokens=self.config.get('max_tokens', 150),
-                temperature=self.config.get('temperature', 0.7),
-                top_p=self.config.get('top_p', 1.0),
-                frequency_penalty=0.0,
-                presence_penalty=0.0
-            )
+            return self._respond(user_input, use_cache)
+        except Exception as e:
+            return self._error_message(e)
+    
+    @staticmethod
+    def _batch_messages(personality: str, prompt: str) -> List[Dict[str, str]]:
+        """
+        Monta as mensagens de um item de lote: só o prompt do sistema da
+        personalidade e o próprio prompt, sem histórico nem resumo.
+        
+        Args:
+            personality: Personalidade a usar
+            prompt: Mensagem a responder
             
-            # Extrair resposta
-            assistant_response = response.choices[0].message.content.strip()
+        Returns:
+            Lista de mensagens formatadas para a API
+        """
+        return [
+            {"role": "system", "content": get_personality_prompt(personality)},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def generate_many(self, prompts: List[str], personality: Optional[str] = None,
+                      max_concurrency: int = 4, use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Gera respostas para vários prompts em paralelo.
+        
+        Cada prompt é respondido com um contexto de conversa próprio (sem
+        histórico), e a memória desta instância não é alterada. Itens
+        recusados pelo limite de requisições aguardam 'retry_after' e são
+        tentados de novo; a cota diária esgotada vira erro do item.
+        
+        Args:
+            prompts: Lista de mensagens a responder
+            personality: Personalidade a usar (padrão: a personalidade atual)
+            max_concurrency: Número máximo de requisições simultâneas
+            use_cache: Se False, ignora o cache de respostas
             
-            # Adicionar resposta à memória
-            self.add_to_memory("assistant", assistant_response)
+        Returns:
+            Lista de resultados na mesma ordem dos prompts, cada um com
+            'index', 'prompt', 'personality', 'response', 'error' e 'latency'
+        """
+        personality = personality or self.current_personality
+        
+        def run(item) -> Dict[str, Any]:
+            index, prompt = item
+            start = time.perf_counter()
+            response, error = None, None
+            while True:
+                try:
+                    response = self._complete(self._batch_messages(personality, prompt), use_cache)
+                except RateLimitExceeded as e:
+                    if e.limit == 'requests':
+                        # Em lote, esperar a reposição do balde em vez de falhar o item
+                        time.sleep(e.retry_after)
+                        continue
+                    error = f"{type(e).__name__}: {e}"
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                break
             
-            return assistant_response
+            return {
+                "index": index,
+                "prompt": prompt,
+                "personality": personality,
+                "response": response,
+                "error": error,
+                "latency": time.perf_counter() - start
+            }
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            return list(executor.map(run, enumerate(prompts)))
+    
+    def stream_response(self, user_input: str, use_cache: bool = True) -> Iterator[str]:
+        """
+        Gera uma resposta em modo streaming, entregando os trechos à medida
+        que chegam da API do OpenAI.
+        
+        A resposta completa só é gravada na memória da conversa quando o
+        stream termina; em caso de erro ou se o consumidor parar de iterar,
+        nada é gravado como resposta do assistente e a cota é acertada com
+        o texto já gerado.
+        
+        Respostas em cache são entregues de uma só vez, como um único trecho.
+        
+        Args:
+            user_input: Mensagem do usuário
+            use_cache: Se False, ignora o cache de respostas nesta requisição
             
-        except openai.error.AuthenticationError:
-            return "❌ Erro de autenticação: Verifique sua API Key do OpenAI."
+        Yields:
+            Trechos (deltas) da resposta
         
-        except openai.error.RateLimitError:
-            return "⏳ Limite de requisições atingido. Tente novamente em alguns minutos."
+        Raises:
+            ResponseStreamError: Se a geração falha (os trechos já entregues
+                não formam uma resposta)
+        """
+        messages = self.prepare_messages(user_input)
+        self.add_to_memory("user", user_input)
         
-        except openai.error.APIError as e:
-            return f"❌ Erro na API do OpenAI: {str(e)}"
+        cache_key = self._cache_key(messages) if use_cache else None
+        cached_response = self.response_cache.get(cache_key) if cache_key else None
+        if cached_response is not None:
+            self.add_to_memory("assistant", cached_response)
+            self.maybe_summarize_history()
+            yield cached_response
+            return
         
+        chunks = []
+        reserved = 0
+        stream = None
+        completed = False
+        try:
+            reserved = self._reserve_rate_limit(messages)
+            stream = self.client.chat_completion(
+                stream=True,
+                **self._completion_params(messages)
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+            
+            completed = True
         except Exception as e:
-            return f"❌ Erro inesperado: {str(e)}"
+            raise ResponseStreamError(self._error_message(e)) from e
+        finally:
+            if not completed:
+                # Erro ou consumidor que parou de iterar (GeneratorExit): a
+                # reserva é trocada pelo que foi gerado até aqui
+                self._settle_rate_limit(reserved, reply="".join(chunks) if chunks else None)
+                if hasattr(stream, 'close'):
+                    stream.close()
+        
+        # Adicionar resposta completa à memória
+        assistant_response = "".join(chunks).strip()
+        self._settle_rate_limit(reserved, reply=assistant_response)
+        self.add_to_memory("assistant", assistant_response)
+        self.maybe_summarize_history()
+        
+        if cache_key:
+            self.response_cache.set(cache_key, assistant_response)
     
     def get_conversation_summary(self) -> Dict[str, Any]:
         """
@@ -168,17 +674,15 @@ class ChatbotAI:
         Returns:
             Dicionário com estatísticas da conversa
         """
-        total_messages = len(self.conversation_memory)
-        user_messages = len([msg for msg in self.conversation_memory if msg['role'] == 'user'])
-        assistant_messages = len([msg for msg in self.conversation_memory if msg['role'] == 'assistant'])
+        stats = conversation_stats(self.conversation_memory)
         
         return {
-            "total_messages": total_messages,
-            "user_messages": user_messages,
-            "assistant_messages": assistant_messages,
+            "total_messages": stats["total_messages"],
+            "user_messages": stats["user_messages"],
+            "assistant_messages": stats["assistant_messages"],
             "current_personality": self.current_personality,
-            "start_time": self.conversation_memory[0]['timestamp'] if self.conversation_memory else None,
-            "last_message_time": self.conversation_memory[-1]['timestamp'] if self.conversation_memory else None
+            "start_time": stats["start_time"],
+            "last_message_time": stats["end_time"]
         }
     
     def export_conversation(self) -> str:
@@ -190,7 +694,8 @@ class ChatbotAI:
         """
         export_data = {
             "conversation_summary": self.get_conversation_summary(),
-            "messages": self.conversation_memory,
+            "messages": self.conversation_memory.to_list(),
+            "history_summary": self.history_summary,
             "export_timestamp": datetime.now().isoformat(),
             "chatbot_config": {
                 "personality": self.current_personality,
@@ -0,0 +1,219 @@
+"""
+Ferramentas de linha de comando do AI Chatbot Brasileiro
+
+Uso:
+    python -m src.cli [--db CAMINHO] search-backfill
+    python -m src.cli [--db CAMINHO] cleanup --days 30 [--batch-size 500]
+    python -m src.cli [--db CAMINHO] vacuum
+    python -m src.cli [--db CAMINHO] compress [--samples 5000] [--dict-size 16384]
+    python -m src.cli [--db CAMINHO] export SAIDA.ndjson.gz [--personality P] [--since DATA] [--until DATA]
+    python -m src.cli [--db CAMINHO] import ARQUIVOS_OU_DIRETÓRIOS... [--workers N] [--state ESTADO]
+    python -m src.cli reshard --source data/conversations.db --target data/shards --shards 8
+"""
+
+import argparse
+import os
+import sys
+from typing import Any, List, Optional
+
+from .cache import ResponseCache
+from .config import load_config
+from .export import export_ndjson
+from .importer import bulk_import
+from .sharding import AnyConversationDB, ShardedConversationDB, open_database
+from .sharding import reshard as reshard_database
+
+def _open_database(args: argparse.Namespace, **overrides: Any) -> AnyConversationDB:
+    """Abre o banco indicado em --db (arquivo ou diretório de shards) ou o configurado no ambiente."""
+    config = load_config()
+    config['db_write_behind'] = False
+    config.update(overrides)
+    if args.db:
+        if os.path.isdir(args.db):
+            config['db_shard_dir'] = args.db
+            config['db_shards'] = None
+            return ShardedConversationDB.from_config(config)
+        config['database_path'] = args.db
+        config['db_shards'] = 1
+    return open_database(config)
+
+def search_backfill(args: argparse.Namespace) -> int:
+    """Reindexa todas as mensagens no índice de busca."""
+    db = _open_database(args)
+    try:
+        count = db.rebuild_search_index()
+    finally:
+        db.close()
+    
+    print(f"{count} mensagens indexadas")
+    return 0
+
+def cleanup(args: argparse.Namespace) -> int:
+    """Remove conversas antigas em lotes, respostas expiradas do cache e libera o espaço."""
+    db = _open_database(args)
+    try:
+        report = db.cleanup_old_conversations(days_old=args.days, batch_size=args.batch_size)
+    finally:
+        db.close()
+    
+    # O cache de respostas fica no arquivo de DATABASE_PATH (também com shards)
+    cache_path = args.db if args.db and not os.path.isdir(args.db) else load_config()['database_path']
+    purged = ResponseCache(db_path=cache_path).purge_expired() if os.path.exists(cache_path) else 0
+    
+    print(f"{report['conversations']} conversas e {report['messages']} mensagens removidas "
+          f"em {report['batches']} lotes; {report['bytes_reclaimed'] / 1024:.1f} KiB liberados; "
+          f"{purged} respostas expiradas removidas do cache")
+    return 0
+
+def vacuum(args: argparse.Namespace) -> int:
+    """Executa um VACUUM completo, habilitando o incremental_vacuum."""
+    db = _open_database(args)
+    try:
+        reclaimed = db.vacuum()
+    finally:
+        db.close()
+    
+    print(f"{reclaimed / 1024:.1f} KiB liberados")
+    return 0
+
+def compress(args: argparse.Namespace) -> int:
+    """Treina um dicionário de compressão e regrava as mensagens existentes."""
+    db = _open_database(args, db_compression=True)
+    try:
+        db.train_compression_dictionary(samples=args.samples, dict_size=args.dict_size)
+        report = db.recompress_messages()
+    finally:
+        db.close()
+    
+    ratio = report['bytes_after'] / report['bytes_before'] if report['bytes_before'] else 1.0
+    print(f"{report['rewritten']} de {report['messages']} mensagens regravadas; conteúdo "
+          f"{report['bytes_before'] / 1024:.1f} KiB -> {report['bytes_after'] / 1024:.1f} KiB ({ratio:.0%})")
+    return 0
+
+def export(args: argparse.Namespace) -> int:
+    """Exporta conversas em NDJSON (gzip se a saída terminar em .gz)."""
+    def progress(count: int) -> None:
+        if count % 1000 == 0:
+            print(f"\r{count} conversas exportadas", end="", file=sys.stderr, flush=True)
+    
+    db = _open_database(args)
+    try:
+        report = export_ndjson(
+            db,
+            sys.stdout.buffer if args.output == "-" else args.output,
+            compress=True if args.gzip else None,
+            progress=progress,
+            conversation_ids=args.conversation or None,
+            personality=args.personality,
+            created_after=args.since,
+            created_before=args.until
+        )
+    finally:
+        db.close()
+    
+    print(f"\r{report['conversations']} conversas e {report['messages']} mensagens exportadas "
+          f"({report['bytes'] / 1024:.1f} KiB)", file=sys.stderr)
+    return 0
+
+def import_archive(args: argparse.Namespace) -> int:
+    """Importa conversas exportadas de muitos arquivos."""
+    def progress(report: dict) -> None:
+        print(f"\r{report['files_imported']} arquivos, {report['conversations']} conversas importadas",
+              end="", file=sys.stderr, flush=True)
+    
+    db = _open_database(args)
+    try:
+        report = bulk_import(
+            db,
+            args.paths,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            state_path=args.state,
+            default_personality=args.personality,
+            progress=progress
+        )
+    finally:
+        db.close()
+    
+    print(f"\r{report['files_imported']} de {report['files']} arquivos importados "
+          f"({report['files_skipped']} já importados antes): {report['conversations']} conversas, "
+          f"{report['messages']} mensagens, {report['duplicates']} duplicadas ignoradas", file=sys.stderr)
+    if report['files_failed']:
+        print(f"  {report['files_failed']} arquivos com erro de leitura; serão tentados de novo com --state",
+              file=sys.stderr)
+    if report['conflicts']:
+        print(f"  {report['conflicts']} conversas não gravadas: o id já existe com outro conteúdo",
+              file=sys.stderr)
+    for error in report['errors']:
+        print(f"  erro: {error}", file=sys.stderr)
+    if report['error_count'] > len(report['errors']):
+        print(f"  ... e mais {report['error_count'] - len(report['errors'])} erros", file=sys.stderr)
+    return 1 if report['error_count'] or report['conflicts'] else 0
+
+def reshard(args: argparse.Namespace) -> int:
+    """Copia as conversas para um novo conjunto de shards."""
+    def progress(count: int) -> None:
+        print(f"\r{count} conversas copiadas", end="", flush=True)
+    
+    copied = reshard_database(args.source, args.target, args.shards,
+                              batch_size=args.batch_size, progress=progress)
+    print(f"\r{copied['conversations']} conversas e {copied['messages']} mensagens "
+          f"copiadas para {args.shards} shards em {args.target}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    """Cria o parser com os subcomandos disponíveis."""
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="Arquivo do banco SQLite ou diretório de shards (padrão: configuração)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    backfill = subparsers.add_parser("search-backfill", help="Reconstrói o índice de busca das mensagens")
+    backfill.set_defaults(handler=search_backfill)
+    
+    retention = subparsers.add_parser("cleanup", help="Remove conversas antigas")
+    retention.add_argument("--days", type=int, default=30, help="Idade mínima das conversas removidas (dias)")
+    retention.add_argument("--batch-size", type=int, default=500, help="Conversas removidas por transação")
+    retention.set_defaults(handler=cleanup)
+    
+    full_vacuum = subparsers.add_parser("vacuum", help="Compacta o banco (bloqueia durante a execução)")
+    full_vacuum.set_defaults(handler=vacuum)
+    
+    compressing = subparsers.add_parser("compress", help="Treina o dicionário e comprime as mensagens existentes")
+    compressing.add_argument("--samples", type=int, default=5000, help="Mensagens usadas no treino")
+    compressing.add_argument("--dict-size", type=int, default=16 * 1024, help="Tamanho do dicionário (bytes)")
+    compressing.set_defaults(handler=compress)
+    
+    exporting = subparsers.add_parser("export", help="Exporta conversas em NDJSON, opcionalmente com gzip")
+    exporting.add_argument("output", help="Arquivo de saída (.ndjson ou .ndjson.gz; '-' = saída padrão)")
+    exporting.add_argument("--conversation", action="append", help="ID de uma conversa (pode repetir)")
+    exporting.add_argument("--personality", help="Só conversas desta personalidade")
+    exporting.add_argument("--since", help="Só conversas criadas a partir desta data (ISO)")
+    exporting.add_argument("--until", help="Só conversas criadas antes desta data (ISO)")
+    exporting.add_argument("--gzip", action="store_true", help="Comprimir mesmo sem a extensão .gz")
+    exporting.set_defaults(handler=export)
+    
+    importing = subparsers.add_parser("import", help="Importa conversas exportadas (JSON, NDJSON, gzip)")
+    importing.add_argument("paths", nargs="+", help="Arquivos, diretórios ou padrões glob")
+    importing.add_argument("--workers", type=int, help="Processos que interpretam os arquivos (padrão: CPUs)")
+    importing.add_argument("--batch-size", type=int, default=1000, help="Conversas gravadas por transação")
+    importing.add_argument("--state", help="Arquivo de estado para retomar uma importação interrompida")
+    importing.add_argument("--personality", default="assistente_geral",
+                           help="Personalidade das conversas que não têm uma")
+    importing.set_defaults(handler=import_archive)
+    
+    resharding = subparsers.add_parser("reshard", help="Redistribui as conversas em N arquivos (shards)")
+    resharding.add_argument("--source", required=True, help="Arquivo .db ou diretório de shards de origem")
+    resharding.add_argument("--target", required=True, help="Diretório de destino (vazio)")
+    resharding.add_argument("--shards", type=int, required=True, help="Número de shards do destino")
+    resharding.add_argument("--batch-size", type=int, default=500, help="Conversas copiadas por transação")
+    resharding.set_defaults(handler=reshard)
+    
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando."""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
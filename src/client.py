@@ -0,0 +1,318 @@
+"""
+Cliente OpenAI por instância e pools de conexões HTTP compartilhados
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import openai
+
+from .resilience import RetryPolicy
+
+def _split_list(value: Any) -> List[str]:
+    """Converte 'a, b' ou ['a', 'b'] em uma lista sem itens vazios."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [item.strip() for item in value if item and item.strip()]
+
+class ConnectionPool:
+    """
+    Pool compartilhado de conexões HTTP síncronas com keep-alive.
+    
+    Um único httpx.Client (thread-safe) é passado aos clientes openai.OpenAI
+    de todos os chatbots com o mesmo dimensionamento, para que as threads do
+    processo reaproveitem conexões abertas sem alterar o estado global da
+    biblioteca do OpenAI.
+    """
+    
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 100):
+        """
+        Inicializa o pool (o cliente HTTP é criado sob demanda).
+        
+        Args:
+            pool_connections: Máximo de conexões ociosas mantidas abertas
+            pool_maxsize: Máximo de conexões abertas ao mesmo tempo
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        
+        self._client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+    
+    def get_client(self) -> httpx.Client:
+        """
+        Retorna o cliente HTTP compartilhado, criando-o se necessário.
+        
+        Returns:
+            Cliente httpx pronto para uso
+        """
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(limits=httpx.Limits(
+                    max_connections=self.pool_maxsize,
+                    max_keepalive_connections=self.pool_connections
+                ))
+            return self._client
+    
+    def close(self) -> None:
+        """Fecha o cliente HTTP e libera as conexões."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client = None
+
+class AsyncClientPool:
+    """
+    Pool compartilhado de conexões HTTP assíncronas com keep-alive.
+    
+    Um único httpx.AsyncClient é reaproveitado por todos os clientes que
+    compartilham o pool, de modo que um processo consegue atender centenas
+    de conversas simultâneas sem abrir uma conexão nova por requisição.
+    """
+    
+    def __init__(
+        self,
+        limit: int = 100,
+        keepalive_timeout: float = 30.0,
+        request_timeout: float = 60.0
+    ):
+        """
+        Inicializa o pool (o cliente HTTP é criado sob demanda).
+        
+        Args:
+            limit: Número máximo de conexões simultâneas
+            keepalive_timeout: Tempo em segundos para manter conexões ociosas
+            request_timeout: Tempo máximo em segundos por requisição
+        """
+        self.limit = limit
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        
+        # Um cliente por event loop: clientes assíncronos pertencem ao loop em que foram criados
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+    
+    async def get_client(self) -> httpx.AsyncClient:
+        """
+        Retorna o cliente HTTP compartilhado do event loop atual, criando-o se necessário.
+        
+        Cada loop (por exemplo, um por chamada de asyncio.run) tem seu próprio
+        cliente; os de loops já encerrados são descartados aqui, já que não
+        podem mais ser fechados de forma assíncrona.
+        
+        Returns:
+            Cliente httpx pronto para uso
+        """
+        loop = asyncio.get_running_loop()
+        
+        for other in [other for other in self._clients if other.is_closed()]:
+            del self._clients[other]
+        
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.limit,
+                    keepalive_expiry=self.keepalive_timeout
+                ),
+                timeout=self.request_timeout
+            )
+            self._clients[loop] = client
+        
+        return client
+    
+    async def close(self) -> None:
+        """Fecha o cliente do event loop atual e libera as conexões."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+_connection_pools: Dict[tuple, ConnectionPool] = {}
+_pool_lock = threading.Lock()
+_default_async_pool = AsyncClientPool()
+
+def get_connection_pool(config: Optional[Dict[str, Any]] = None) -> ConnectionPool:
+    """
+    Retorna o pool síncrono compartilhado pelos clientes com o mesmo dimensionamento.
+    
+    O timeout, a URL base e as credenciais ficam em cada openai.OpenAI (ver
+    OpenAIClient), então só o tamanho do pool distingue um pool de outro.
+    
+    Args:
+        config: Configurações usadas para dimensionar o pool
+        
+    Returns:
+        Instância compartilhada de ConnectionPool
+    """
+    config = config or {}
+    key = (config.get('http_pool_connections', 10), config.get('http_pool_maxsize', 100))
+    
+    with _pool_lock:
+        if key not in _connection_pools:
+            _connection_pools[key] = ConnectionPool(pool_connections=key[0], pool_maxsize=key[1])
+        return _connection_pools[key]
+
+def get_default_pool() -> AsyncClientPool:
+    """
+    Retorna o pool de conexões assíncronas padrão do processo.
+    
+    Returns:
+        Instância compartilhada de AsyncClientPool
+    """
+    return _default_async_pool
+
+class OpenAIClient:
+    """
+    Cliente da API do OpenAI com credenciais, endpoint e timeout próprios.
+    
+    Nada é gravado no estado global da biblioteca (openai.api_key etc.):
+    cada chave usa seus próprios objetos openai.OpenAI/AsyncOpenAI, montados
+    sobre os pools HTTP compartilhados, então chatbots com chaves,
+    organizações ou URLs diferentes podem rodar em paralelo no mesmo processo.
+    
+    As chamadas passam pela política de resiliência: novas tentativas com
+    backoff, failover entre as chaves e modelos reserva configurados e
+    circuit breaker por endpoint.
+    """
+    
+    def __init__(
+        self,
+        api_key: str,
+        organization: Optional[str] = None,
+        api_base: Optional[str] = None,
+        request_timeout: Optional[float] = 60.0,
+        async_pool: Optional[AsyncClientPool] = None,
+        connection_pool: Optional[ConnectionPool] = None,
+        extra_api_keys: Optional[List[str]] = None,
+        fallback_models: Optional[List[str]] = None,
+        retry_policy: Optional[RetryPolicy] = None
+    ):
+        """
+        Inicializa o cliente.
+        
+        Args:
+            api_key: Chave da API do OpenAI
+            organization: Organização do OpenAI (opcional)
+            api_base: URL base da API (ex.: um servidor local para testes)
+            request_timeout: Tempo máximo em segundos por requisição
+            async_pool: Pool assíncrono a usar (padrão: pool compartilhado)
+            connection_pool: Pool síncrono a usar (padrão: pool compartilhado)
+            extra_api_keys: Chaves reserva, usadas em ordem após a principal
+            fallback_models: Modelos reserva, usados em ordem após o solicitado
+            retry_policy: Política de novas tentativas (padrão: RetryPolicy())
+        """
+        self.api_key = api_key
+        self.organization = organization
+        self.api_base = api_base
+        self.request_timeout = request_timeout
+        self.async_pool = async_pool or get_default_pool()
+        self.connection_pool = connection_pool or get_connection_pool()
+        self.api_keys = [api_key] + [key for key in (extra_api_keys or []) if key != api_key]
+        self.fallback_models = list(fallback_models or [])
+        self.retry_policy = retry_policy or RetryPolicy()
+        
+        # Clientes da biblioteca por chave, com o cliente HTTP em que foram montados
+        self._clients: Dict[str, Tuple[httpx.Client, openai.OpenAI]] = {}
+        self._async_clients: Dict[str, Tuple[httpx.AsyncClient, openai.AsyncOpenAI]] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], async_pool: Optional[AsyncClientPool] = None) -> "OpenAIClient":
+        """
+        Cria um cliente a partir das configurações do chatbot.
+        
+        Args:
+            config: Dicionário com configurações
+            async_pool: Pool assíncrono a usar (opcional)
+            
+        Returns:
+            Cliente configurado
+        """
+        return cls(
+            api_key=config['openai_api_key'],
+            organization=config.get('openai_organization'),
+            api_base=config.get('openai_api_base'),
+            request_timeout=config.get('request_timeout', 60.0),
+            async_pool=async_pool,
+            connection_pool=get_connection_pool(config),
+            extra_api_keys=_split_list(config.get('openai_api_keys')),
+            fallback_models=_split_list(config.get('fallback_models')),
+            retry_policy=RetryPolicy.from_config(config)
+        )
+    
+    def _client_options(self, api_key: str) -> Dict[str, Any]:
+        """Credenciais e transporte dos clientes da biblioteca para uma chave."""
+        return {
+            "api_key": api_key,
+            "organization": self.organization or None,
+            "base_url": self.api_base or None,
+            "timeout": self.request_timeout,
+            # As novas tentativas ficam a cargo da RetryPolicy
+            "max_retries": 0
+        }
+    
+    def _sync_client(self, api_key: str) -> openai.OpenAI:
+        """Cliente síncrono da biblioteca para uma chave, sobre o pool compartilhado."""
+        http_client = self.connection_pool.get_client()
+        with self._lock:
+            cached = self._clients.get(api_key)
+            if cached is None or cached[0] is not http_client:
+                cached = (http_client, openai.OpenAI(http_client=http_client, **self._client_options(api_key)))
+                self._clients[api_key] = cached
+            return cached[1]
+    
+    async def _async_client(self, api_key: str) -> openai.AsyncOpenAI:
+        """Cliente assíncrono da biblioteca para uma chave, sobre o pool do event loop atual."""
+        http_client = await self.async_pool.get_client()
+        cached = self._async_clients.get(api_key)
+        if cached is None or cached[0] is not http_client:
+            cached = (http_client, openai.AsyncOpenAI(http_client=http_client, **self._client_options(api_key)))
+            self._async_clients[api_key] = cached
+        return cached[1]
+    
+    def _candidates(self, model: str) -> List[tuple]:
+        """Pares (chave, modelo) na ordem em que serão tentados."""
+        models = [model] + [m for m in self.fallback_models if m != model]
+        return [(key, m) for m in models for key in self.api_keys]
+    
+    def chat_completion(self, **params: Any) -> Any:
+        """
+        Chama o endpoint de chat completions.
+        
+        Args:
+            **params: Parâmetros da requisição (model, messages, stream...)
+            
+        Returns:
+            Resposta da API (ou iterador de trechos, se stream=True)
+        """
+        model = params.pop('model')
+        
+        def request(api_key: str, candidate_model: str) -> Any:
+            return self._sync_client(api_key).chat.completions.create(model=candidate_model, **params)
+        
+        return self.retry_policy.call(self._candidates(model), self.api_base, request)
+    
+    async def achat_completion(self, **params: Any) -> Any:
+        """
+        Chama o endpoint de chat completions de forma assíncrona, usando o
+        pool de conexões assíncronas do cliente.
+        
+        Args:
+            **params: Parâmetros da requisição (model, messages, stream...)
+            
+        Returns:
+            Resposta da API (ou iterador assíncrono de trechos, se stream=True)
+        """
+        model = params.pop('model')
+        
+        async def request(api_key: str, candidate_model: str) -> Any:
+            client = await self._async_client(api_key)
+            return await client.chat.completions.create(model=candidate_model, **params)
+        
+        return await self.retry_policy.acall(self._candidates(model), self.api_base, request)
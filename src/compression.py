@@ -0,0 +1,210 @@
+"""
+Compressão do conteúdo das mensagens do AI Chatbot Brasileiro
+
+O conteúdo comprimido é gravado como BLOB no formato:
+    
+    [versão do formato: 1 byte][id do dicionário: 4 bytes][dados comprimidos]
+
+Versão 1 usa zlib (biblioteca padrão) com o dicionário como 'zdict';
+versão 2 usa zstd com dicionário treinado (requer o pacote opcional
+'zstandard'). O id 0 indica compressão sem dicionário. Conteúdo em TEXT
+(mensagens antigas ou que não ficam menores comprimidas) é lido como está.
+"""
+
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
+
+FORMAT_ZLIB = 1
+FORMAT_ZSTD = 2
+
+CODEC_FORMATS = {"zlib": FORMAT_ZLIB, "zstd": FORMAT_ZSTD}
+
+HEADER = struct.Struct(">BI")
+
+# A janela do zlib é de 32 KiB: um dicionário maior não é aproveitado
+ZLIB_MAX_DICT_SIZE = 32 * 1024
+
+def default_codec() -> str:
+    """Codec preferido no ambiente: zstd se disponível, senão zlib."""
+    return "zstd" if zstandard is not None else "zlib"
+
+def train_dictionary(samples: List[str], size: int = 16 * 1024, codec: Optional[str] = None) -> bytes:
+    """
+    Treina um dicionário de compressão a partir de mensagens de exemplo.
+    
+    Com zstd usa o treinador da biblioteca; com zlib monta o dicionário com
+    as palavras e expressões que mais economizam bytes nas amostras, com as
+    mais valiosas no fim (mais perto dos dados, onde o zlib as encontra).
+    
+    Args:
+        samples: Conteúdos de mensagens
+        size: Tamanho máximo do dicionário em bytes
+        codec: 'zlib' ou 'zstd' (padrão: default_codec())
+    
+    Returns:
+        Dicionário em bytes
+    """
+    codec = codec or default_codec()
+    encoded = [sample.encode('utf-8') for sample in samples if sample]
+    
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("O codec zstd requer o pacote 'zstandard'")
+        return zstandard.train_dictionary(size, encoded).as_bytes()
+    
+    size = min(size, ZLIB_MAX_DICT_SIZE)
+    counts: Counter = Counter()
+    for sample in samples:
+        words = re.findall(r'\S+\s*', sample)
+        for n in (1, 2, 3, 4):
+            for i in range(len(words) - n + 1):
+                counts["".join(words[i:i + n])] += 1
+    
+    # Economia estimada: ocorrências repetidas x tamanho do trecho
+    scored = sorted(
+        ((count - 1) * len(phrase.encode('utf-8')), phrase)
+        for phrase, count in counts.items() if count > 1 and len(phrase) > 3
+    )
+    
+    chosen: List[bytes] = []
+    total = 0
+    for _, phrase in reversed(scored):
+        data = phrase.encode('utf-8')
+        if total + len(data) > size:
+            continue
+        chosen.append(data)
+        total += len(data)
+    
+    return b"".join(reversed(chosen))
+
+class ContentCodec:
+    """
+    Comprime e descomprime o conteúdo das mensagens com dicionários numerados.
+    
+    Os dicionários ficam no banco; 'loader' busca sob demanda os que não
+    estão em memória (por exemplo, treinados por outro processo).
+    """
+    
+    def __init__(self, level: int = 6, loader: Optional[Callable[[int], Optional[Tuple[str, bytes]]]] = None):
+        """
+        Inicializa o codec.
+        
+        Args:
+            level: Nível de compressão
+            loader: Função que recebe o id e retorna (codec, dicionário) ou None
+        """
+        self.level = level
+        self.loader = loader
+        self.current_id = 0
+        self.current_codec = default_codec()
+        self._dictionaries: Dict[int, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def add_dictionary(self, dictionary_id: int, codec: str, data: bytes, current: bool = True) -> None:
+        """
+        Registra um dicionário e, opcionalmente, passa a usá-lo na compressão.
+        
+        Args:
+            dictionary_id: Id do dicionário no banco
+            codec: 'zlib' ou 'zstd'
+            data: Conteúdo do dicionário
+            current: Se True, novas mensagens usam este dicionário
+        """
+        with self._lock:
+            self._dictionaries[dictionary_id] = (codec, data)
+            if current:
+                self.current_id = dictionary_id
+                self.current_codec = codec
+        # Compressores em cache por thread ficam obsoletos
+        self._local = threading.local()
+    
+    def _dictionary(self, dictionary_id: int) -> Tuple[str, bytes]:
+        """Retorna (codec, dicionário), buscando no banco se necessário."""
+        if dictionary_id == 0:
+            return "", b""
+        
+        entry = self._dictionaries.get(dictionary_id)
+        if entry is None and self.loader is not None:
+            entry = self.loader(dictionary_id)
+            if entry is not None:
+                with self._lock:
+                    self._dictionaries[dictionary_id] = entry
+        if entry is None:
+            raise ValueError(f"Dicionário de compressão {dictionary_id} não encontrado")
+        return entry
+    
+    def _zstd_compressor(self) -> "zstandard.ZstdCompressor":
+        """Compressor zstd da thread atual, com o dicionário corrente."""
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            _, data = self._dictionary(self.current_id)
+            dict_data = zstandard.ZstdCompressionDict(data) if data else None
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dict_data)
+            self._local.compressor = compressor
+        return compressor
+    
+    def encode(self, text: str) -> Union[str, bytes]:
+        """
+        Comprime o conteúdo de uma mensagem.
+        
+        Args:
+            text: Conteúdo original
+        
+        Returns:
+            BLOB comprimido ou o próprio texto, se comprimir não reduz o tamanho
+        """
+        raw = text.encode('utf-8')
+        dictionary_id, codec = self.current_id, self.current_codec
+        
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("O codec zstd requer o pacote 'zstandard'")
+            payload = self._zstd_compressor().compress(raw)
+        else:
+            _, data = self._dictionary(dictionary_id)
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15, zdict=data) if data \
+                else zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            payload = compressor.compress(raw) + compressor.flush()
+        
+        blob = HEADER.pack(CODEC_FORMATS[codec], dictionary_id) + payload
+        return blob if len(blob) < len(raw) else text
+    
+    def decode(self, value: Union[str, bytes, None]) -> Optional[str]:
+        """
+        Descomprime o conteúdo de uma mensagem.
+        
+        Args:
+            value: Valor da coluna content (TEXT ou BLOB comprimido)
+        
+        Returns:
+            Conteúdo original
+        """
+        if value is None or isinstance(value, str):
+            return value
+        
+        version, dictionary_id = HEADER.unpack_from(value)
+        payload = value[HEADER.size:]
+        _, data = self._dictionary(dictionary_id)
+        
+        if version == FORMAT_ZLIB:
+            decompressor = zlib.decompressobj(-15, zdict=data) if data else zlib.decompressobj(-15)
+            raw = decompressor.decompress(payload) + decompressor.flush()
+        elif version == FORMAT_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Conteúdo comprimido com zstd: instale o pacote 'zstandard'")
+            dict_data = zstandard.ZstdCompressionDict(data) if data else None
+            raw = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+        else:
+            raise ValueError(f"Formato de compressão desconhecido: {version}")
+        
+        return raw.decode('utf-8')
@@ -19,10 +19,27 @@ def load_config() -> Dict[str, Any]:
     return {
         # OpenAI Configuration
         'openai_api_key': os.getenv('OPENAI_API_KEY'),
+        'openai_api_keys': os.getenv('OPENAI_API_KEYS', ''),
+        'openai_organization': os.getenv('OPENAI_ORGANIZATION'),
+        'openai_api_base': os.getenv('OPENAI_API_BASE'),
         'openai_model': os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
         'max_tokens': int(os.getenv('MAX_TOKENS', 150)),
         'temperature': float(os.getenv('TEMPERATURE', 0.7)),
         'top_p': float(os.getenv('TOP_P', 1.0)),
+        'context_window_tokens': int(os.getenv('CONTEXT_WINDOW_TOKENS', 4096)),
+        
+        # HTTP Connection
+        'request_timeout': float(os.getenv('REQUEST_TIMEOUT', 60)),
+        'http_pool_connections': int(os.getenv('HTTP_POOL_CONNECTIONS', 10)),
+        'http_pool_maxsize': int(os.getenv('HTTP_POOL_MAXSIZE', 100)),
+        
+        # Resilience
+        'fallback_models': os.getenv('OPENAI_FALLBACK_MODELS', ''),
+        'max_retries': int(os.getenv('MAX_RETRIES', 2)),
+        'retry_base_delay': float(os.getenv('RETRY_BASE_DELAY', 0.5)),
+        'retry_max_delay': float(os.getenv('RETRY_MAX_DELAY', 20)),
+        'circuit_failure_threshold': int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+        'circuit_reset_timeout': float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30)),
         
         # Chatbot Settings
         'chatbot_name': os.getenv('CHATBOT_NAME', 'Assistente IA Brasileiro'),
@@ -33,6 +50,18 @@ def load_config() -> Dict[str, Any]:
         
         # Database
         'database_path': os.getenv('DATABASE_PATH', 'data/conversations.db'),
+        'db_cache_size_kb': int(os.getenv('DB_CACHE_SIZE_KB', 8192)),
+        'db_mmap_size_mb': int(os.getenv('DB_MMAP_SIZE_MB', 64)),
+        'db_busy_timeout_ms': int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000)),
+        'db_shards': int(os.getenv('DB_SHARDS', 1)),
+        'db_shard_dir': os.getenv('DB_SHARD_DIR', 'data/shards'),
+        'db_compression': os.getenv('DB_COMPRESSION', 'false').lower() == 'true',
+        'db_compression_level': int(os.getenv('DB_COMPRESSION_LEVEL', 6)),
+        'db_write_behind': os.getenv('DB_WRITE_BEHIND', 'false').lower() == 'true',
+        'db_write_queue_size': int(os.getenv('DB_WRITE_QUEUE_SIZE', 10000)),
+        'db_flush_interval_ms': float(os.getenv('DB_FLUSH_INTERVAL_MS', 50)),
+        'db_flush_max_rows': int(os.getenv('DB_FLUSH_MAX_ROWS', 500)),
+        'db_durability': os.getenv('DB_DURABILITY', 'normal').lower(),
         
         # App Settings
         'app_title': os.getenv('APP_TITLE', '🤖 AI Chatbot Brasileiro'),
@@ -45,9 +74,25 @@ def load_config() -> Dict[str, Any]:
         'show_conversation_history': os.getenv('SHOW_CONVERSATION_HISTORY', 'true').lower() == 'true',
         'max_conversation_history': int(os.getenv('MAX_CONVERSATION_HISTORY', 50)),
         
+        # History Summarization
+        'summarize_history': os.getenv('SUMMARIZE_HISTORY', 'false').lower() == 'true',
+        'summary_threshold': int(os.getenv('SUMMARY_THRESHOLD', 12)),
+        'summary_keep_recent': int(os.getenv('SUMMARY_KEEP_RECENT', 6)),
+        'summary_max_tokens': int(os.getenv('SUMMARY_MAX_TOKENS', 300)),
+        'summary_model': os.getenv('SUMMARY_MODEL'),
+        
+        # Response Cache
+        'cache_enabled': os.getenv('CACHE_ENABLED', 'true').lower() == 'true',
+        'cache_persistent': os.getenv('CACHE_PERSISTENT', 'true').lower() == 'true',
+        'cache_max_entries': int(os.getenv('CACHE_MAX_ENTRIES', 1000)),
+        'cache_ttl_seconds': int(os.getenv('CACHE_TTL_SECONDS', 86400)),
+        'cache_sampled_responses': os.getenv('CACHE_SAMPLED_RESPONSES', 'false').lower() == 'true',
+        
         # Rate Limiting
-        'max_requests_per_minute': int(os.getenv('MAX_REQUESTS_PER_MINUTE', 20)),
-        'max_tokens_per_day': int(os.getenv('MAX_TOKENS_PER_DAY', 10000)),
+        'max_requests_per_minute': int(os.getenv('MAX_REQUESTS_PER_MINUTE', 0)),
+        'max_tokens_per_day': int(os.getenv('MAX_TOKENS_PER_DAY', 0)),
+        'rate_limit_persistent': os.getenv('RATE_LIMIT_PERSISTENT', 'true').lower() == 'true',
+        'rate_limit_key': os.getenv('RATE_LIMIT_KEY'),
     }
 
 def validate_config(config: Dict[str, Any]) -> bool:
@@ -75,7 +120,29 @@ DEFAULT_CONFIG = {
     'max_tokens': 150,
     'temperature': 0.7,
     'top_p': 1.0,
+    'context_window_tokens': 4096,
+    'request_timeout': 60.0,
+    'max_retries': 2,
+    'retry_base_delay': 0.5,
+    'retry_max_delay': 20.0,
     'chatbot_name': 'Assistente IA Brasileiro',
     'database_path': 'data/conversations.db',
+    'db_shards': 1,
+    'db_shard_dir': 'data/shards',
+    'db_compression': False,
+    'db_write_behind': False,
+    'db_durability': 'normal',
     'debug': False,
+    'summarize_history': False,
+    'summary_threshold': 12,
+    'summary_keep_recent': 6,
+    'summary_max_tokens': 300,
+    'cache_enabled': True,
+    'cache_persistent': True,
+    'cache_max_entries': 1000,
+    'cache_ttl_seconds': 86400,
+    'cache_sampled_responses': False,
+    'max_requests_per_minute': 0,
+    'max_tokens_per_day': 0,
+    'rate_limit_persistent': True,
 }
@@ -3,35 +3,204 @@ Gerenciamento do banco de dados para o AI Chatbot Brasileiro
 """
 
 import sqlite3
+import hashlib
 import json
 import os
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple, Union
 import uuid
 
+from .compression import ContentCodec, train_dictionary
+from .writer import AppendItem, BackgroundWriter
+
+def _stored_size(value: Union[str, bytes]) -> int:
+    """Tamanho em bytes de um valor da coluna content."""
+    return len(value) if isinstance(value, bytes) else len(value.encode('utf-8'))
+
+def content_hash(personality: str, messages: Iterable[Dict[str, Any]]) -> str:
+    """
+    Calcula o hash do conteúdo de uma conversa (personalidade e mensagens).
+    
+    Args:
+        personality: Personalidade da conversa
+        messages: Mensagens com 'role', 'content' e 'timestamp'
+    
+    Returns:
+        Hash BLAKE2b de 128 bits em hexadecimal
+    """
+    payload = [personality, [[m['role'], m['content'], m['timestamp']] for m in messages]]
+    encoded = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
 class ConversationDB:
     """
     Classe para gerenciar o banco de dados de conversas.
     """
     
-    def __init__(self, db_path: str = "data/conversations.db"):
+    def __init__(self, db_path: str = "data/conversations.db", cache_size_kb: int = 8192,
+                 mmap_size_mb: int = 64, busy_timeout_ms: int = 5000,
+                 compression: bool = False, compression_level: int = 6):
         """
         Inicializa a conexão com o banco de dados.
         
+        Cada thread mantém uma conexão persistente, aberta na primeira
+        utilização, em modo WAL: leitores não esperam pelo escritor.
+        
         Args:
             db_path: Caminho para o arquivo do banco de dados
+            cache_size_kb: Tamanho do cache de páginas por conexão (KiB)
+            mmap_size_mb: Tamanho máximo do arquivo mapeado em memória (MiB)
+            busy_timeout_ms: Tempo de espera por um lock antes de falhar (ms)
+            compression: Gravar o conteúdo das mensagens comprimido
+            compression_level: Nível de compressão
         """
         self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size_mb = mmap_size_mb
+        self.busy_timeout_ms = busy_timeout_ms
+        self.compression = compression
+        
+        # Conteúdo comprimido é sempre lido, mesmo com a compressão desligada
+        self.codec = ContentCodec(level=compression_level, loader=self._load_dictionary)
+        
+        self._local = threading.local()
+        # Conexão de cada thread; as de threads encerradas são fechadas na
+        # próxima abertura (o Streamlit usa uma thread nova a cada rerun)
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        self.writer: Optional[BackgroundWriter] = None
         
         # Criar diretório se não existir
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         
         # Inicializar banco de dados
         self._init_database()
     
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ConversationDB":
+        """
+        Cria o banco de dados a partir das configurações da aplicação.
+        
+        Args:
+            config: Dicionário com configurações
+        
+        Returns:
+            Instância de ConversationDB
+        """
+        db = cls(
+            config.get('database_path', 'data/conversations.db'),
+            cache_size_kb=config.get('db_cache_size_kb', 8192),
+            mmap_size_mb=config.get('db_mmap_size_mb', 64),
+            busy_timeout_ms=config.get('db_busy_timeout_ms', 5000),
+            compression=config.get('db_compression', False),
+            compression_level=config.get('db_compression_level', 6)
+        )
+        
+        if config.get('db_write_behind', False):
+            db.start_writer(
+                max_queue=config.get('db_write_queue_size', 10000),
+                flush_interval_ms=config.get('db_flush_interval_ms', 50),
+                max_batch_rows=config.get('db_flush_max_rows', 500),
+                durability=config.get('db_durability', 'normal')
+            )
+        
+        return db
+    
+    def start_writer(self, **options: Any) -> BackgroundWriter:
+        """
+        Ativa a gravação em segundo plano: append_messages passa a enfileirar
+        as mensagens e retorna sem esperar pelo SQLite.
+        
+        Leituras só veem as mensagens enfileiradas depois de flush().
+        
+        Args:
+            **options: Parâmetros de BackgroundWriter (max_queue,
+                flush_interval_ms, max_batch_rows, durability)
+        
+        Returns:
+            Escritor em segundo plano
+        """
+        if self.writer is None:
+            self.writer = BackgroundWriter(self, **options)
+        return self.writer
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a gravação das mensagens enfileiradas pelo escritor em segundo plano.
+        
+        Args:
+            timeout: Espera máxima em segundos (None = sem limite)
+        
+        Returns:
+            True se não há mais gravações pendentes
+        """
+        return self.writer.flush(timeout) if self.writer else True
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão persistente da thread atual, abrindo-a se necessário.
+        
+        Use como gerenciador de contexto (with self._connect() as conn) para
+        que a transação seja confirmada ou desfeita ao final do bloco.
+        
+        Returns:
+            Conexão SQLite configurada
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        # A conexão só é usada pela thread dona; check_same_thread=False
+        # permite apenas que close() a feche a partir de outra thread
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        # Só tem efeito em bancos novos (antes de criar tabelas); bancos
+        # antigos passam a usá-lo depois de um VACUUM completo
+        if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size_mb) * 1024 * 1024}")
+        # Usada pela visão messages_plain e pelos triggers do índice de busca
+        conn.create_function("decompress_content", 1, self.codec.decode, deterministic=True)
+        
+        self._local.conn = conn
+        with self._connections_lock:
+            for thread in [t for t in self._connections if not t.is_alive()]:
+                self._connections.pop(thread).close()
+            self._connections[threading.current_thread()] = conn
+        return conn
+    
+    def close(self) -> None:
+        """Grava as mensagens pendentes e fecha todas as conexões abertas por este objeto."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        
+        with self._connections_lock:
+            connections, self._connections = self._connections, {}
+        
+        for conn in connections.values():
+            conn.close()
+        
+        self._local = threading.local()
+    
     def _init_database(self) -> None:
         """Cria as tabelas necessárias no banco de dados."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Tabela de conversas
@@ -42,11 +211,22 @@ class ConversationDB:
                     start_time TEXT NOT NULL,
                     end_time TEXT,
                     message_count INTEGER DEFAULT 0,
+                    history_summary TEXT,
                     created_at TEXT NOT NULL,
                     updated_at TEXT NOT NULL
                 )
             """)
             
+            # Migrar bancos criados antes da coluna de resumo do histórico
+            cursor.execute("PRAGMA table_info(conversations)")
+            columns = {row[1] for row in cursor.fetchall()}
+            if 'history_summary' not in columns:
+                cursor.execute("ALTER TABLE conversations ADD COLUMN history_summary TEXT")
+            
+            # Hash do conteúdo das conversas importadas (deduplicação de importações)
+            if 'content_hash' not in columns:
+                cursor.execute("ALTER TABLE conversations ADD COLUMN content_hash TEXT")
+            
             # Tabela de mensagens
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS messages (
@@ -56,19 +236,34 @@ class ConversationDB:
                     content TEXT NOT NULL,
                     timestamp TEXT NOT NULL,
                     created_at TEXT NOT NULL,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+                    FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
                 )
             """)
             
+            migrated_messages = self._migrate_messages_cascade(conn)
+            
             # Índices para melhor performance
+            # Índices de cobertura da listagem: a paginação por (created_at, id)
+            # percorre o índice em ordem, sem ordenar nem consultar a tabela
+            cursor.execute("DROP INDEX IF EXISTS idx_conversations_personality")
+            
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_conversations_personality 
-                ON conversations (personality)
+                CREATE INDEX IF NOT EXISTS idx_conversations_created 
+                ON conversations (created_at, id, personality, start_time, end_time, message_count)
             """)
             
             cursor.execute("""
-                CREATE INDEX IF NOT EXISTS idx_messages_conversation_id 
-                ON messages (conversation_id)
+                CREATE INDEX IF NOT EXISTS idx_conversations_personality_created 
+                ON conversations (personality, created_at, id, start_time, end_time, message_count)
+            """)
+            
+            # Mensagens de uma conversa em ordem de inserção: leitura paginada
+            # por id e remoção em cascata usam o mesmo índice
+            cursor.execute("DROP INDEX IF EXISTS idx_messages_conversation_id")
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_messages_conversation 
+                ON messages (conversation_id, id)
             """)
             
             cursor.execute("""
@@ -76,61 +271,592 @@ class ConversationDB:
                 ON messages (timestamp)
             """)
             
+            # Parcial: só conversas importadas têm hash
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_conversations_content_hash 
+                ON conversations (content_hash) WHERE content_hash IS NOT NULL
+            """)
+            
+            self._init_compression(cursor)
+            self._init_search_index(cursor)
+            self._init_statistics(cursor)
+            if migrated_messages:
+                self._rebuild_statistics(cursor)
+            
             conn.commit()
     
-    def save_conversation(self, messages: List[Dict[str, Any]], personality: str) -> str:
+    @staticmethod
+    def _migrate_messages_cascade(conn: sqlite3.Connection) -> bool:
+        """
+        Recria a tabela de mensagens de bancos antigos com ON DELETE CASCADE.
+        
+        O SQLite não altera chaves estrangeiras existentes, então a tabela é
+        copiada (mantendo os ids) para uma nova. Índices e triggers são
+        recriados em seguida por _init_database.
+        
+        Args:
+            conn: Conexão da inicialização
+        
+        Returns:
+            True se a tabela foi migrada
+        """
+        foreign_keys = conn.execute("PRAGMA foreign_key_list(messages)").fetchall()
+        if all(fk['on_delete'] == 'CASCADE' for fk in foreign_keys):
+            return False
+        
+        # foreign_keys só pode ser desligado fora de uma transação
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with conn:
+                conn.execute("""
+                    CREATE TABLE messages_migrated (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        conversation_id TEXT NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        timestamp TEXT NOT NULL,
+                        created_at TEXT NOT NULL,
+                        FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
+                    )
+                """)
+                conn.execute("""
+                    INSERT INTO messages_migrated (id, conversation_id, role, content, timestamp, created_at)
+                    SELECT id, conversation_id, role, content, timestamp, created_at FROM messages
+                """)
+                conn.execute("DROP TABLE messages")
+                conn.execute("ALTER TABLE messages_migrated RENAME TO messages")
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+        
+        return True
+    
+    def _init_compression(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Cria a tabela de dicionários de compressão e carrega os existentes.
+        
+        Args:
+            cursor: Cursor da transação de inicialização
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS compression_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        
+        # Conteúdo das mensagens em texto, comprimido ou não
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS messages_plain AS
+            SELECT id, decompress_content(content) AS content FROM messages
+        """)
+        
+        cursor.execute("SELECT id, codec, data FROM compression_dictionaries ORDER BY id")
+        for row in cursor.fetchall():
+            self.codec.add_dictionary(row['id'], row['codec'], row['data'])
+    
+    def _load_dictionary(self, dictionary_id: int) -> Optional[Tuple[str, bytes]]:
+        """Busca um dicionário de compressão no banco (usado pelo codec)."""
+        with sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000) as conn:
+            row = conn.execute(
+                "SELECT codec, data FROM compression_dictionaries WHERE id = ?", (dictionary_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def _encode_content(self, content: str) -> Union[str, bytes]:
+        """Valor gravado na coluna content (comprimido se a compressão está ativa)."""
+        return self.codec.encode(content) if self.compression else content
+    
+    def _decode_rows(self, rows: List[sqlite3.Row]) -> List[Dict[str, Any]]:
+        """Converte linhas de mensagens em dicionários, descomprimindo o conteúdo."""
+        messages = []
+        for row in rows:
+            message = dict(row)
+            message['content'] = self.codec.decode(message['content'])
+            messages.append(message)
+        return messages
+    
+    def _init_search_index(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Cria o índice FTS5 das mensagens e os triggers que o mantêm sincronizado.
+        
+        O tokenizador unicode61 com remove_diacritics ignora acentos e caixa,
+        então "acao" encontra "Ação". Bancos existentes são indexados uma vez,
+        na criação do índice: com conteúdo externo, remover uma mensagem que
+        não está no índice corromperia o FTS5. Para reindexar depois, use
+        rebuild_search_index ou "python -m src.cli search-backfill".
+        
+        Depois que a compressão é ativada no banco, o índice passa a ler o
+        texto pela visão messages_plain; os triggers então dependem da função
+        decompress_content, registrada nas conexões desta classe.
+        
+        Args:
+            cursor: Cursor da transação de inicialização
+        """
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'messages_fts'")
+        row = cursor.fetchone()
+        index_exists = row is not None
+        plain_view = self.compression or (index_exists and 'messages_plain' in row[0])
+        
+        if index_exists and plain_view and 'messages_plain' not in row[0]:
+            # Compressão ativada agora: recriar o índice lendo o texto pela visão
+            for trigger in ("messages_fts_insert", "messages_fts_delete", "messages_fts_update"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute("DROP TABLE messages_fts")
+            index_exists = False
+        
+        source = "messages_plain" if plain_view else "messages"
+        new_content = "decompress_content(new.content)" if plain_view else "new.content"
+        old_content = "decompress_content(old.content)" if plain_view else "old.content"
+        
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                    content,
+                    content='{source}',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError:
+            # SQLite compilado sem FTS5: a busca fica indisponível
+            self.search_enabled = False
+            return
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, {new_content});
+            END
+        """)
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, {old_content});
+            END
+        """)
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+                INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.id, {old_content});
+                INSERT INTO messages_fts (rowid, content) VALUES (new.id, {new_content});
+            END
+        """)
+        
+        if not index_exists:
+            cursor.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+        
+        self.search_enabled = True
+    
+    def save_conversation(self, messages: List[Dict[str, Any]], personality: str,
+                          history_summary: Optional[str] = None) -> str:
         """
         Salva uma conversa no banco de dados.
         
+        Cada chamada cria uma conversa nova. Para gravar uma sessão em
+        andamento turno a turno, use append_messages.
+        
         Args:
             messages: Lista de mensagens da conversa
             personality: Personalidade usada na conversa
-            
+            history_summary: Resumo das mensagens antigas já compactadas (opcional)
+        
         Returns:
             ID da conversa salva
         """
         conversation_id = str(uuid.uuid4())
-        current_time = datetime.now().isoformat()
+        self.append_messages(conversation_id, messages, personality, history_summary)
+        return conversation_id
+    
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, Any]],
+                        personality: Optional[str] = None,
+                        history_summary: Optional[str] = None) -> int:
+        """
+        Acrescenta mensagens a uma conversa, criando-a se ainda não existir.
         
-        # Calcular tempos de início e fim
-        start_time = messages[0]['timestamp'] if messages else current_time
-        end_time = messages[-1]['timestamp'] if messages else current_time
+        As mensagens são inseridas com executemany em uma única transação e o
+        cabeçalho da conversa (message_count, end_time, updated_at) é
+        atualizado com um upsert, então o custo depende só das mensagens
+        novas, não do tamanho do histórico. Com o escritor em segundo plano
+        ativo (start_writer), as mensagens são apenas enfileiradas.
         
-        with sqlite3.connect(self.db_path) as conn:
+        Args:
+            conversation_id: ID da conversa
+            messages: Mensagens novas (com 'role', 'content' e 'timestamp')
+            personality: Personalidade da conversa (usada ao criá-la)
+            history_summary: Resumo atualizado do histórico (opcional)
+        
+        Returns:
+            Número de mensagens gravadas (ou enfileiradas)
+        """
+        if self.writer is not None:
+            return self.writer.submit(conversation_id, messages, personality, history_summary)
+        
+        self._write_appends([
+            (conversation_id, messages, personality, history_summary, datetime.now().isoformat())
+        ])
+        return len(messages)
+    
+    def _write_appends(self, items: List[AppendItem]) -> None:
+        """
+        Grava uma sequência de acréscimos em uma única transação.
+        
+        Args:
+            items: Tuplas (conversation_id, mensagens, personalidade, resumo, horário)
+        """
+        with self._connect() as conn:
             cursor = conn.cursor()
             
-            # Inserir conversa
-            cursor.execute("""
-                INSERT INTO conversations 
-                (id, personality, start_time, end_time, message_count, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                conversation_id,
-                personality,
-                start_time,
-                end_time,
-                len(messages),
-                current_time,
-                current_time
-            ))
-            
-            # Inserir mensagens
-            for message in messages:
+            for conversation_id, messages, personality, history_summary, current_time in items:
+                # Calcular tempos de início e fim
+                start_time = messages[0]['timestamp'] if messages else current_time
+                end_time = messages[-1]['timestamp'] if messages else current_time
+                
+                # Criar ou atualizar o cabeçalho da conversa
                 cursor.execute("""
+                    INSERT INTO conversations 
+                    (id, personality, start_time, end_time, message_count, history_summary, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        end_time = CASE WHEN excluded.message_count > 0
+                                        THEN excluded.end_time ELSE conversations.end_time END,
+                        message_count = conversations.message_count + excluded.message_count,
+                        history_summary = COALESCE(excluded.history_summary, conversations.history_summary),
+                        updated_at = excluded.updated_at
+                """, (
+                    conversation_id,
+                    personality or "assistente_geral",
+                    start_time,
+                    end_time,
+                    len(messages),
+                    history_summary or None,
+                    current_time,
+                    current_time
+                ))
+                
+                # Inserir mensagens
+                cursor.executemany("""
                     INSERT INTO messages 
                     (conversation_id, role, content, timestamp, created_at)
                     VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (
+                        conversation_id,
+                        message['role'],
+                        self._encode_content(message['content']),
+                        message['timestamp'],
+                        current_time
+                    )
+                    for message in messages
+                ])
+    
+    def existing_content_hashes(self, hashes: Iterable[str]) -> Set[str]:
+        """
+        Retorna quais hashes de conteúdo já estão no banco.
+        
+        Args:
+            hashes: Hashes calculados por content_hash
+        
+        Returns:
+            Conjunto dos hashes já importados
+        """
+        hashes = list(hashes)
+        found: Set[str] = set()
+        with self._connect() as conn:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                found.update(row[0] for row in conn.execute(f"""
+                    SELECT content_hash FROM conversations
+                    WHERE content_hash IN ({', '.join('?' * len(chunk))})
+                """, chunk))
+        return found
+    
+    def import_conversations(self, conversations: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Grava conversas completas em uma única transação, ignorando as que
+        já existem (mesmo id ou mesmo hash de conteúdo).
+        
+        Um id que já existe com outro conteúdo não é sobrescrito e é contado
+        em 'conflicts', não em 'duplicates'.
+        
+        Args:
+            conversations: Conversas normalizadas por src.importer, com 'id',
+                'personality', 'history_summary', 'created_at', 'content_hash'
+                e 'messages'
+        
+        Returns:
+            Dicionário com conversas e mensagens gravadas, duplicadas ignoradas
+            e conflitos de id
+        """
+        report = {"conversations": 0, "messages": 0, "duplicates": 0, "conflicts": 0}
+        current_time = datetime.now().isoformat()
+        
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            existing = self.existing_content_hashes(c['content_hash'] for c in conversations)
+            
+            for conversation in conversations:
+                messages = conversation['messages']
+                if conversation['content_hash'] in existing:
+                    report["duplicates"] += 1
+                    continue
+                
+                cursor.execute("""
+                    INSERT OR IGNORE INTO conversations 
+                    (id, personality, start_time, end_time, message_count, history_summary,
+                     content_hash, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
-                    conversation_id,
-                    message['role'],
-                    message['content'],
-                    message['timestamp'],
+                    conversation['id'],
+                    conversation['personality'],
+                    messages[0]['timestamp'] if messages else current_time,
+                    messages[-1]['timestamp'] if messages else current_time,
+                    len(messages),
+                    conversation.get('history_summary') or None,
+                    conversation['content_hash'],
+                    conversation.get('created_at') or current_time,
                     current_time
                 ))
-            
-            conn.commit()
+                if cursor.rowcount == 0:
+                    stored = self._stored_content_hash(cursor, conversation['id'])
+                    report["duplicates" if stored == conversation['content_hash'] else "conflicts"] += 1
+                    continue
+                existing.add(conversation['content_hash'])
+                
+                cursor.executemany("""
+                    INSERT INTO messages 
+                    (conversation_id, role, content, timestamp, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (
+                        conversation['id'],
+                        message['role'],
+                        self._encode_content(message['content']),
+                        message['timestamp'],
+                        current_time
+                    )
+                    for message in messages
+                ])
+                report["conversations"] += 1
+                report["messages"] += len(messages)
         
-        return conversation_id
+        return report
+    
+    def _stored_content_hash(self, cursor: sqlite3.Cursor, conversation_id: str) -> str:
+        """
+        Hash do conteúdo de uma conversa gravada; calculado das mensagens
+        para conversas que não vieram de uma importação.
+        """
+        row = cursor.execute(
+            "SELECT personality, content_hash FROM conversations WHERE id = ?",
+            (conversation_id,)
+        ).fetchone()
+        if row['content_hash']:
+            return row['content_hash']
+        
+        messages = cursor.execute("""
+            SELECT role, decompress_content(content) AS content, timestamp 
+            FROM messages 
+            WHERE conversation_id = ? 
+            ORDER BY id ASC
+        """, (conversation_id,))
+        return content_hash(row['personality'], messages)
+    
+    def _init_statistics(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Cria as tabelas de contadores e os triggers que as mantêm atualizadas.
+        
+        Com os contadores mantidos a cada inserção e remoção, get_statistics
+        faz apenas consultas pontuais em vez de COUNT(*) sobre o arquivo inteiro.
+        Bancos existentes são contados uma vez, na criação das tabelas.
+        
+        Args:
+            cursor: Cursor da transação de inicialização
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS statistics (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS personality_statistics (
+                personality TEXT PRIMARY KEY,
+                conversations INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS statistics_conversation_insert AFTER INSERT ON conversations BEGIN
+                UPDATE statistics SET value = value + 1 WHERE name = 'conversations';
+                INSERT INTO personality_statistics (personality, conversations) VALUES (new.personality, 1)
+                    ON CONFLICT(personality) DO UPDATE SET conversations = conversations + 1;
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS statistics_conversation_delete AFTER DELETE ON conversations BEGIN
+                UPDATE statistics SET value = value - 1 WHERE name = 'conversations';
+                UPDATE personality_statistics SET conversations = conversations - 1
+                    WHERE personality = old.personality;
+                DELETE FROM personality_statistics
+                    WHERE personality = old.personality AND conversations <= 0;
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS statistics_conversation_update AFTER UPDATE OF personality ON conversations
+            WHEN old.personality IS NOT new.personality BEGIN
+                UPDATE personality_statistics SET conversations = conversations - 1
+                    WHERE personality = old.personality;
+                DELETE FROM personality_statistics
+                    WHERE personality = old.personality AND conversations <= 0;
+                INSERT INTO personality_statistics (personality, conversations) VALUES (new.personality, 1)
+                    ON CONFLICT(personality) DO UPDATE SET conversations = conversations + 1;
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS statistics_message_insert AFTER INSERT ON messages BEGIN
+                UPDATE statistics SET value = value + 1 WHERE name = 'messages';
+            END
+        """)
+        
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS statistics_message_delete AFTER DELETE ON messages BEGIN
+                UPDATE statistics SET value = value - 1 WHERE name = 'messages';
+            END
+        """)
+        
+        cursor.execute("SELECT COUNT(*) FROM statistics")
+        if cursor.fetchone()[0] == 0:
+            self._rebuild_statistics(cursor)
+    
+    @staticmethod
+    def _rebuild_statistics(cursor: sqlite3.Cursor) -> None:
+        """Recalcula os contadores a partir das tabelas (varredura completa)."""
+        cursor.execute("DELETE FROM statistics")
+        cursor.execute("DELETE FROM personality_statistics")
+        cursor.execute("""
+            INSERT INTO statistics (name, value)
+            SELECT 'conversations', COUNT(*) FROM conversations
+            UNION ALL
+            SELECT 'messages', COUNT(*) FROM messages
+        """)
+        cursor.execute("""
+            INSERT INTO personality_statistics (personality, conversations)
+            SELECT personality, COUNT(*) FROM conversations GROUP BY personality
+        """)
+    
+    def rebuild_statistics(self) -> Dict[str, Any]:
+        """
+        Recalcula os contadores de estatísticas a partir dos dados.
+        
+        Os triggers mantêm os contadores corretos; use para repará-los se o
+        banco foi alterado sem eles (por exemplo, por outra ferramenta).
+        
+        Returns:
+            Estatísticas recalculadas
+        """
+        with self._connect() as conn:
+            self._rebuild_statistics(conn.cursor())
+        
+        return self.get_statistics()
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """
+        Converte o texto digitado em uma consulta FTS5 segura.
+        
+        Cada palavra vira um termo entre aspas (todas precisam aparecer);
+        um '*' no fim da palavra faz busca por prefixo.
+        
+        Args:
+            query: Texto de busca
+        
+        Returns:
+            Expressão MATCH (vazia se não houver palavras)
+        """
+        terms = []
+        for word, prefix in re.findall(r'(\w+)(\*?)', query):
+            terms.append(f'"{word}"{prefix}')
+        return " ".join(terms)
+    
+    def search_messages(self, query: str, personality: Optional[str] = None,
+                        limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Busca mensagens pelo conteúdo, ordenadas por relevância (BM25).
+        
+        Args:
+            query: Texto de busca (sem diferenciar acentos e maiúsculas)
+            personality: Filtrar por personalidade (opcional)
+            limit: Número máximo de resultados por página
+            cursor: Cursor da próxima página, retornado pela chamada anterior
+        
+        Returns:
+            Dicionário com 'results' (mensagem, conversa, trecho e relevância)
+            e 'next_cursor' (None na última página)
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Busca indisponível: o SQLite não tem suporte a FTS5")
+        
+        match = self._fts_query(query)
+        if not match:
+            return {"results": [], "next_cursor": None}
+        
+        sql = """
+            SELECT m.id AS message_id, m.conversation_id, m.role, m.timestamp,
+                   c.personality,
+                   snippet(messages_fts, 0, '[', ']', '…', 12) AS snippet,
+                   bm25(messages_fts) AS rank
+            FROM messages_fts
+            JOIN messages m ON m.id = messages_fts.rowid
+            JOIN conversations c ON c.id = m.conversation_id
+            WHERE messages_fts MATCH ?
+        """
+        params: List[Any] = [match]
+        
+        if personality:
+            sql += " AND c.personality = ?"
+            params.append(personality)
+        
+        # Paginação por chave (rank, id): continua de onde a página anterior parou
+        if cursor:
+            last_rank, last_id = cursor.rsplit(":", 1)
+            sql += " AND (bm25(messages_fts) > ? OR (bm25(messages_fts) = ? AND m.id > ?))"
+            params.extend([float(last_rank), float(last_rank), int(last_id)])
+        
+        sql += " ORDER BY rank, m.id LIMIT ?"
+        params.append(limit + 1)
+        
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['rank']!r}:{rows[-1]['message_id']}"
+        
+        return {"results": rows, "next_cursor": next_cursor}
+    
+    def rebuild_search_index(self) -> int:
+        """
+        Reconstrói o índice de busca a partir da tabela de mensagens.
+        
+        Necessário uma vez em bancos criados antes do índice FTS5 e útil
+        para reparar o índice.
+        
+        Returns:
+            Número de mensagens indexadas
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Busca indisponível: o SQLite não tem suporte a FTS5")
+        
+        with self._connect() as conn:
+            conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+            return conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
     
     def load_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -142,8 +868,7 @@ class ConversationDB:
         Returns:
             Dicionário com dados da conversa ou None se não encontrada
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Buscar dados da conversa
@@ -155,15 +880,15 @@ class ConversationDB:
             if not conversation:
                 return None
             
-            # Buscar mensagens
+            # Buscar mensagens (em ordem de inserção)
             cursor.execute("""
                 SELECT role, content, timestamp 
                 FROM messages 
                 WHERE conversation_id = ? 
-                ORDER BY timestamp ASC
+                ORDER BY id ASC
             """, (conversation_id,))
             
-            messages = [dict(row) for row in cursor.fetchall()]
+            messages = self._decode_rows(cursor.fetchall())
             
             return {
                 "id": conversation["id"],
@@ -171,10 +896,141 @@ class ConversationDB:
                 "start_time": conversation["start_time"],
                 "end_time": conversation["end_time"],
                 "message_count": conversation["message_count"],
+                "history_summary": conversation["history_summary"] or "",
                 "created_at": conversation["created_at"],
                 "messages": messages
             }
     
+    def iter_messages(self, conversation_id: str, after_id: Optional[int] = None,
+                      batch: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as mensagens de uma conversa em ordem, buscando 'batch' por vez.
+        
+        Cada lote é uma consulta curta no índice (conversation_id, id), então
+        conversas muito longas não são carregadas inteiras na memória nem
+        prendem uma transação de leitura aberta.
+        
+        Args:
+            conversation_id: ID da conversa
+            after_id: Começar depois desta mensagem (None = desde o início)
+            batch: Mensagens buscadas por consulta
+        
+        Yields:
+            Mensagens com 'id', 'role', 'content' e 'timestamp'
+        """
+        while True:
+            page = self.load_messages_page(conversation_id, after_id, batch)
+            yield from page
+            if len(page) < batch:
+                return
+            after_id = page[-1]['id']
+    
+    def load_messages_page(self, conversation_id: str, after_id: Optional[int] = None,
+                           limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Carrega uma página de mensagens de uma conversa, em ordem de inserção.
+        
+        Args:
+            conversation_id: ID da conversa
+            after_id: Começar depois desta mensagem (None = desde o início)
+            limit: Número máximo de mensagens
+        
+        Returns:
+            Lista de mensagens com 'id', 'role', 'content' e 'timestamp'
+        """
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT id, role, content, timestamp 
+                FROM messages 
+                WHERE conversation_id = ? AND id > ? 
+                ORDER BY id ASC 
+                LIMIT ?
+            """, (conversation_id, after_id or 0, limit)).fetchall()
+        
+        return self._decode_rows(rows)
+    
+    def load_tail(self, conversation_id: str, n: int = 50,
+                  before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Carrega as últimas 'n' mensagens de uma conversa, em ordem cronológica.
+        
+        Para retomar uma sessão basta a cauda; mensagens anteriores podem ser
+        carregadas sob demanda passando o id da mais antiga em 'before_id'.
+        
+        Args:
+            conversation_id: ID da conversa
+            n: Número de mensagens
+            before_id: Só mensagens anteriores a esta (None = até a última)
+        
+        Returns:
+            Lista de mensagens com 'id', 'role', 'content' e 'timestamp'
+        """
+        query = """
+            SELECT id, role, content, timestamp 
+            FROM messages 
+            WHERE conversation_id = ?
+        """
+        params: List[Any] = [conversation_id]
+        
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(n)
+        
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        return self._decode_rows(list(reversed(rows)))
+    
+    def iter_conversation_metrics(self, batch: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Percorre métricas por conversa de todo o arquivo, 'batch' conversas por vez.
+        
+        Cada lote agrega as mensagens de um intervalo de ids de conversa no
+        próprio SQLite (contagens por papel e caracteres), então o conteúdo
+        das mensagens nunca é trazido para o Python. Mensagens comprimidas
+        só são descomprimidas para medir o tamanho.
+        
+        Args:
+            batch: Conversas por consulta
+        
+        Yields:
+            Listas de dicionários com 'id', 'personality', 'start_time',
+            'end_time', 'messages', 'user_messages', 'assistant_messages'
+            e 'characters'
+        """
+        after_id = ""
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute("""
+                    SELECT c.id, c.personality, c.start_time, c.end_time,
+                           COUNT(m.id) AS messages,
+                           COALESCE(SUM(m.role = 'user'), 0) AS user_messages,
+                           COALESCE(SUM(m.role = 'assistant'), 0) AS assistant_messages,
+                           COALESCE(SUM(CASE WHEN typeof(m.content) = 'text'
+                                             THEN length(m.content)
+                                             ELSE length(decompress_content(m.content)) END), 0)
+                               AS characters
+                    FROM (
+                        SELECT id, personality, start_time, end_time
+                        FROM conversations
+                        WHERE id > ?
+                        ORDER BY id
+                        LIMIT ?
+                    ) AS c
+                    LEFT JOIN messages m ON m.conversation_id = c.id
+                    GROUP BY c.id
+                    ORDER BY c.id
+                """, (after_id, batch)).fetchall()
+            
+            if rows:
+                yield [dict(row) for row in rows]
+            if len(rows) < batch:
+                return
+            after_id = rows[-1]['id']
+    
     def list_conversations(self, limit: int = 50, personality: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Lista conversas salvas.
@@ -186,26 +1042,134 @@ class ConversationDB:
         Returns:
             Lista de conversas
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT id, personality, start_time, end_time, message_count, created_at
-                FROM conversations
-            """
-            params = []
-            
-            if personality:
-                query += " WHERE personality = ?"
-                params.append(personality)
+        return self.list_conversations_page(limit, personality)['conversations']
+    
+    def list_conversations_page(self, limit: int = 50, personality: Optional[str] = None,
+                                cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Lista conversas salvas, das mais recentes para as mais antigas, em páginas.
+        
+        A paginação é por chave (created_at, id): cada página custa o mesmo,
+        não importa quantas conversas vieram antes.
+        
+        Args:
+            limit: Número máximo de conversas por página
+            personality: Filtrar por personalidade (opcional)
+            cursor: Cursor da próxima página, retornado pela chamada anterior
+        
+        Returns:
+            Dicionário com 'conversations' e 'next_cursor' (None na última página)
+        """
+        query = """
+            SELECT id, personality, start_time, end_time, message_count, created_at
+            FROM conversations
+        """
+        conditions = []
+        params: List[Any] = []
+        
+        if personality:
+            conditions.append("personality = ?")
+            params.append(personality)
+        
+        if cursor:
+            last_created_at, last_id = cursor.rsplit(":", 1)
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend([last_created_at, last_id])
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        
+        with self._connect() as conn:
+            rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created_at']}:{rows[-1]['id']}"
+        
+        return {"conversations": rows, "next_cursor": next_cursor}
+    
+    def iter_conversations(self, personality: Optional[str] = None,
+                           created_after: Optional[str] = None,
+                           created_before: Optional[str] = None,
+                           conversation_ids: Optional[Iterable[str]] = None,
+                           batch: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os cabeçalhos das conversas, das mais antigas para as mais
+        recentes, buscando 'batch' por vez.
+        
+        Como iter_messages, cada lote é uma consulta curta por chave
+        (created_at, id), então nenhuma transação de leitura fica aberta
+        entre os lotes.
+        
+        Args:
+            personality: Filtrar por personalidade (opcional)
+            created_after: Só conversas criadas a partir deste timestamp ISO
+            created_before: Só conversas criadas antes deste timestamp ISO
+            conversation_ids: Só estas conversas (opcional)
+            batch: Conversas buscadas por consulta
+        
+        Yields:
+            Cabeçalhos com id, personality, start_time, end_time,
+            message_count, history_summary, created_at e updated_at
+        """
+        if conversation_ids is not None:
+            ids = list(conversation_ids)
+            for start in range(0, len(ids), batch):
+                chunk = ids[start:start + batch]
+                with self._connect() as conn:
+                    rows = conn.execute(f"""
+                        SELECT * FROM conversations
+                        WHERE id IN ({', '.join('?' * len(chunk))})
+                        ORDER BY created_at, id
+                    """, chunk).fetchall()
+                for row in rows:
+                    if personality and row['personality'] != personality:
+                        continue
+                    if created_after and row['created_at'] < created_after:
+                        continue
+                    if created_before and row['created_at'] >= created_before:
+                        continue
+                    yield dict(row)
+            return
+        
+        conditions = []
+        params: List[Any] = []
+        if personality:
+            conditions.append("personality = ?")
+            params.append(personality)
+        if created_after:
+            conditions.append("created_at >= ?")
+            params.append(created_after)
+        if created_before:
+            conditions.append("created_at < ?")
+            params.append(created_before)
+        
+        last_key: Optional[Tuple[str, str]] = None
+        while True:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if last_key is not None:
+                page_conditions.append("(created_at, id) > (?, ?)")
+                page_params.extend(last_key)
             
-            query += " ORDER BY created_at DESC LIMIT ?"
-            params.append(limit)
+            query = "SELECT * FROM conversations"
+            if page_conditions:
+                query += " WHERE " + " AND ".join(page_conditions)
+            query += " ORDER BY created_at, id LIMIT ?"
+            page_params.append(batch)
             
-            cursor.execute(query, params)
+            with self._connect() as conn:
+                rows = conn.execute(query, page_params).fetchall()
             
-            return [dict(row) for row in cursor.fetchall()]
+            for row in rows:
+                yield dict(row)
+            if len(rows) < batch:
+                return
+            last_key = (rows[-1]['created_at'], rows[-1]['id'])
     
     def delete_conversation(self, conversation_id: str) -> bool:
         """
@@ -217,13 +1181,10 @@ class ConversationDB:
         Returns:
             True se deletada com sucesso, False caso contrário
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
-            # Deletar mensagens primeiro (devido à foreign key)
-            cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
-            
-            # Deletar conversa
+            # As mensagens são removidas pela foreign key (ON DELETE CASCADE)
             cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
             
             conn.commit()
@@ -237,27 +1198,24 @@ class ConversationDB:
         Returns:
             Dicionário com estatísticas
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
-            # Total de conversas
-            cursor.execute("SELECT COUNT(*) FROM conversations")
-            total_conversations = cursor.fetchone()[0]
-            
-            # Total de mensagens
-            cursor.execute("SELECT COUNT(*) FROM messages")
-            total_messages = cursor.fetchone()[0]
+            # Totais mantidos pelos triggers
+            cursor.execute("SELECT name, value FROM statistics")
+            totals = dict(cursor.fetchall())
+            total_conversations = totals.get('conversations', 0)
+            total_messages = totals.get('messages', 0)
             
             # Conversas por personalidade
             cursor.execute("""
-                SELECT personality, COUNT(*) as count 
-                FROM conversations 
-                GROUP BY personality 
-                ORDER BY count DESC
+                SELECT personality, conversations 
+                FROM personality_statistics 
+                ORDER BY conversations DESC
             """)
             conversations_by_personality = dict(cursor.fetchall())
             
-            # Conversa mais recente
+            # Conversa mais recente (primeira entrada do índice de created_at)
             cursor.execute("""
                 SELECT created_at FROM conversations 
                 ORDER BY created_at DESC LIMIT 1
@@ -272,44 +1230,185 @@ class ConversationDB:
                 "last_conversation_date": last_conversation_date
             }
     
-    def cleanup_old_conversations(self, days_old: int = 30) -> int:
+    def cleanup_old_conversations(self, days_old: int = 30, batch_size: int = 500,
+                                  pause_seconds: float = 0.01,
+                                  vacuum_pages: Optional[int] = None) -> Dict[str, int]:
         """
-        Remove conversas antigas do banco de dados.
+        Remove conversas antigas do banco de dados em lotes.
+        
+        Cada lote é uma transação curta; entre os lotes o lock de escrita é
+        liberado, então a limpeza pode rodar com o banco em uso. As mensagens
+        saem junto com as conversas (ON DELETE CASCADE) e, ao final, um
+        incremental_vacuum devolve as páginas livres ao sistema de arquivos.
         
         Args:
             days_old: Número de dias para considerar uma conversa como antiga
-            
+            batch_size: Conversas removidas por transação
+            pause_seconds: Pausa entre lotes para dar vez a outras escritas
+            vacuum_pages: Máximo de páginas liberadas no vacuum (None = todas)
+        
         Returns:
-            Número de conversas removidas
+            Dicionário com conversas e mensagens removidas, lotes executados
+            e bytes devolvidos ao sistema de arquivos
         """
-        cutoff_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        cutoff_date = cutoff_date.replace(day=cutoff_date.day - days_old)
-        cutoff_str = cutoff_date.isoformat()
+        cutoff_str = (datetime.now() - timedelta(days=days_old)).isoformat()
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Buscar IDs das conversas antigas
-            cursor.execute("""
-                SELECT id FROM conversations WHERE created_at < ?
-            """, (cutoff_str,))
-            
-            old_conversation_ids = [row[0] for row in cursor.fetchall()]
-            
-            if not old_conversation_ids:
-                return 0
-            
-            # Deletar mensagens das conversas antigas
-            placeholders = ','.join('?' * len(old_conversation_ids))
-            cursor.execute(f"""
-                DELETE FROM messages WHERE conversation_id IN ({placeholders})
-            """, old_conversation_ids)
-            
-            # Deletar conversas antigas
-            cursor.execute(f"""
-                DELETE FROM conversations WHERE id IN ({placeholders})
-            """, old_conversation_ids)
+        report = {"conversations": 0, "messages": 0, "batches": 0, "bytes_reclaimed": 0}
+        conn = self._connect()
+        
+        while True:
+            with conn:
+                messages_before = self._statistic(conn, 'messages')
+                cursor = conn.execute("""
+                    DELETE FROM conversations WHERE id IN (
+                        SELECT id FROM conversations WHERE created_at < ?
+                        ORDER BY created_at LIMIT ?
+                    )
+                """, (cutoff_str, batch_size))
+                deleted = cursor.rowcount
+                report["messages"] += messages_before - self._statistic(conn, 'messages')
             
-            conn.commit()
+            report["conversations"] += deleted
+            if deleted:
+                report["batches"] += 1
+            if deleted < batch_size:
+                break
+            time.sleep(pause_seconds)
+        
+        if report["conversations"]:
+            report["bytes_reclaimed"] = self.incremental_vacuum(vacuum_pages)
+        
+        return report
+    
+    @staticmethod
+    def _statistic(conn: sqlite3.Connection, name: str) -> int:
+        """Lê um contador da tabela de estatísticas."""
+        row = conn.execute("SELECT value FROM statistics WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+    
+    def incremental_vacuum(self, pages: Optional[int] = None) -> int:
+        """
+        Devolve páginas livres do banco ao sistema de arquivos.
+        
+        Só libera espaço em bancos com auto_vacuum=INCREMENTAL (o padrão em
+        bancos novos); bancos antigos precisam de um VACUUM completo uma vez
+        ("python -m src.cli vacuum").
+        
+        Args:
+            pages: Máximo de páginas a liberar (None = todas)
+        
+        Returns:
+            Bytes liberados
+        """
+        conn = self._connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        
+        if pages is None:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+        else:
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+        
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (free_before - free_after) * page_size
+    
+    def vacuum(self) -> int:
+        """
+        Reconstrói o arquivo do banco com auto_vacuum=INCREMENTAL (VACUUM completo).
+        
+        Bloqueia o banco durante a execução; use uma vez em bancos antigos
+        para habilitar o incremental_vacuum.
+        
+        Returns:
+            Bytes liberados
+        """
+        conn = self._connect()
+        conn.commit()
+        size_before = os.path.getsize(self.db_path)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return max(size_before - os.path.getsize(self.db_path), 0)
+    
+    def train_compression_dictionary(self, samples: int = 5000, dict_size: int = 16 * 1024,
+                                     codec: Optional[str] = None) -> int:
+        """
+        Treina um dicionário de compressão com as mensagens mais recentes.
+        
+        O novo dicionário passa a ser usado nas próximas gravações; os
+        anteriores continuam no banco para ler o conteúdo já comprimido.
+        
+        Args:
+            samples: Número de mensagens usadas como amostra
+            dict_size: Tamanho máximo do dicionário em bytes
+            codec: 'zlib' ou 'zstd' (padrão: zstd se instalado, senão zlib)
+        
+        Returns:
+            Id do dicionário criado
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT content FROM messages ORDER BY id DESC LIMIT ?", (samples,)
+            ).fetchall()
+        
+        texts = [self.codec.decode(row[0]) for row in rows]
+        codec = codec or self.codec.current_codec
+        data = train_dictionary(texts, dict_size, codec)
+        
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO compression_dictionaries (codec, data, created_at) VALUES (?, ?, ?)",
+                (codec, data, datetime.now().isoformat())
+            )
+            dictionary_id = cursor.lastrowid
+        
+        self.codec.add_dictionary(dictionary_id, codec, data)
+        return dictionary_id
+    
+    def recompress_messages(self, batch_size: int = 500, pause_seconds: float = 0.01) -> Dict[str, int]:
+        """
+        Regrava o conteúdo das mensagens existentes com o dicionário atual.
+        
+        Roda em lotes curtos, como a retenção, e pode ser executada com o
+        banco em uso. Mensagens que não ficam menores continuam em texto.
+        
+        Args:
+            batch_size: Mensagens regravadas por transação
+            pause_seconds: Pausa entre lotes para dar vez a outras escritas
+        
+        Returns:
+            Dicionário com mensagens lidas, mensagens regravadas e bytes
+            do conteúdo antes e depois
+        """
+        if not self.compression:
+            # Sem compressão, o índice de busca lê a coluna content diretamente
+            raise RuntimeError("Ative a compressão (DB_COMPRESSION=true) antes de comprimir as mensagens")
+        
+        report = {"messages": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+        last_id = 0
+        
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT id, content FROM messages WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                
+                updates = []
+                for row in rows:
+                    encoded = self.codec.encode(self.codec.decode(row['content']))
+                    report["bytes_before"] += _stored_size(row['content'])
+                    report["bytes_after"] += _stored_size(encoded)
+                    if encoded != row['content']:
+                        updates.append((encoded, row['id']))
+                
+                conn.executemany("UPDATE messages SET content = ? WHERE id = ?", updates)
             
-            return len(old_conversation_ids)
+            report["messages"] += len(rows)
+            report["rewritten"] += len(updates)
+            last_id = rows[-1]['id']
+            time.sleep(pause_seconds)
+        
+        return report
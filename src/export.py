@@ -0,0 +1,147 @@
+"""
+Exportação de conversas em NDJSON do AI Chatbot Brasileiro
+
+Cada linha é um registro JSON: primeiro um cabeçalho da exportação e, para
+cada conversa, um registro 'conversation' seguido dos seus registros
+'message'. As linhas são geradas direto dos cursores do banco e gravadas
+em blocos (opcionalmente com gzip), então a memória usada não depende do
+tamanho da exportação.
+"""
+
+import json
+import zlib
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Union
+
+EXPORT_FORMAT = "chatbot-ndjson"
+EXPORT_VERSION = 1
+
+# Campos do registro de cada conversa, na ordem gravada
+CONVERSATION_FIELDS = ("id", "personality", "start_time", "end_time", "message_count",
+                       "history_summary", "created_at", "updated_at")
+
+def iter_export_records(db: Any, conversation_ids: Optional[Iterable[str]] = None,
+                        personality: Optional[str] = None,
+                        created_after: Optional[str] = None,
+                        created_before: Optional[str] = None,
+                        batch: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Gera os registros da exportação, conversa por conversa.
+    
+    Args:
+        db: ConversationDB ou ShardedConversationDB
+        conversation_ids: Só estas conversas (opcional)
+        personality: Filtrar por personalidade (opcional)
+        created_after: Só conversas criadas a partir deste timestamp ISO
+        created_before: Só conversas criadas antes deste timestamp ISO
+        batch: Conversas e mensagens buscadas por consulta
+    
+    Yields:
+        Registros 'export', 'conversation' e 'message'
+    """
+    yield {
+        "type": "export",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    headers = db.iter_conversations(personality, created_after, created_before,
+                                    conversation_ids, batch)
+    for header in headers:
+        record = {"type": "conversation"}
+        record.update((field, header.get(field)) for field in CONVERSATION_FIELDS)
+        yield record
+        
+        for message in db.iter_messages(header['id'], batch=batch):
+            yield {
+                "type": "message",
+                "conversation_id": header['id'],
+                "role": message['role'],
+                "content": message['content'],
+                "timestamp": message['timestamp']
+            }
+
+def encode_ndjson(records: Iterable[Dict[str, Any]], compress: bool = False,
+                  compresslevel: int = 6, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Converte registros em blocos de bytes NDJSON (UTF-8), com gzip opcional.
+    
+    Os blocos podem ser gravados em um arquivo ou entregues como resposta
+    HTTP em streaming.
+    
+    Args:
+        records: Registros a serializar
+        compress: Comprimir em formato gzip
+        compresslevel: Nível de compressão do gzip
+        chunk_size: Tamanho aproximado de cada bloco antes da compressão
+    
+    Yields:
+        Blocos de bytes
+    """
+    # wbits=31: fluxo deflate com cabeçalho e rodapé gzip
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31) if compress else None
+    buffer = []
+    size = 0
+    
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            block = b"".join(buffer)
+            buffer.clear()
+            size = 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    
+    block = b"".join(buffer)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+def export_ndjson(db: Any, output: Union[str, BinaryIO], compress: Optional[bool] = None,
+                  progress: Optional[Callable[[int], None]] = None,
+                  **filters: Any) -> Dict[str, int]:
+    """
+    Exporta conversas para um arquivo NDJSON (ou .ndjson.gz).
+    
+    Args:
+        db: ConversationDB ou ShardedConversationDB
+        output: Caminho do arquivo ou arquivo binário aberto para escrita
+        compress: Comprimir com gzip (None = se o caminho termina em '.gz')
+        progress: Função chamada com o total de conversas exportadas a cada conversa
+        **filters: Filtros de iter_export_records (conversation_ids,
+            personality, created_after, created_before, batch)
+    
+    Returns:
+        Dicionário com conversas, mensagens e bytes gravados
+    """
+    if compress is None:
+        compress = isinstance(output, str) and output.endswith('.gz')
+    
+    counts = {"conversations": 0, "messages": 0, "bytes": 0}
+    
+    def counted(records: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for record in records:
+            if record['type'] == 'message':
+                counts["messages"] += 1
+            elif record['type'] == 'conversation':
+                counts["conversations"] += 1
+                if progress:
+                    progress(counts["conversations"])
+            yield record
+    
+    stream = output if not isinstance(output, str) else open(output, 'wb')
+    try:
+        for block in encode_ndjson(counted(iter_export_records(db, **filters)), compress):
+            stream.write(block)
+            counts["bytes"] += len(block)
+    finally:
+        if isinstance(output, str):
+            stream.close()
+    
+    return counts
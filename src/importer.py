@@ -0,0 +1,396 @@
+"""
+Importação em massa de conversas do AI Chatbot Brasileiro
+
+Lê arquivos exportados pelo app (JSON de utils.export_conversation ou de
+ChatbotAI.export_conversation, listas de mensagens e NDJSON de src.export,
+com ou sem gzip). Os arquivos são lidos em streaming e validados (os
+pequenos em um pool de processos); as conversas são deduplicadas pelo hash
+do conteúdo e gravadas em lotes grandes, uma transação por lote. Depois de
+cada lote, a posição de cada arquivo é registrada em um arquivo de estado,
+para retomar uma importação interrompida sem reprocessar o que já foi gravado.
+"""
+
+import glob
+import gzip
+import json
+import multiprocessing
+import os
+import uuid
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .database import content_hash
+
+# Item lido de um arquivo: (conversa ou None, erro ou None, posição da próxima conversa)
+FileItem = Tuple[Optional[Dict[str, Any]], Optional[str], Optional[int]]
+
+VALID_ROLES = {"user", "assistant", "system"}
+
+# Extensões procuradas ao importar um diretório
+IMPORT_EXTENSIONS = (".json", ".json.gz", ".ndjson", ".ndjson.gz", ".jsonl", ".jsonl.gz")
+
+# Erros guardados no relatório (o total é sempre contado)
+MAX_REPORTED_ERRORS = 100
+
+# Arquivos maiores que isto (no disco) não vão para o pool: são lidos em
+# streaming pelo processo que grava, sem carregá-los inteiros na memória
+POOL_MAX_FILE_BYTES = 4 * 1024 * 1024
+
+def normalize_conversation(data: Dict[str, Any], default_personality: str = "assistente_geral",
+                           default_timestamp: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Valida uma conversa e a converte no formato de ConversationDB.import_conversations.
+    
+    Args:
+        data: Conversa com 'messages' e, opcionalmente, 'id', 'personality',
+            'history_summary' e 'created_at'
+        default_personality: Personalidade usada quando a conversa não tem uma
+        default_timestamp: Timestamp das mensagens que não têm um
+    
+    Returns:
+        Conversa normalizada com 'id', 'personality', 'history_summary',
+        'created_at', 'content_hash' e 'messages'
+    
+    Raises:
+        ValueError: Se a conversa não segue o esquema esperado
+    """
+    raw_messages = data.get('messages')
+    if not isinstance(raw_messages, list) or not raw_messages:
+        raise ValueError("conversa sem lista de mensagens")
+    
+    messages = []
+    for index, message in enumerate(raw_messages):
+        if not isinstance(message, dict):
+            raise ValueError(f"mensagem {index} não é um objeto")
+        role = message.get('role')
+        content = message.get('content')
+        if role not in VALID_ROLES:
+            raise ValueError(f"mensagem {index} com papel inválido: {role!r}")
+        if not isinstance(content, str):
+            raise ValueError(f"mensagem {index} sem conteúdo de texto")
+        timestamp = message.get('timestamp') or default_timestamp
+        if not isinstance(timestamp, str):
+            raise ValueError(f"mensagem {index} sem timestamp")
+        messages.append({"role": role, "content": content, "timestamp": timestamp})
+    
+    personality = data.get('personality') or default_personality
+    if not isinstance(personality, str):
+        raise ValueError("personalidade inválida")
+    
+    digest = content_hash(personality, messages)
+    conversation_id = data.get('id')
+    if not isinstance(conversation_id, str) or not conversation_id:
+        # Sem id no arquivo: derivado do conteúdo, estável entre execuções
+        conversation_id = str(uuid.UUID(hex=digest))
+    
+    summary = data.get('history_summary')
+    return {
+        "id": conversation_id,
+        "personality": personality,
+        "history_summary": summary if isinstance(summary, str) else None,
+        "created_at": data.get('created_at') if isinstance(data.get('created_at'), str) else None,
+        "content_hash": digest,
+        "messages": messages
+    }
+
+def _open_binary(path: str) -> BinaryIO:
+    """Abre um arquivo para leitura binária, descomprimindo gzip pelo cabeçalho."""
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    return gzip.open(path, 'rb') if magic == b"\x1f\x8b" else open(path, 'rb')
+
+def _documents(f: BinaryIO, offset: int) -> Iterator[Tuple[Any, int, int]]:
+    """
+    Lê o arquivo linha a linha como NDJSON. Se a primeira linha não é um
+    JSON completo, o arquivo é um único documento (exportações com indent),
+    lido inteiro.
+    
+    Yields:
+        (documento, posição inicial, posição final), em bytes do arquivo descomprimido
+    """
+    position = offset
+    first = offset == 0
+    for line in f:
+        start, position = position, position + len(line)
+        if not line.strip():
+            continue
+        try:
+            document = json.loads(line)
+        except json.JSONDecodeError as e:
+            if not first:
+                raise ValueError(f"posição {start}: {e.msg}") from None
+            rest = f.read()
+            yield json.loads(line + rest), start, position + len(rest)
+            return
+        first = False
+        yield document, start, position
+
+def _conversations_from_documents(documents: Iterable[Tuple[Any, int, int]]) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    Converte os formatos de exportação conhecidos em conversas com 'messages'.
+    
+    Yields:
+        (conversa, posição onde começa a conversa seguinte)
+    """
+    current: Optional[Dict[str, Any]] = None
+    end = 0
+    
+    for document, start, end in documents:
+        if isinstance(document, dict) and 'type' in document:
+            # Registros NDJSON de src.export
+            if document['type'] == 'conversation':
+                if current is not None:
+                    yield current, start
+                current = {**document, "messages": []}
+            elif document['type'] == 'message':
+                if current is None or document.get('conversation_id') != current.get('id'):
+                    raise ValueError(f"posição {start}: mensagem fora da sua conversa")
+                current['messages'].append(document)
+            continue
+        
+        if current is not None:
+            yield current, start
+            current = None
+        
+        if isinstance(document, list):
+            # Lista de mensagens (formato aceito por import_conversation)
+            yield {"messages": document}, end
+        elif isinstance(document, dict) and isinstance(document.get('conversation'), list):
+            # utils.export_conversation
+            yield {"messages": document['conversation']}, end
+        elif isinstance(document, dict) and isinstance(document.get('messages'), list):
+            # ChatbotAI.export_conversation
+            config = document.get('chatbot_config') or {}
+            summary = document.get('conversation_summary') or {}
+            yield {
+                "id": document.get('id'),
+                "personality": (document.get('personality') or config.get('personality')
+                                or summary.get('current_personality')),
+                "history_summary": document.get('history_summary'),
+                "created_at": document.get('created_at'),
+                "messages": document['messages']
+            }, end
+        else:
+            raise ValueError(f"posição {start}: formato de exportação desconhecido")
+    
+    if current is not None:
+        yield current, end
+
+def iter_file_conversations(path: str, default_personality: str = "assistente_geral",
+                            offset: int = 0) -> Iterator[FileItem]:
+    """
+    Lê e valida as conversas de um arquivo em streaming, uma por vez.
+    
+    Conversas inválidas são relatadas e puladas; um arquivo ilegível
+    termina com um erro sem interromper a importação.
+    
+    Args:
+        path: Caminho do arquivo
+        default_personality: Personalidade das conversas que não têm uma
+        offset: Posição (bytes do arquivo descomprimido) onde retomar a leitura;
+            em arquivos gzip, o trecho anterior é descomprimido e descartado
+    
+    Yields:
+        (conversa normalizada ou None, erro ou None, posição onde começa a
+        conversa seguinte ou None após um erro de leitura)
+    """
+    try:
+        default_timestamp = datetime.fromtimestamp(os.path.getmtime(path)).isoformat()
+        with _open_binary(path) as f:
+            if offset:
+                f.seek(offset)
+            found = _conversations_from_documents(_documents(f, offset))
+            for index, (data, end) in enumerate(found):
+                try:
+                    yield normalize_conversation(data, default_personality, default_timestamp), None, end
+                except ValueError as e:
+                    yield None, f"{path} (conversa {index}): {e}", end
+    except (OSError, EOFError, UnicodeDecodeError, ValueError) as e:
+        yield None, f"{path}: {e}", None
+
+def _parse_file(path: str, default_personality: str, offset: int) -> List[FileItem]:
+    """Lê um arquivo inteiro (executado nos processos do pool)."""
+    return list(iter_file_conversations(path, default_personality, offset))
+
+def find_import_files(paths: Iterable[str]) -> List[str]:
+    """
+    Expande arquivos, diretórios (recursivamente) e padrões glob.
+    
+    Args:
+        paths: Caminhos informados
+    
+    Returns:
+        Arquivos a importar, sem repetição e em ordem
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, name) for name in names
+                             if name.lower().endswith(IMPORT_EXTENSIONS))
+        elif os.path.exists(path):
+            found.append(path)
+        else:
+            found.extend(glob.glob(path, recursive=True))
+    return sorted(set(found))
+
+def _file_key(path: str) -> str:
+    """Identifica um arquivo no estado da importação (caminho, tamanho e data)."""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+def _load_state(state_path: Optional[str]) -> Dict[str, Optional[int]]:
+    """
+    Lê o estado da importação: para cada arquivo, a posição já gravada
+    ou None se ele foi concluído (a última linha de cada arquivo vale).
+    """
+    if not state_path or not os.path.exists(state_path):
+        return {}
+    state: Dict[str, Optional[int]] = {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                state[entry['file']] = entry.get('offset')
+    return state
+
+def _parse_files(files: List[Tuple[str, int]], workers: Optional[int],
+                 default_personality: str) -> Iterator[Tuple[str, Iterator[FileItem]]]:
+    """
+    Lê os arquivos na ordem. Arquivos de até POOL_MAX_FILE_BYTES são lidos
+    inteiros por um pool de processos, com no máximo 2 arquivos por processo
+    aguardando consumo; os maiores (e todos, com workers=1) são lidos em
+    streaming no próprio processo.
+    
+    Yields:
+        (caminho, itens de iter_file_conversations)
+    """
+    if workers == 1:
+        for path, offset in files:
+            yield path, iter_file_conversations(path, default_personality, offset)
+        return
+    
+    # spawn: o processo principal tem threads (conexões, escritor), e fork
+    # com threads pode travar os filhos
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        queue: Deque[Tuple[str, int, Optional[Future]]] = deque()
+        remaining = iter(files)
+        max_in_flight = 2 * (workers or os.cpu_count() or 1)
+        
+        def fill() -> None:
+            while len(queue) < max_in_flight:
+                path, offset = next(remaining, (None, 0))
+                if path is None:
+                    return
+                future = None
+                if os.path.getsize(path) <= POOL_MAX_FILE_BYTES:
+                    future = pool.submit(_parse_file, path, default_personality, offset)
+                queue.append((path, offset, future))
+        
+        fill()
+        while queue:
+            path, offset, future = queue.popleft()
+            fill()
+            if future is None:
+                yield path, iter_file_conversations(path, default_personality, offset)
+            else:
+                yield path, iter(future.result())
+
+def bulk_import(db: Any, paths: Iterable[str], workers: Optional[int] = None,
+                batch_size: int = 1000, state_path: Optional[str] = None,
+                default_personality: str = "assistente_geral",
+                progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Importa conversas de muitos arquivos para o banco.
+    
+    Os arquivos são lidos conversa a conversa (os pequenos em paralelo por
+    'workers' processos) e as conversas são gravadas em transações de
+    'batch_size' conversas, inclusive dentro de um mesmo arquivo.
+    Conversas cujo hash de conteúdo já está no banco (ou que se repetem na
+    própria importação) são ignoradas, então reimportar é seguro; um id que
+    já existe com outro conteúdo é contado em 'conflicts' e não é gravado.
+    Um arquivo com erro de leitura (gzip truncado, sem permissão) não é
+    marcado como concluído no estado e é tentado de novo na próxima execução.
+    
+    Args:
+        db: ConversationDB ou ShardedConversationDB
+        paths: Arquivos, diretórios ou padrões glob
+        workers: Processos do pool (None = número de CPUs; 1 = sem pool)
+        batch_size: Conversas por transação
+        state_path: Arquivo de estado para retomar importações (opcional)
+        default_personality: Personalidade das conversas que não têm uma
+        progress: Função chamada com o relatório parcial após cada lote
+    
+    Returns:
+        Dicionário com arquivos (total, importados, já importados antes,
+        com erro de leitura), conversas, mensagens, duplicadas, conflitos de id, total de erros e
+        os primeiros erros
+    """
+    files = find_import_files(paths)
+    state = _load_state(state_path)
+    keys = {path: _file_key(path) for path in files}
+    pending = [(path, state.get(keys[path]) or 0) for path in files
+               if keys[path] not in state or state[keys[path]] is not None]
+    
+    report: Dict[str, Any] = {
+        "files": len(files), "files_imported": 0, "files_skipped": len(files) - len(pending),
+        "files_failed": 0, "conversations": 0, "messages": 0, "duplicates": 0, "conflicts": 0,
+        "error_count": 0, "errors": []
+    }
+    batch: List[Dict[str, Any]] = []
+    # Posição de cada arquivo lido desde o último lote (None = concluído)
+    checkpoints: Dict[str, Optional[int]] = {}
+    state_file = open(state_path, 'a', encoding='utf-8') if state_path else None
+    
+    def write_batch() -> None:
+        if batch:
+            written = db.import_conversations(batch)
+            for field in ("conversations", "messages", "duplicates", "conflicts"):
+                report[field] += written[field]
+            batch.clear()
+        # Só depois da transação as posições dos arquivos são registradas
+        if state_file is not None and checkpoints:
+            state_file.writelines(
+                json.dumps({"file": keys[path]} if offset is None
+                           else {"file": keys[path], "offset": offset}) + "\n"
+                for path, offset in checkpoints.items()
+            )
+            state_file.flush()
+            os.fsync(state_file.fileno())
+        report["files_imported"] += sum(offset is None for offset in checkpoints.values())
+        checkpoints.clear()
+        if progress:
+            progress(report)
+    
+    try:
+        for path, items in _parse_files(pending, workers, default_personality):
+            read_failed = False
+            for conversation, error, offset in items:
+                if error is not None:
+                    report["error_count"] += 1
+                    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                        report["errors"].append(error)
+                    # Erro de leitura do arquivo (sem posição), não de uma conversa
+                    read_failed = read_failed or offset is None
+                if conversation is not None:
+                    batch.append(conversation)
+                if offset is not None:
+                    checkpoints[path] = offset
+                if len(batch) >= batch_size:
+                    write_batch()
+            if read_failed:
+                # Não marcar como concluído: a próxima execução tenta de novo a
+                # partir da última posição gravada
+                report["files_failed"] += 1
+            else:
+                checkpoints[path] = None
+        
+        write_batch()
+    finally:
+        if state_file is not None:
+            state_file.close()
+    
+    return report
@@ -0,0 +1,209 @@
+"""
+Memória de conversa compacta do AI Chatbot Brasileiro
+"""
+
+from collections import deque
+from datetime import datetime
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+class Message:
+    """
+    Mensagem armazenada na memória da conversa.
+    
+    Usa __slots__ para evitar um dicionário por instância. O payload enviado
+    à API ({'role', 'content'}) é montado uma única vez e reaproveitado em
+    todas as requisições. Para compatibilidade, também aceita acesso como
+    dicionário (msg['role'], msg['timestamp']...).
+    """
+    
+    __slots__ = ('role', 'content', 'created', 'tokens', 'api', 'seq')
+    
+    def __init__(self, role: str, content: str, tokens: int, created: Optional[float] = None):
+        """
+        Inicializa a mensagem.
+        
+        Args:
+            role: 'user', 'assistant' ou 'system'
+            content: Conteúdo da mensagem
+            tokens: Tokens que a mensagem ocupa no prompt
+            created: Momento de criação em segundos desde a época (padrão: agora)
+        """
+        self.role = role
+        self.content = content
+        self.tokens = tokens
+        self.created = time.time() if created is None else created
+        self.api = {"role": role, "content": content}
+        # Posição na memória (atribuída por ConversationMemory.append)
+        self.seq = -1
+    
+    @property
+    def timestamp(self) -> str:
+        """Momento de criação em formato ISO."""
+        return datetime.fromtimestamp(self.created).isoformat()
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in ('role', 'content', 'tokens', 'timestamp'):
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in ('role', 'content', 'tokens', 'timestamp')
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Acesso como dicionário com valor padrão."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte a mensagem em dicionário (para exportação e banco de dados)."""
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "tokens": self.tokens
+        }
+    
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content[:30]!r}, tokens={self.tokens})"
+
+class ConversationMemory:
+    """
+    Buffer circular de mensagens com tamanho máximo.
+    
+    Inserção e descarte das mensagens mais antigas são O(1); nenhuma lista
+    é reconstruída quando o limite é atingido.
+    """
+    
+    def __init__(self, max_messages: int = 20):
+        """
+        Inicializa a memória.
+        
+        Args:
+            max_messages: Número máximo de mensagens mantidas
+        """
+        self._messages: "deque[Message]" = deque(maxlen=max(1, max_messages))
+        self._next_seq = 0
+    
+    @property
+    def max_messages(self) -> int:
+        """Número máximo de mensagens mantidas."""
+        return self._messages.maxlen
+    
+    def resize(self, max_messages: int) -> None:
+        """
+        Altera o tamanho máximo, mantendo as mensagens mais recentes.
+        
+        Args:
+            max_messages: Novo número máximo de mensagens
+        """
+        max_messages = max(1, max_messages)
+        if max_messages != self._messages.maxlen:
+            self._messages = deque(self._messages, maxlen=max_messages)
+    
+    def append(self, message: Message) -> None:
+        """
+        Adiciona uma mensagem, descartando a mais antiga se a memória estiver cheia.
+        
+        Cada mensagem recebe um número de sequência crescente, que permite
+        saber quais mensagens são novas desde uma consulta anterior.
+        
+        Args:
+            message: Mensagem a adicionar
+        """
+        message.seq = self._next_seq
+        self._next_seq += 1
+        self._messages.append(message)
+    
+    def newer_than(self, seq: int) -> List[Message]:
+        """
+        Retorna as mensagens com número de sequência maior que 'seq'.
+        
+        Percorre a memória a partir do fim, então o custo é proporcional ao
+        número de mensagens novas, não ao tamanho da memória.
+        
+        Args:
+            seq: Último número de sequência já conhecido
+            
+        Returns:
+            Mensagens novas, da mais antiga para a mais nova
+        """
+        newer = []
+        for message in reversed(self._messages):
+            if message.seq <= seq:
+                break
+            newer.append(message)
+        newer.reverse()
+        return newer
+    
+    @property
+    def first_seq(self) -> int:
+        """Número de sequência da mensagem mais antiga ainda na memória."""
+        return self._messages[0].seq if self._messages else self._next_seq
+    
+    def oldest(self, count: int) -> List[Message]:
+        """
+        Retorna as 'count' mensagens mais antigas.
+        
+        Args:
+            count: Quantidade de mensagens
+            
+        Returns:
+            Lista com as mensagens, da mais antiga para a mais nova
+        """
+        iterator = iter(self._messages)
+        return [next(iterator) for _ in range(min(count, len(self._messages)))]
+    
+    def discard_oldest(self, messages: Iterable[Message]) -> int:
+        """
+        Remove do início da memória as mensagens informadas que ainda estiverem lá.
+        
+        Args:
+            messages: Mensagens a remover (normalmente obtidas com oldest)
+            
+        Returns:
+            Número de mensagens removidas
+        """
+        targets = {id(message) for message in messages}
+        removed = 0
+        while self._messages and id(self._messages[0]) in targets:
+            self._messages.popleft()
+            removed += 1
+        return removed
+    
+    def api_messages(self) -> Iterator[Dict[str, str]]:
+        """
+        Itera sobre os payloads da API das mensagens, sem copiá-los.
+        
+        Os dicionários retornados são compartilhados e não devem ser alterados.
+        
+        Yields:
+            Dicionários {'role', 'content'} da mais antiga para a mais nova
+        """
+        for message in self._messages:
+            yield message.api
+    
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Converte a memória em lista de dicionários."""
+        return [message.to_dict() for message in self._messages]
+    
+    def clear(self) -> None:
+        """Remove todas as mensagens."""
+        self._messages.clear()
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+    
+    def __reversed__(self) -> Iterator[Message]:
+        return reversed(self._messages)
+    
+    def __getitem__(self, index: int) -> Message:
+        return self._messages[index]
+    
+    def __bool__(self) -> bool:
+        return bool(self._messages)
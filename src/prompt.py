@@ -0,0 +1,157 @@
+"""
+Prefixo de prompt incremental do AI Chatbot Brasileiro
+"""
+
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .memory import ConversationMemory, Message
+
+class PromptPrefix:
+    """
+    Lista de mensagens enviada à API, mantida de forma incremental entre turnos.
+    
+    O cabeçalho (prompt do sistema e resumo do histórico) só é reconstruído
+    quando muda, e as mensagens novas da memória são apenas anexadas ao fim.
+    Assim o início do prompt permanece idêntico byte a byte entre turnos, o
+    que permite que o cache de prompts do provedor acerte.
+    
+    Quando o histórico estoura o orçamento de tokens, as mensagens antigas
+    são descartadas de uma vez até 'trim_ratio' do orçamento, em vez de uma
+    por turno, para que o prefixo continue estável pelos próximos turnos.
+    """
+    
+    def __init__(self, trim_ratio: float = 0.75):
+        """
+        Inicializa o prefixo vazio.
+        
+        Args:
+            trim_ratio: Fração do orçamento a manter quando o histórico é cortado
+        """
+        self.trim_ratio = trim_ratio
+        self.reset()
+        
+        # Métricas de reaproveitamento do prefixo
+        self._last_request: List[Dict[str, str]] = []
+        self.requests = 0
+        self.reused_chars_total = 0
+        self.total_chars_total = 0
+        self.last_stats: Dict[str, Any] = {}
+    
+    def reset(self) -> None:
+        """Descarta o prefixo atual (será reconstruído na próxima chamada)."""
+        self._head_key: Optional[Hashable] = None
+        self._head_size = 0
+        self._payload: List[Dict[str, str]] = []
+        self._entries: "deque[Message]" = deque()
+        self._history_tokens = 0
+        self._last_seq = -1
+    
+    def _drop_oldest(self, count: int) -> None:
+        """Remove as 'count' mensagens mais antigas do histórico do prefixo."""
+        if count <= 0:
+            return
+        for _ in range(count):
+            self._history_tokens -= self._entries.popleft().tokens
+        del self._payload[self._head_size:self._head_size + count]
+    
+    def build(self, head_key: Hashable, head_factory: Callable[[], List[Dict[str, str]]],
+              memory: ConversationMemory, budget: int) -> List[Dict[str, str]]:
+        """
+        Atualiza o prefixo com as mensagens novas da memória e o retorna.
+        
+        Args:
+            head_key: Identifica o cabeçalho atual (personalidade, resumo...)
+            head_factory: Cria as mensagens do cabeçalho quando a chave muda
+            memory: Memória da conversa
+            budget: Tokens disponíveis para o histórico
+            
+        Returns:
+            Lista interna do prefixo (não deve ser alterada pelo chamador)
+        """
+        if head_key != self._head_key:
+            self.reset()
+            self._head_key = head_key
+            self._payload = list(head_factory())
+            self._head_size = len(self._payload)
+        
+        # Mensagens que saíram da memória também saem do prefixo
+        first_seq = memory.first_seq
+        evicted = 0
+        for entry in self._entries:
+            if entry.seq >= first_seq:
+                break
+            evicted += 1
+        self._drop_oldest(evicted)
+        
+        # Anexar apenas as mensagens novas
+        for message in memory.newer_than(self._last_seq):
+            self._last_seq = message.seq
+            if message.role not in ('user', 'assistant'):
+                continue
+            self._entries.append(message)
+            self._payload.append(message.api)
+            self._history_tokens += message.tokens
+        
+        # Cortar em bloco quando o orçamento estoura
+        if self._history_tokens > budget:
+            target = int(budget * self.trim_ratio)
+            tokens = self._history_tokens
+            count = 0
+            for entry in self._entries:
+                if tokens <= target:
+                    break
+                tokens -= entry.tokens
+                count += 1
+            self._drop_oldest(count)
+        
+        return self._payload
+    
+    def record_request(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """
+        Mede quanto do início da requisição é idêntico à requisição anterior.
+        
+        Args:
+            messages: Mensagens enviadas nesta requisição
+            
+        Returns:
+            Métricas desta requisição
+        """
+        reused_messages = 0
+        reused_chars = 0
+        for previous, current in zip(self._last_request, messages):
+            if previous is not current and previous != current:
+                break
+            reused_messages += 1
+            reused_chars += len(current['content'])
+        
+        total_chars = sum(len(message['content']) for message in messages)
+        
+        self.requests += 1
+        self.reused_chars_total += reused_chars
+        self.total_chars_total += total_chars
+        self._last_request = messages
+        
+        self.last_stats = {
+            "reused_messages": reused_messages,
+            "total_messages": len(messages),
+            "reused_chars": reused_chars,
+            "total_chars": total_chars,
+            "reuse_ratio": reused_chars / total_chars if total_chars else 0.0
+        }
+        return self.last_stats
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna as métricas de reaproveitamento do prefixo.
+        
+        Returns:
+            Métricas da última requisição e a taxa acumulada
+        """
+        return {
+            **self.last_stats,
+            "requests": self.requests,
+            "overall_reuse_ratio": (
+                self.reused_chars_total / self.total_chars_total if self.total_chars_total else 0.0
+            )
+        }
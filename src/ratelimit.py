@@ -0,0 +1,318 @@
+"""
+Limite de requisições e cota diária de tokens do AI Chatbot Brasileiro
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Estado de uma chave: (requisições disponíveis, última atualização, dia UTC, tokens do dia)
+BucketState = Tuple[float, float, str, int]
+
+SECONDS_PER_DAY = 86400
+
+# Chaves paradas há mais de um dia equivalem a chaves novas (balde cheio,
+# tokens de outro dia) e são apagadas a cada PRUNE_EVERY atualizações; com
+# uma chave por sessão, o estado não cresce sem limite
+PRUNE_EVERY = 1000
+
+class RateLimitExceeded(Exception):
+    """Requisição recusada pelo limite de requisições ou pela cota diária."""
+    
+    def __init__(self, limit: str, retry_after: float):
+        """
+        Args:
+            limit: 'requests' (requisições por janela) ou 'tokens' (cota diária)
+            retry_after: Segundos até a requisição poder ser aceita
+        """
+        self.limit = limit
+        self.retry_after = retry_after
+        super().__init__(f"Limite de {limit} atingido; tente novamente em {retry_after:.0f}s")
+
+def _utc_day(now: float) -> str:
+    """Dia UTC (AAAA-MM-DD) de um instante."""
+    return time.strftime('%Y-%m-%d', time.gmtime(now))
+
+class RateLimiter:
+    """
+    Balde de fichas (token bucket) por chave para requisições e cota diária
+    de tokens da API.
+    
+    Cada chave guarda só quatro valores, então verificar e consumir é O(1).
+    Com 'db_path', o estado fica em uma tabela SQLite e cada verificação é
+    uma transação BEGIN IMMEDIATE: sessões e processos que usam o mesmo
+    arquivo compartilham os limites sem condições de corrida. Sem ele, o
+    estado fica em memória, compartilhado pelas sessões do processo.
+    """
+    
+    def __init__(self, max_requests: int = 20, window_seconds: float = 60.0,
+                 tokens_per_day: int = 0, db_path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Inicializa o limitador.
+        
+        Args:
+            max_requests: Requisições por janela, também o tamanho da rajada (0 = sem limite)
+            window_seconds: Duração da janela em segundos
+            tokens_per_day: Tokens por chave por dia UTC (0 = sem limite)
+            db_path: Banco SQLite compartilhado (None = só memória)
+            clock: Função que retorna o instante atual (para testes)
+        """
+        self.max_requests = max(0, int(max_requests))
+        self.window_seconds = window_seconds
+        self.tokens_per_day = max(0, int(tokens_per_day))
+        self.db_path = db_path
+        self.clock = clock
+        
+        self._states: Dict[str, BucketState] = {}
+        self._updates = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        
+        if db_path:
+            self._init_db()
+    
+    @property
+    def enabled(self) -> bool:
+        """Se algum dos limites está ativo."""
+        return self.max_requests > 0 or self.tokens_per_day > 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Retorna a conexão persistente da thread atual (em modo autocommit)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _init_db(self) -> None:
+        """Cria a tabela de estado dos limites."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                allowance REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                day TEXT NOT NULL,
+                day_tokens INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+    
+    def _refill(self, state: Optional[BucketState], now: float) -> BucketState:
+        """Aplica a reposição de requisições e a virada do dia a um estado."""
+        day = _utc_day(now)
+        if state is None:
+            return (float(self.max_requests), now, day, 0)
+        
+        allowance, updated_at, state_day, day_tokens = state
+        if self.max_requests:
+            rate = self.max_requests / self.window_seconds
+            allowance = min(float(self.max_requests), allowance + max(now - updated_at, 0) * rate)
+        if state_day != day:
+            day_tokens = 0
+        return (allowance, now, day, day_tokens)
+    
+    def _update(self, key: str, change: Callable[[BucketState, float], BucketState]) -> BucketState:
+        """
+        Lê, altera e grava o estado de uma chave atomicamente.
+        
+        Args:
+            key: Chave do limite
+            change: Recebe o estado já reposto e o instante atual e retorna o
+                novo estado (ou lança RateLimitExceeded sem alterar nada)
+        
+        Returns:
+            Novo estado
+        """
+        now = self.clock()
+        self._updates += 1
+        if self._updates % PRUNE_EVERY == 0:
+            self.prune(now)
+        
+        if not self.db_path:
+            with self._lock:
+                state = change(self._refill(self._states.get(key), now), now)
+                self._states[key] = state
+                return state
+        
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT allowance, updated_at, day, day_tokens FROM rate_limits WHERE key = ?",
+                (key,)
+            ).fetchone()
+            state = change(self._refill(tuple(row) if row else None, now), now)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, allowance, updated_at, day, day_tokens) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, *state)
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return state
+    
+    def prune(self, now: Optional[float] = None) -> None:
+        """
+        Apaga o estado das chaves sem uso há mais de um dia (e de uma janela).
+        
+        Args:
+            now: Instante atual (padrão: o relógio do limitador)
+        """
+        now = self.clock() if now is None else now
+        cutoff = now - max(SECONDS_PER_DAY, self.window_seconds)
+        with self._lock:
+            self._states = {key: state for key, state in self._states.items() if state[1] >= cutoff}
+        if self.db_path:
+            self._connect().execute("DELETE FROM rate_limits WHERE updated_at < ?", (cutoff,))
+    
+    def acquire(self, key: str, tokens: int = 0) -> None:
+        """
+        Consome uma requisição e reserva 'tokens' da cota diária da chave.
+        
+        Args:
+            key: Usuário ou chave de API
+            tokens: Tokens reservados para a requisição (prompt + resposta)
+        
+        Raises:
+            RateLimitExceeded: Se não há requisição disponível ou a cota
+                diária não comporta os tokens
+        """
+        if not self.enabled:
+            return
+        
+        def consume(state: BucketState, now: float) -> BucketState:
+            allowance, updated_at, day, day_tokens = state
+            if self.max_requests and allowance < 1:
+                rate = self.max_requests / self.window_seconds
+                raise RateLimitExceeded('requests', (1 - allowance) / rate)
+            if self.tokens_per_day and day_tokens + tokens > self.tokens_per_day:
+                raise RateLimitExceeded('tokens', SECONDS_PER_DAY - now % SECONDS_PER_DAY)
+            if self.max_requests:
+                allowance -= 1
+            return (allowance, updated_at, day, day_tokens + tokens)
+        
+        self._update(key, consume)
+    
+    def adjust_tokens(self, key: str, delta: int) -> None:
+        """
+        Corrige os tokens do dia depois da resposta (uso real menos o reservado).
+        
+        Args:
+            key: Usuário ou chave de API
+            delta: Tokens a somar (negativo devolve parte da reserva)
+        """
+        if not self.tokens_per_day or not delta:
+            return
+        
+        def adjust(state: BucketState, now: float) -> BucketState:
+            allowance, updated_at, day, day_tokens = state
+            return (allowance, updated_at, day, max(day_tokens + delta, 0))
+        
+        self._update(key, adjust)
+    
+    def usage(self, key: str) -> Dict[str, Any]:
+        """
+        Retorna o uso atual de uma chave.
+        
+        Args:
+            key: Usuário ou chave de API
+        
+        Returns:
+            Dicionário com requisições disponíveis, tokens usados e restantes no dia
+        """
+        now = self.clock()
+        if self.db_path:
+            row = self._connect().execute(
+                "SELECT allowance, updated_at, day, day_tokens FROM rate_limits WHERE key = ?",
+                (key,)
+            ).fetchone()
+            state = self._refill(tuple(row) if row else None, now)
+        else:
+            with self._lock:
+                state = self._refill(self._states.get(key), now)
+        
+        allowance, _, _, day_tokens = state
+        return {
+            "requests_available": int(allowance) if self.max_requests else None,
+            "tokens_today": day_tokens,
+            "tokens_remaining": max(self.tokens_per_day - day_tokens, 0) if self.tokens_per_day else None
+        }
+    
+    def reset(self, key: Optional[str] = None) -> None:
+        """
+        Apaga o estado de uma chave (ou de todas).
+        
+        Args:
+            key: Chave a apagar (None = todas)
+        """
+        with self._lock:
+            if key is None:
+                self._states.clear()
+            else:
+                self._states.pop(key, None)
+        
+        if self.db_path:
+            if key is None:
+                self._connect().execute("DELETE FROM rate_limits")
+            else:
+                self._connect().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+def rate_limit_key(config: Dict[str, Any]) -> str:
+    """
+    Chave de limite de uma configuração: 'rate_limit_key' (ex.: o usuário)
+    ou, sem ela, um hash da chave de API (a chave nunca é gravada).
+    
+    Args:
+        config: Configurações do chatbot
+    
+    Returns:
+        Chave do limite
+    """
+    if config.get('rate_limit_key'):
+        return f"user:{config['rate_limit_key']}"
+    api_key = config.get('openai_api_key') or ''
+    return "api:" + hashlib.blake2b(api_key.encode('utf-8'), digest_size=8).hexdigest()
+
+_shared_limiters: Dict[Tuple[Optional[str], int, int], RateLimiter] = {}
+_shared_lock = threading.Lock()
+
+def get_rate_limiter(config: Dict[str, Any]) -> RateLimiter:
+    """
+    Retorna o limitador compartilhado do processo para a configuração dada.
+    
+    Usa 'max_requests_per_minute' e 'max_tokens_per_day' (ausentes ou 0 =
+    sem limite). Com 'rate_limit_persistent' (padrão), o estado fica no
+    banco de 'database_path' e vale para todos os processos.
+    
+    Args:
+        config: Configurações do chatbot
+    
+    Returns:
+        Instância compartilhada de RateLimiter
+    """
+    max_requests = int(config.get('max_requests_per_minute') or 0)
+    tokens_per_day = int(config.get('max_tokens_per_day') or 0)
+    persistent = config.get('rate_limit_persistent', True) and (max_requests or tokens_per_day)
+    db_path = config.get('database_path') if persistent else None
+    key = (db_path, max_requests, tokens_per_day)
+    
+    with _shared_lock:
+        if key not in _shared_limiters:
+            _shared_limiters[key] = RateLimiter(
+                max_requests=max_requests,
+                window_seconds=60.0,
+                tokens_per_day=tokens_per_day,
+                db_path=db_path
+            )
+        return _shared_limiters[key]
@@ -0,0 +1,341 @@
+"""
+Resiliência das chamadas à API do OpenAI: novas tentativas com backoff,
+failover entre chaves/modelos e circuit breaker por endpoint
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import openai
+
+# URL base usada pela biblioteca quando o cliente não define outra
+DEFAULT_API_BASE = "https://api.openai.com/v1"
+
+# Erros transitórios: vale a pena tentar de novo no mesmo endpoint
+# (APITimeoutError é um APIConnectionError)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# Erros que indicam instabilidade do endpoint (contam para o circuit breaker)
+ENDPOINT_FAILURE_ERRORS = (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# Erros da chave: não adianta repetir, mas outra chave pode funcionar
+KEY_ERRORS = (
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+)
+
+class CircuitOpenError(openai.OpenAIError):
+    """Todos os endpoints disponíveis estão com o circuito aberto."""
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um endpoint (URL base + modelo).
+    
+    Depois de 'failure_threshold' falhas seguidas o circuito abre e as
+    chamadas são recusadas por 'reset_timeout' segundos; em seguida uma
+    única chamada de teste é liberada (meio-aberto) e as demais continuam
+    recusadas até o resultado dela: se funcionar, o circuito fecha; se
+    falhar, abre de novo. Um teste sem resposta por 'reset_timeout'
+    segundos (por exemplo, uma tarefa cancelada) libera outro.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Inicializa o circuit breaker.
+        
+        Args:
+            failure_threshold: Falhas seguidas para abrir o circuito
+            reset_timeout: Segundos com o circuito aberto antes de testar de novo
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """Estado atual: 'closed', 'open' ou 'half_open'."""
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+    
+    def allow_request(self) -> bool:
+        """
+        Indica se uma chamada pode ser feita neste endpoint.
+        
+        No estado meio-aberto, só a chamada de teste recebe True; quem a
+        recebe deve depois chamar record_success, record_failure ou release.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            if self.probe_started_at is not None and now - self.probe_started_at < self.reset_timeout:
+                return False
+            
+            self.probe_started_at = now
+            return True
+    
+    def record_success(self) -> None:
+        """Registra uma chamada bem-sucedida e fecha o circuito."""
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started_at = None
+    
+    def record_failure(self) -> None:
+        """Registra uma falha e abre o circuito ao atingir o limite."""
+        with self._lock:
+            self.failures += 1
+            self.probe_started_at = None
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+    
+    def release(self) -> None:
+        """Encerra a chamada de teste sem veredito (erro que não é do endpoint)."""
+        with self._lock:
+            self.probe_started_at = None
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(api_base: Optional[str], model: str,
+                        failure_threshold: int = 5, reset_timeout: float = 30.0) -> CircuitBreaker:
+    """
+    Retorna o circuit breaker compartilhado de um endpoint.
+    
+    Args:
+        api_base: URL base da API (None = DEFAULT_API_BASE)
+        model: Modelo chamado
+        failure_threshold: Falhas seguidas para abrir o circuito
+        reset_timeout: Segundos com o circuito aberto antes de testar de novo
+    
+    Returns:
+        Instância compartilhada de CircuitBreaker
+    """
+    key = (api_base or DEFAULT_API_BASE, model)
+    with _breakers_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(failure_threshold, reset_timeout)
+        return _breakers[key]
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Lê o cabeçalho Retry-After (segundos ou data HTTP) de um erro da API.
+    
+    Args:
+        error: Exceção retornada pela biblioteca do OpenAI
+    
+    Returns:
+        Segundos a aguardar ou None se o cabeçalho não existe
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000, 0.0)
+        except ValueError:
+            pass
+    
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+        return max(retry_at.timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Política de novas tentativas com backoff exponencial e jitter.
+    
+    Sobre uma lista de chaves e modelos, cada combinação (candidato) é
+    tentada até 'max_retries' vezes extras antes de passar para a próxima.
+    """
+    
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        """
+        Inicializa a política.
+        
+        Args:
+            max_retries: Novas tentativas por candidato
+            base_delay: Espera base em segundos (dobra a cada tentativa)
+            max_delay: Espera máxima; um Retry-After maior faz o failover imediato
+            failure_threshold: Falhas seguidas para abrir o circuito de um endpoint
+            reset_timeout: Segundos com o circuito aberto antes de testar de novo
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RetryPolicy":
+        """
+        Cria a política a partir das configurações do chatbot.
+        
+        Args:
+            config: Dicionário com configurações
+        
+        Returns:
+            Política configurada
+        """
+        return cls(
+            max_retries=config.get('max_retries', 2),
+            base_delay=config.get('retry_base_delay', 0.5),
+            max_delay=config.get('retry_max_delay', 20.0),
+            failure_threshold=config.get('circuit_failure_threshold', 5),
+            reset_timeout=config.get('circuit_reset_timeout', 30.0)
+        )
+    
+    def backoff(self, attempt: int, error: Exception) -> Optional[float]:
+        """
+        Calcula a espera antes da próxima tentativa.
+        
+        Args:
+            attempt: Número da tentativa que falhou (0 = primeira)
+            error: Erro retornado
+        
+        Returns:
+            Segundos a aguardar ou None se é melhor passar ao próximo candidato
+        """
+        if attempt >= self.max_retries:
+            return None
+        
+        retry_after = parse_retry_after(error)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_delay else None
+        
+        # Full jitter: espera aleatória entre 0 e o teto exponencial
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def breaker_for(self, api_base: Optional[str], model: str) -> CircuitBreaker:
+        """Retorna o circuit breaker do endpoint com os limites desta política."""
+        return get_circuit_breaker(api_base, model, self.failure_threshold, self.reset_timeout)
+    
+    def _record(self, breaker: CircuitBreaker, error: BaseException) -> None:
+        """Atualiza o circuit breaker conforme o tipo de erro."""
+        if isinstance(error, ENDPOINT_FAILURE_ERRORS):
+            breaker.record_failure()
+        else:
+            breaker.release()
+    
+    def call(self, candidates: List[Tuple[str, str]], api_base: Optional[str],
+             request: Callable[[str, str], Any]) -> Any:
+        """
+        Executa a requisição com novas tentativas e failover.
+        
+        Args:
+            candidates: Lista de pares (chave da API, modelo) em ordem de preferência
+            api_base: URL base da API (identifica o endpoint no circuit breaker)
+            request: Função que recebe (chave, modelo) e faz a chamada
+        
+        Returns:
+            Resultado da primeira chamada bem-sucedida
+        """
+        last_error: Exception = CircuitOpenError("Serviço temporariamente indisponível")
+        
+        for api_key, model in candidates:
+            breaker = self.breaker_for(api_base, model)
+            attempt = 0
+            
+            while breaker.allow_request():
+                try:
+                    result = request(api_key, model)
+                    breaker.record_success()
+                    return result
+                except KEY_ERRORS as e:
+                    last_error = e
+                    breaker.release()
+                    break
+                except RETRYABLE_ERRORS as e:
+                    last_error = e
+                    self._record(breaker, e)
+                    delay = self.backoff(attempt, e)
+                    if delay is None:
+                        break
+                    time.sleep(delay)
+                    attempt += 1
+                except BaseException as e:
+                    self._record(breaker, e)
+                    raise
+        
+        raise last_error
+    
+    async def acall(self, candidates: List[Tuple[str, str]], api_base: Optional[str],
+                    request: Callable[[str, str], Awaitable[Any]]) -> Any:
+        """
+        Versão assíncrona de call: as esperas não bloqueiam o event loop.
+        
+        Args:
+            candidates: Lista de pares (chave da API, modelo) em ordem de preferência
+            api_base: URL base da API (identifica o endpoint no circuit breaker)
+            request: Corrotina que recebe (chave, modelo) e faz a chamada
+        
+        Returns:
+            Resultado da primeira chamada bem-sucedida
+        """
+        last_error: Exception = CircuitOpenError("Serviço temporariamente indisponível")
+        
+        for api_key, model in candidates:
+            breaker = self.breaker_for(api_base, model)
+            attempt = 0
+            
+            while breaker.allow_request():
+                try:
+                    result = await request(api_key, model)
+                    breaker.record_success()
+                    return result
+                except KEY_ERRORS as e:
+                    last_error = e
+                    breaker.release()
+                    break
+                except RETRYABLE_ERRORS as e:
+                    last_error = e
+                    self._record(breaker, e)
+                    delay = self.backoff(attempt, e)
+                    if delay is None:
+                        break
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                except BaseException as e:
+                    self._record(breaker, e)
+                    raise
+        
+        raise last_error
@@ -0,0 +1,512 @@
+"""
+Banco de conversas particionado em vários arquivos SQLite (shards)
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from .database import ConversationDB
+
+MANIFEST_NAME = "shards.json"
+
+# Maior rowid do SQLite: nenhum id é maior, então "id > MAX_ROWID" não casa nada
+MAX_ROWID = 2 ** 63 - 1
+
+def shard_for(conversation_id: str, shards: int) -> int:
+    """
+    Calcula o shard de uma conversa (estável entre processos e execuções).
+    
+    Args:
+        conversation_id: ID da conversa
+        shards: Número de shards
+    
+    Returns:
+        Índice do shard
+    """
+    digest = hashlib.blake2b(conversation_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+class ShardedConversationDB:
+    """
+    Conversas distribuídas por hash do conversation_id entre N arquivos
+    SQLite, com a mesma API pública de ConversationDB.
+    
+    Cada conversa vive inteira em um shard, então gravações de conversas em
+    shards diferentes não disputam o mesmo lock de escrita. Operações por
+    conversa vão direto ao shard; listagens, busca e estatísticas consultam
+    todos os shards em paralelo e combinam os resultados.
+    """
+    
+    def __init__(self, directory: str, shards: Optional[int] = None, **db_options: Any):
+        """
+        Abre (ou cria) o conjunto de shards.
+        
+        Args:
+            directory: Diretório dos arquivos dos shards
+            shards: Número de shards (None = o registrado no diretório, ou 4)
+            **db_options: Parâmetros repassados a cada ConversationDB
+                (cache_size_kb, mmap_size_mb, busy_timeout_ms, compression...)
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                registered = json.load(f)['shards']
+            if shards is not None and shards != registered:
+                raise ValueError(
+                    f"O diretório {directory} tem {registered} shards, não {shards}; "
+                    "use 'python -m src.cli reshard' para mudar o número de shards"
+                )
+            shards = registered
+        else:
+            shards = shards or 4
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump({"shards": shards}, f)
+        
+        self.shard_count = shards
+        self.shards = [
+            ConversationDB(self.shard_path(directory, i), **db_options)
+            for i in range(shards)
+        ]
+        self._executor = ThreadPoolExecutor(max_workers=shards, thread_name_prefix="conversation-shard")
+    
+    @staticmethod
+    def shard_path(directory: str, index: int) -> str:
+        """Caminho do arquivo de um shard."""
+        return os.path.join(directory, f"conversations-{index:02d}.db")
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ShardedConversationDB":
+        """
+        Cria o banco particionado a partir das configurações da aplicação.
+        
+        Args:
+            config: Dicionário com configurações
+        
+        Returns:
+            Instância de ShardedConversationDB
+        """
+        db = cls(
+            config.get('db_shard_dir', 'data/shards'),
+            shards=config.get('db_shards'),
+            cache_size_kb=config.get('db_cache_size_kb', 8192),
+            mmap_size_mb=config.get('db_mmap_size_mb', 64),
+            busy_timeout_ms=config.get('db_busy_timeout_ms', 5000),
+            compression=config.get('db_compression', False),
+            compression_level=config.get('db_compression_level', 6)
+        )
+        
+        if config.get('db_write_behind', False):
+            db.start_writer(
+                max_queue=config.get('db_write_queue_size', 10000),
+                flush_interval_ms=config.get('db_flush_interval_ms', 50),
+                max_batch_rows=config.get('db_flush_max_rows', 500),
+                durability=config.get('db_durability', 'normal')
+            )
+        
+        return db
+    
+    def shard(self, conversation_id: str) -> ConversationDB:
+        """Retorna o shard onde a conversa está (ou será) gravada."""
+        return self.shards[shard_for(conversation_id, self.shard_count)]
+    
+    def _fan_out(self, call: Callable[[ConversationDB], Any]) -> List[Any]:
+        """Executa 'call' em todos os shards em paralelo, na ordem dos shards."""
+        return list(self._executor.map(call, self.shards))
+    
+    def start_writer(self, **options: Any) -> None:
+        """
+        Ativa a gravação em segundo plano em todos os shards.
+        
+        Args:
+            **options: Parâmetros de BackgroundWriter
+        """
+        for shard in self.shards:
+            shard.start_writer(**options)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a gravação das mensagens enfileiradas em todos os shards."""
+        return all(self._fan_out(lambda shard: shard.flush(timeout)))
+    
+    def close(self) -> None:
+        """Grava as mensagens pendentes e fecha todos os shards."""
+        self._fan_out(lambda shard: shard.close())
+        self._executor.shutdown(wait=True)
+    
+    # Operações por conversa: vão direto ao shard da conversa
+    
+    def save_conversation(self, messages: List[Dict[str, Any]], personality: str,
+                          history_summary: Optional[str] = None) -> str:
+        """Salva uma conversa nova no seu shard (ver ConversationDB.save_conversation)."""
+        conversation_id = str(uuid.uuid4())
+        self.append_messages(conversation_id, messages, personality, history_summary)
+        return conversation_id
+    
+    def append_messages(self, conversation_id: str, messages: List[Dict[str, Any]],
+                        personality: Optional[str] = None,
+                        history_summary: Optional[str] = None) -> int:
+        """Acrescenta mensagens a uma conversa (ver ConversationDB.append_messages)."""
+        return self.shard(conversation_id).append_messages(
+            conversation_id, messages, personality, history_summary
+        )
+    
+    def load_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Carrega uma conversa (ver ConversationDB.load_conversation)."""
+        return self.shard(conversation_id).load_conversation(conversation_id)
+    
+    def iter_messages(self, conversation_id: str, after_id: Optional[int] = None,
+                      batch: int = 500) -> Iterator[Dict[str, Any]]:
+        """Percorre as mensagens de uma conversa (ver ConversationDB.iter_messages)."""
+        return self.shard(conversation_id).iter_messages(conversation_id, after_id, batch)
+    
+    def load_messages_page(self, conversation_id: str, after_id: Optional[int] = None,
+                           limit: int = 500) -> List[Dict[str, Any]]:
+        """Carrega uma página de mensagens (ver ConversationDB.load_messages_page)."""
+        return self.shard(conversation_id).load_messages_page(conversation_id, after_id, limit)
+    
+    def load_tail(self, conversation_id: str, n: int = 50,
+                  before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Carrega as últimas mensagens de uma conversa (ver ConversationDB.load_tail)."""
+        return self.shard(conversation_id).load_tail(conversation_id, n, before_id)
+    
+    def delete_conversation(self, conversation_id: str) -> bool:
+        """Deleta uma conversa (ver ConversationDB.delete_conversation)."""
+        return self.shard(conversation_id).delete_conversation(conversation_id)
+    
+    # Operações sobre todas as conversas: consultam os shards em paralelo
+    
+    def iter_conversations(self, personality: Optional[str] = None,
+                           created_after: Optional[str] = None,
+                           created_before: Optional[str] = None,
+                           conversation_ids: Optional[Iterable[str]] = None,
+                           batch: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os cabeçalhos das conversas de cada shard, um após o outro
+        (ver ConversationDB.iter_conversations); a ordem por created_at vale
+        dentro de cada shard.
+        """
+        by_shard: Optional[Dict[int, List[str]]] = None
+        if conversation_ids is not None:
+            by_shard = {}
+            for conversation_id in conversation_ids:
+                by_shard.setdefault(shard_for(conversation_id, self.shard_count), []).append(conversation_id)
+        
+        for index, shard in enumerate(self.shards):
+            if by_shard is not None and index not in by_shard:
+                continue
+            yield from shard.iter_conversations(
+                personality, created_after, created_before,
+                by_shard[index] if by_shard is not None else None, batch
+            )
+    
+    def iter_conversation_metrics(self, batch: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """Percorre as métricas por conversa de cada shard, um após o outro."""
+        for shard in self.shards:
+            yield from shard.iter_conversation_metrics(batch)
+    
+    def list_conversations(self, limit: int = 50, personality: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lista as conversas mais recentes de todos os shards."""
+        return self.list_conversations_page(limit, personality)['conversations']
+    
+    def list_conversations_page(self, limit: int = 50, personality: Optional[str] = None,
+                                cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Lista conversas de todos os shards, das mais recentes para as mais antigas.
+        
+        O cursor (created_at, id) é global: cada shard devolve sua próxima
+        página a partir dele e as páginas são intercaladas.
+        
+        Args:
+            limit: Número máximo de conversas por página
+            personality: Filtrar por personalidade (opcional)
+            cursor: Cursor da próxima página, retornado pela chamada anterior
+        
+        Returns:
+            Dicionário com 'conversations' e 'next_cursor' (None na última página)
+        """
+        pages = self._fan_out(lambda shard: shard.list_conversations_page(limit, personality, cursor))
+        
+        merged = sorted(
+            (conversation for page in pages for conversation in page['conversations']),
+            key=lambda c: (c['created_at'], c['id']),
+            reverse=True
+        )
+        has_more = len(merged) > limit or any(page['next_cursor'] for page in pages)
+        merged = merged[:limit]
+        
+        next_cursor = None
+        if has_more and merged:
+            next_cursor = f"{merged[-1]['created_at']}:{merged[-1]['id']}"
+        
+        return {"conversations": merged, "next_cursor": next_cursor}
+    
+    def search_messages(self, query: str, personality: Optional[str] = None,
+                        limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Busca mensagens em todos os shards, ordenadas por relevância.
+        
+        Os ids de mensagem só são únicos dentro de um shard, então cada
+        resultado traz também 'shard' e o cursor é (rank, shard, id). O BM25
+        é calculado por shard, o que é uma boa aproximação quando as
+        conversas estão bem distribuídas.
+        
+        Args:
+            query: Texto de busca (sem diferenciar acentos e maiúsculas)
+            personality: Filtrar por personalidade (opcional)
+            limit: Número máximo de resultados por página
+            cursor: Cursor da próxima página, retornado pela chamada anterior
+        
+        Returns:
+            Dicionário com 'results' e 'next_cursor' (None na última página)
+        """
+        def shard_cursor(index: int) -> Optional[str]:
+            # Traduz o cursor global para a condição equivalente em cada shard
+            if not cursor:
+                return None
+            rank, last_shard, last_id = cursor.split(":")
+            if index < int(last_shard):
+                return f"{rank}:{MAX_ROWID}"
+            if index == int(last_shard):
+                return f"{rank}:{last_id}"
+            return f"{rank}:0"
+        
+        def search(index: int) -> Dict[str, Any]:
+            page = self.shards[index].search_messages(query, personality, limit, shard_cursor(index))
+            for result in page['results']:
+                result['shard'] = index
+            return page
+        
+        pages = list(self._executor.map(search, range(self.shard_count)))
+        
+        merged = sorted(
+            (result for page in pages for result in page['results']),
+            key=lambda r: (r['rank'], r['shard'], r['message_id'])
+        )
+        has_more = len(merged) > limit or any(page['next_cursor'] for page in pages)
+        merged = merged[:limit]
+        
+        next_cursor = None
+        if has_more and merged:
+            last = merged[-1]
+            next_cursor = f"{last['rank']!r}:{last['shard']}:{last['message_id']}"
+        
+        return {"results": merged, "next_cursor": next_cursor}
+    
+    def existing_content_hashes(self, hashes: Iterable[str]) -> Set[str]:
+        """Retorna quais hashes de conteúdo já estão em algum shard."""
+        hashes = list(hashes)
+        return set().union(*self._fan_out(lambda shard: shard.existing_content_hashes(hashes)))
+    
+    def import_conversations(self, conversations: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Grava conversas completas nos seus shards, uma transação por shard,
+        em paralelo (ver ConversationDB.import_conversations).
+        
+        A mesma conversa pode ter ids diferentes em dois arquivos importados,
+        então os hashes são verificados em todos os shards antes da gravação.
+        """
+        existing = self.existing_content_hashes(c['content_hash'] for c in conversations)
+        by_shard: Dict[int, List[Dict[str, Any]]] = {}
+        duplicates = 0
+        for conversation in conversations:
+            if conversation['content_hash'] in existing:
+                duplicates += 1
+                continue
+            # Repetições no próprio lote podem ter ids de shards diferentes
+            existing.add(conversation['content_hash'])
+            by_shard.setdefault(shard_for(conversation['id'], self.shard_count), []).append(conversation)
+        
+        reports = list(self._executor.map(
+            lambda index: self.shards[index].import_conversations(by_shard[index]), by_shard
+        ))
+        return {
+            "conversations": sum(report['conversations'] for report in reports),
+            "messages": sum(report['messages'] for report in reports),
+            "duplicates": duplicates + sum(report['duplicates'] for report in reports),
+            "conflicts": sum(report['conflicts'] for report in reports)
+        }
+    
+    def rebuild_search_index(self) -> int:
+        """Reconstrói o índice de busca de todos os shards."""
+        return sum(self._fan_out(lambda shard: shard.rebuild_search_index()))
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna estatísticas combinadas de todos os shards.
+        
+        Returns:
+            Dicionário com estatísticas
+        """
+        return self._merge_statistics(self._fan_out(lambda shard: shard.get_statistics()))
+    
+    def rebuild_statistics(self) -> Dict[str, Any]:
+        """Recalcula os contadores de estatísticas de todos os shards."""
+        return self._merge_statistics(self._fan_out(lambda shard: shard.rebuild_statistics()))
+    
+    @staticmethod
+    def _merge_statistics(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Soma os totais e combina as contagens por personalidade."""
+        by_personality: Dict[str, int] = {}
+        for stats in results:
+            for personality, count in stats['conversations_by_personality'].items():
+                by_personality[personality] = by_personality.get(personality, 0) + count
+        
+        dates = [stats['last_conversation_date'] for stats in results if stats['last_conversation_date']]
+        
+        return {
+            "total_conversations": sum(stats['total_conversations'] for stats in results),
+            "total_messages": sum(stats['total_messages'] for stats in results),
+            "conversations_by_personality": dict(
+                sorted(by_personality.items(), key=lambda item: item[1], reverse=True)
+            ),
+            "last_conversation_date": max(dates) if dates else None
+        }
+    
+    def cleanup_old_conversations(self, days_old: int = 30, batch_size: int = 500,
+                                  pause_seconds: float = 0.01,
+                                  vacuum_pages: Optional[int] = None) -> Dict[str, int]:
+        """Remove conversas antigas de todos os shards, em paralelo."""
+        reports = self._fan_out(lambda shard: shard.cleanup_old_conversations(
+            days_old, batch_size, pause_seconds, vacuum_pages
+        ))
+        return {key: sum(report[key] for report in reports) for key in reports[0]}
+    
+    def incremental_vacuum(self, pages: Optional[int] = None) -> int:
+        """Devolve páginas livres de todos os shards ao sistema de arquivos."""
+        return sum(self._fan_out(lambda shard: shard.incremental_vacuum(pages)))
+    
+    def vacuum(self) -> int:
+        """Executa um VACUUM completo em todos os shards."""
+        return sum(self._fan_out(lambda shard: shard.vacuum()))
+    
+    def train_compression_dictionary(self, samples: int = 5000, dict_size: int = 16 * 1024,
+                                     codec: Optional[str] = None) -> List[int]:
+        """Treina um dicionário de compressão em cada shard, com as mensagens dele."""
+        return self._fan_out(lambda shard: shard.train_compression_dictionary(samples, dict_size, codec))
+    
+    def recompress_messages(self, batch_size: int = 500, pause_seconds: float = 0.01) -> Dict[str, int]:
+        """Regrava o conteúdo das mensagens de todos os shards com o dicionário atual."""
+        reports = self._fan_out(lambda shard: shard.recompress_messages(batch_size, pause_seconds))
+        return {key: sum(report[key] for report in reports) for key in reports[0]}
+
+AnyConversationDB = Union[ConversationDB, ShardedConversationDB]
+
+def open_database(config: Dict[str, Any]) -> AnyConversationDB:
+    """
+    Abre o banco de conversas configurado: um arquivo ou, com DB_SHARDS > 1,
+    o conjunto de shards em DB_SHARD_DIR.
+    
+    Args:
+        config: Dicionário com configurações
+    
+    Returns:
+        ConversationDB ou ShardedConversationDB
+    """
+    if int(config.get('db_shards', 1)) > 1:
+        return ShardedConversationDB.from_config(config)
+    return ConversationDB.from_config(config)
+
+def _open_source(path: str) -> AnyConversationDB:
+    """Abre a origem de um reshard: um arquivo .db ou um diretório de shards."""
+    if os.path.isdir(path):
+        return ShardedConversationDB(path)
+    return ConversationDB(path)
+
+def reshard(source: str, target: str, shards: int, batch_size: int = 500,
+            progress: Optional[Callable[[int], None]] = None, **db_options: Any) -> Dict[str, int]:
+    """
+    Copia todas as conversas de um banco (arquivo único ou shards) para um
+    novo conjunto de shards.
+    
+    Os cabeçalhos das conversas são copiados como estão e as mensagens na
+    ordem original; os ids das mensagens são renumerados em cada shard e o
+    conteúdo é regravado conforme a compressão do destino.
+    As conversas da origem não são alteradas.
+    
+    Args:
+        source: Arquivo .db ou diretório de shards de origem
+        target: Diretório de destino (vazio ou inexistente)
+        shards: Número de shards do destino
+        batch_size: Conversas copiadas por transação
+        progress: Função chamada com o total de conversas copiadas a cada lote
+        **db_options: Parâmetros dos shards de destino (por exemplo, compression)
+    
+    Returns:
+        Dicionário com conversas e mensagens copiadas
+    """
+    if os.path.isdir(target) and os.listdir(target):
+        raise ValueError(f"O diretório de destino {target} não está vazio")
+    
+    origin = _open_source(source)
+    destination = ShardedConversationDB(target, shards=shards, **db_options)
+    copied = {"conversations": 0, "messages": 0}
+    
+    try:
+        sources = origin.shards if isinstance(origin, ShardedConversationDB) else [origin]
+        for source_db in sources:
+            last_id = ""
+            while True:
+                with source_db._connect() as conn:
+                    headers = [dict(row) for row in conn.execute("""
+                        SELECT * FROM conversations WHERE id > ? ORDER BY id LIMIT ?
+                    """, (last_id, batch_size)).fetchall()]
+                if not headers:
+                    break
+                last_id = headers[-1]['id']
+                
+                by_shard: Dict[int, List[Dict[str, Any]]] = {}
+                for header in headers:
+                    by_shard.setdefault(shard_for(header['id'], shards), []).append(header)
+                
+                for index, shard_headers in by_shard.items():
+                    copied["messages"] += _copy_conversations(
+                        source_db, destination.shards[index], shard_headers
+                    )
+                
+                copied["conversations"] += len(headers)
+                if progress:
+                    progress(copied["conversations"])
+    finally:
+        origin.close()
+        destination.close()
+    
+    return copied
+
+def _copy_conversations(source: ConversationDB, target: ConversationDB,
+                        headers: List[Dict[str, Any]]) -> int:
+    """Copia conversas (cabeçalho e mensagens) para um shard em uma transação."""
+    columns = ["id", "personality", "start_time", "end_time", "message_count",
+               "history_summary", "content_hash", "created_at", "updated_at"]
+    copied = 0
+    
+    with target._connect() as conn:
+        conn.executemany(
+            f"INSERT INTO conversations ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(header.get(column) for column in columns) for header in headers]
+        )
+        
+        source_conn = source._connect()
+        for header in headers:
+            # As mensagens passam do cursor da origem para o destino sem
+            # montar a conversa inteira em memória
+            rows = source_conn.execute("""
+                SELECT conversation_id, role, content, timestamp, created_at
+                FROM messages WHERE conversation_id = ? ORDER BY id
+            """, (header['id'],))
+            
+            insert = conn.executemany("""
+                INSERT INTO messages (conversation_id, role, content, timestamp, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                (row[0], row[1], target._encode_content(source.codec.decode(row[2])), row[3], row[4])
+                for row in rows
+            ))
+            copied += insert.rowcount
+    
+    return copied
@@ -0,0 +1,298 @@
+"""
+Contagem de tokens do AI Chatbot Brasileiro
+
+Usa o tokenizador oficial (tiktoken) e, se ele não estiver instalado ou o
+vocabulário não puder ser carregado, registra um aviso e usa
+uma heurística que segue a pré-tokenização do cl100k: palavras, números,
+pontuação e espaços são contados separadamente, e caracteres fora do ASCII
+(acentos, emoji) custam mais, como no BPE por bytes.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depende do ambiente
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Se o aviso de contagem aproximada já foi registrado neste processo
+_fallback_warned = False
+
+# Tokens extras que a API adiciona a cada mensagem (papel e delimitadores)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Tokens reservados para o início da resposta do assistente
+REPLY_OVERHEAD_TOKENS = 3
+
+# Codificação dos modelos de chat (gpt-3.5-turbo, gpt-4)
+DEFAULT_ENCODING = "cl100k_base"
+
+# Pré-tokenização no estilo do cl100k: contrações, palavras com o espaço
+# anterior, números em grupos de até 3 dígitos, pontuação e espaços
+_PIECE_PATTERN = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+",
+    re.IGNORECASE
+)
+
+def _heuristic_piece_tokens(piece: str) -> int:
+    """Estima os tokens de um pedaço da pré-tokenização."""
+    if piece.isspace():
+        return 1
+    
+    word = piece.lstrip(" ")
+    if not word:
+        return 1
+    
+    if word.isascii():
+        if word.isalpha():
+            # Palavras curtas e comuns costumam ser um token; longas se dividem
+            return 1 if len(word) <= 6 else math.ceil(len(word) / 4)
+        if word.isdigit():
+            return 1
+        # Pontuação: combinações comuns de 1-2 símbolos formam um token
+        return math.ceil(len(word) / 2)
+    
+    # Fora do ASCII, o BPE trabalha sobre bytes UTF-8: acentos, emoji e
+    # outros alfabetos custam proporcionalmente mais
+    ascii_chars = sum(1 for ch in word if ch.isascii())
+    other_bytes = len(word.encode('utf-8')) - ascii_chars
+    return max(1, math.ceil(ascii_chars / 4 + other_bytes / 2))
+
+def heuristic_count(text: str) -> int:
+    """
+    Estima os tokens de um texto sem o tokenizador.
+    
+    Args:
+        text: Texto para contar tokens
+    
+    Returns:
+        Número estimado de tokens
+    """
+    return sum(_heuristic_piece_tokens(piece) for piece in _PIECE_PATTERN.findall(text))
+
+
+def _warn_fallback(encoding: str) -> None:
+    """Avisa uma única vez por processo que a contagem será aproximada."""
+    global _fallback_warned
+    if _fallback_warned:
+        return
+    _fallback_warned = True
+    if tiktoken is None:
+        reason = "o pacote tiktoken não está instalado"
+    else:
+        reason = f"não foi possível carregar a codificação '{encoding}'"
+    logger.warning("Contagem de tokens aproximada (heurística): %s", reason)
+
+
+class TokenCounter:
+    """
+    Contador de tokens com cache LRU por hash do conteúdo.
+    
+    O cache evita recontar mensagens repetidas (histórico reenviado a cada
+    turno, respostas em cache); count_tokens_batch divide o custo fixo de
+    cada chamada entre muitos textos em backfills grandes.
+    """
+    
+    def __init__(self, encoding: str = DEFAULT_ENCODING, cache_size: int = 10000,
+                 use_tokenizer: bool = True):
+        """
+        Inicializa o contador.
+        
+        Args:
+            encoding: Codificação do tiktoken (ex.: 'cl100k_base')
+            cache_size: Número máximo de textos mantidos no cache
+            use_tokenizer: Se False, usa sempre a heurística
+        """
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        self._encoding = None
+        if use_tokenizer and tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding)
+            except Exception:
+                # Sem o arquivo do vocabulário em cache e sem rede: usar a heurística
+                self._encoding = None
+        if use_tokenizer and self._encoding is None:
+            _warn_fallback(encoding)
+    
+    @property
+    def backend(self) -> str:
+        """Método de contagem em uso: 'tiktoken' ou 'heuristic'."""
+        return "tiktoken" if self._encoding is not None else "heuristic"
+    
+    @staticmethod
+    def _key(text: str) -> bytes:
+        """Chave do cache: hash do conteúdo (tamanho fixo, mesmo para textos longos)."""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    
+    def _lookup(self, key: bytes) -> Optional[int]:
+        """Busca uma contagem no cache, atualizando a ordem de uso."""
+        with self._lock:
+            count = self._cache.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return count
+    
+    def _store(self, key: bytes, count: int) -> None:
+        """Guarda uma contagem no cache, descartando as menos usadas."""
+        with self._lock:
+            self._cache[key] = count
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def count(self, text: str) -> int:
+        """
+        Conta os tokens de um texto.
+        
+        Args:
+            text: Texto para contar tokens
+        
+        Returns:
+            Número de tokens
+        """
+        if not text:
+            return 0
+        
+        key = self._key(text)
+        count = self._lookup(key)
+        if count is None:
+            if self._encoding is not None:
+                count = len(self._encoding.encode_ordinary(text))
+            else:
+                count = heuristic_count(text)
+            self._store(key, count)
+        return count
+    
+    def count_batch(self, texts: Iterable[str]) -> List[int]:
+        """
+        Conta os tokens de vários textos de uma vez.
+        
+        Textos repetidos são contados uma única vez e, com o tiktoken, os
+        textos fora do cache são codificados em lote (em paralelo).
+        
+        Args:
+            texts: Textos para contar tokens
+        
+        Returns:
+            Número de tokens de cada texto, na mesma ordem
+        """
+        texts = list(texts)
+        keys = [self._key(text) if text else b"" for text in texts]
+        
+        known: Dict[bytes, int] = {b"": 0}
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key in known or key in missing:
+                continue
+            count = self._lookup(key)
+            if count is None:
+                missing[key] = text
+            else:
+                known[key] = count
+        
+        if missing:
+            pending = list(missing.items())
+            if self._encoding is not None:
+                encoded = self._encoding.encode_ordinary_batch([text for _, text in pending])
+                counts = [len(tokens) for tokens in encoded]
+            else:
+                counts = [heuristic_count(text) for _, text in pending]
+            
+            for (key, _), count in zip(pending, counts):
+                known[key] = count
+                self._store(key, count)
+        
+        return [known[key] for key in keys]
+    
+    def stats(self) -> Dict[str, object]:
+        """
+        Retorna os contadores do cache.
+        
+        Returns:
+            Dicionário com método de contagem, acertos, falhas e tamanho do cache
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._cache)
+            }
+
+_default_counter: Optional[TokenCounter] = None
+_default_lock = threading.Lock()
+
+def get_token_counter() -> TokenCounter:
+    """
+    Retorna o contador de tokens compartilhado do processo.
+    
+    TOKENIZER=heuristic desativa o tiktoken; TOKEN_CACHE_SIZE define o
+    tamanho do cache.
+    
+    Returns:
+        Instância compartilhada de TokenCounter
+    """
+    global _default_counter
+    with _default_lock:
+        if _default_counter is None:
+            _default_counter = TokenCounter(
+                cache_size=int(os.getenv('TOKEN_CACHE_SIZE', 10000)),
+                use_tokenizer=os.getenv('TOKENIZER', 'auto').lower() != 'heuristic'
+            )
+        return _default_counter
+
+def count_tokens(text: str) -> int:
+    """
+    Conta os tokens de um texto.
+    
+    Args:
+        text: Texto para contar tokens
+    
+    Returns:
+        Número de tokens
+    """
+    return get_token_counter().count(text)
+
+def count_tokens_batch(texts: Iterable[str]) -> List[int]:
+    """
+    Conta os tokens de vários textos, com cache e deduplicação.
+    
+    Args:
+        texts: Textos para contar tokens
+    
+    Returns:
+        Número de tokens de cada texto, na mesma ordem
+    """
+    return get_token_counter().count_batch(texts)
+
+def count_message_tokens(content: str) -> int:
+    """
+    Conta os tokens que uma mensagem ocupa no prompt, incluindo o custo fixo
+    de cada mensagem.
+    
+    Args:
+        content: Conteúdo da mensagem
+    
+    Returns:
+        Número de tokens da mensagem
+    """
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
@@ -8,6 +8,10 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 import streamlit as st
 
+from .analytics import conversation_stats
+from .ratelimit import RateLimitExceeded, RateLimiter
+from .tokens import count_tokens
+
 def format_message(message: str, max_length: int = 1000) -> str:
     """
     Formata uma mensagem para exibição.
@@ -75,16 +79,16 @@ def import_conversation(json_data: str) -> Optional[List[Dict[str, Any]]]:
 
 def calculate_tokens_estimate(text: str) -> int:
     """
-    Estima o número de tokens em um texto.
-    Aproximação: 1 token ≈ 4 caracteres em português.
+    Conta o número de tokens em um texto.
+    Usa o tokenizador quando disponível (ver src/tokens.py).
     
     Args:
-        text: Texto para estimar tokens
+        text: Texto para contar tokens
         
     Returns:
-        Número estimado de tokens
+        Número de tokens
     """
-    return len(text) // 4
+    return count_tokens(text)
 
 def format_timestamp(timestamp_str: str) -> str:
     """
@@ -175,39 +179,15 @@ def get_conversation_stats(conversation_history: List[Dict[str, Any]]) -> Dict[s
     Returns:
         Dicionário com estatísticas
     """
-    if not conversation_history:
-        return {
-            "total_messages": 0,
-            "user_messages": 0,
-            "assistant_messages": 0,
-            "total_characters": 0,
-            "estimated_tokens": 0,
-            "duration": None
-        }
-    
-    user_messages = [msg for msg in conversation_history if msg.get('role') == 'user']
-    assistant_messages = [msg for msg in conversation_history if msg.get('role') == 'assistant']
-    
-    total_characters = sum(len(msg.get('content', '')) for msg in conversation_history)
-    estimated_tokens = calculate_tokens_estimate(''.join(msg.get('content', '') for msg in conversation_history))
-    
-    # Calcular duração se houver timestamps
-    duration = None
-    if conversation_history and 'timestamp' in conversation_history[0] and 'timestamp' in conversation_history[-1]:
-        try:
-            start_time = datetime.fromisoformat(conversation_history[0]['timestamp'].replace('Z', '+00:00'))
-            end_time = datetime.fromisoformat(conversation_history[-1]['timestamp'].replace('Z', '+00:00'))
-            duration = str(end_time - start_time)
-        except:
-            pass
+    stats = conversation_stats(conversation_history)
     
     return {
-        "total_messages": len(conversation_history),
-        "user_messages": len(user_messages),
-        "assistant_messages": len(assistant_messages),
-        "total_characters": total_characters,
-        "estimated_tokens": estimated_tokens,
-        "duration": duration
+        "total_messages": stats["total_messages"],
+        "user_messages": stats["user_messages"],
+        "assistant_messages": stats["assistant_messages"],
+        "total_characters": stats["total_characters"],
+        "estimated_tokens": stats["estimated_tokens"],
+        "duration": stats["duration"]
     }
 
 def display_message_with_avatar(role: str, content: str, timestamp: Optional[str] = None):
@@ -230,6 +210,9 @@ def check_rate_limit(session_state_key: str, max_requests: int = 20, time_window
     """
     Verifica se o usuário está dentro do limite de requisições.
     
+    O limite vale só para a sessão do navegador; o limite compartilhado
+    entre sessões e processos é aplicado pelo ChatbotAI (ver src/ratelimit.py).
+    
     Args:
         session_state_key: Chave para armazenar dados no session state
         max_requests: Número máximo de requisições
@@ -238,24 +221,15 @@ def check_rate_limit(session_state_key: str, max_requests: int = 20, time_window
     Returns:
         True se dentro do limite, False caso contrário
     """
-    current_time = datetime.now()
+    limiter = st.session_state.get(session_state_key)
+    if not isinstance(limiter, RateLimiter):
+        limiter = RateLimiter(max_requests=max_requests, window_seconds=time_window)
+        st.session_state[session_state_key] = limiter
     
-    if session_state_key not in st.session_state:
-        st.session_state[session_state_key] = []
-    
-    # Remover requisições antigas
-    cutoff_time = current_time.timestamp() - time_window
-    st.session_state[session_state_key] = [
-        req_time for req_time in st.session_state[session_state_key] 
-        if req_time > cutoff_time
-    ]
-    
-    # Verificar limite
-    if len(st.session_state[session_state_key]) >= max_requests:
+    try:
+        limiter.acquire(session_state_key)
+    except RateLimitExceeded:
         return False
-    
-    # Adicionar requisição atual
-    st.session_state[session_state_key].append(current_time.timestamp())
     return True
 
 def create_personality_badge(personality_key: str, personality_data: Dict[str, str]) -> str:
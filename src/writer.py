@@ -0,0 +1,230 @@
+"""
+Gravação em segundo plano (write-behind) do AI Chatbot Brasileiro
+"""
+
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .database import ConversationDB
+
+# Modos de durabilidade: valor de PRAGMA synchronous da conexão do escritor
+DURABILITY_MODES = {
+    "off": "OFF",        # sem fsync: rápido, mas uma queda de energia pode perder lotes
+    "normal": "NORMAL",  # em WAL, fsync só nos checkpoints (padrão)
+    "full": "FULL",      # fsync a cada lote confirmado
+}
+
+# Item da fila: (conversation_id, mensagens, personalidade, resumo, horário do envio)
+AppendItem = Tuple[str, List[Dict[str, Any]], Optional[str], Optional[str], str]
+
+_STOP = object()
+
+class BackgroundWriter:
+    """
+    Escritor em segundo plano para ConversationDB.
+    
+    As gravações entram em uma fila limitada e uma thread dedicada as agrupa
+    em uma transação a cada 'flush_interval_ms' ou 'max_batch_rows'
+    mensagens, o que vier primeiro. Quem chama não espera pelo SQLite; se a
+    fila encher, a chamada espera por espaço (contrapressão).
+    
+    Gravações ainda na fila se perdem se o processo morrer antes do flush;
+    close() e flush() esvaziam a fila.
+    """
+    
+    def __init__(self, db: "ConversationDB", max_queue: int = 10000,
+                 flush_interval_ms: float = 50, max_batch_rows: int = 500,
+                 durability: str = "normal"):
+        """
+        Inicializa e inicia o escritor.
+        
+        Args:
+            db: Banco de dados onde as mensagens são gravadas
+            max_queue: Número máximo de gravações pendentes na fila
+            flush_interval_ms: Espera máxima para agrupar gravações em um lote (ms)
+            max_batch_rows: Mensagens por lote que disparam a gravação imediata
+            durability: Modo de durabilidade ('off', 'normal' ou 'full')
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Modo de durabilidade inválido: {durability}")
+        
+        self.db = db
+        self.flush_interval_ms = flush_interval_ms
+        self.max_batch_rows = max_batch_rows
+        self.durability = durability
+        
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        
+        self.appends = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.max_queue_depth = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        
+        self._thread = threading.Thread(target=self._run, name="conversation-db-writer", daemon=True)
+        self._thread.start()
+        
+        # Ao encerrar o processo, grava o que ainda estiver na fila
+        atexit.register(self.close)
+    
+    def submit(self, conversation_id: str, messages: List[Dict[str, Any]],
+               personality: Optional[str] = None, history_summary: Optional[str] = None) -> int:
+        """
+        Enfileira mensagens para gravação.
+        
+        Args:
+            conversation_id: ID da conversa
+            messages: Mensagens novas (com 'role', 'content' e 'timestamp')
+            personality: Personalidade da conversa (usada ao criá-la)
+            history_summary: Resumo atualizado do histórico (opcional)
+        
+        Returns:
+            Número de mensagens enfileiradas
+        """
+        if self._closed:
+            raise RuntimeError("O escritor em segundo plano já foi encerrado")
+        
+        item = (conversation_id, list(messages), personality, history_summary, datetime.now().isoformat())
+        self._queue.put(item)
+        
+        with self._stats_lock:
+            self.appends += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        
+        return len(messages)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera até que tudo o que foi enfileirado antes desta chamada esteja gravado.
+        
+        Args:
+            timeout: Espera máxima em segundos (None = sem limite)
+        
+        Returns:
+            True se a fila foi gravada dentro do prazo
+        """
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Grava o que estiver na fila e encerra a thread do escritor.
+        
+        Args:
+            timeout: Espera máxima em segundos (None = sem limite)
+        """
+        if self._closed:
+            return
+        
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+    
+    def _run(self) -> None:
+        """Laço da thread do escritor: agrupa itens da fila e grava em lotes."""
+        conn = self.db._connect()
+        conn.execute(f"PRAGMA synchronous = {DURABILITY_MODES[self.durability]}")
+        
+        while True:
+            item = self._queue.get()
+            batch: List[AppendItem] = []
+            waiters: List[threading.Event] = []
+            rows = 0
+            stop = False
+            deadline = time.monotonic() + self.flush_interval_ms / 1000
+            
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    # flush(): grava o lote atual sem esperar o prazo
+                    waiters.append(item)
+                    break
+                
+                batch.append(item)
+                rows += len(item[1])
+                if rows >= self.max_batch_rows:
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            if batch:
+                self._write(batch, rows)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                # Itens enfileirados depois do encerramento (corrida com close())
+                remaining_items = []
+                while not self._queue.empty():
+                    pending = self._queue.get_nowait()
+                    if isinstance(pending, threading.Event):
+                        pending.set()
+                    elif pending is not _STOP:
+                        remaining_items.append(pending)
+                if remaining_items:
+                    self._write(remaining_items, sum(len(i[1]) for i in remaining_items))
+                return
+    
+    def _write(self, batch: List[AppendItem], rows: int) -> None:
+        """Grava um lote em uma única transação e atualiza as métricas."""
+        start = time.perf_counter()
+        try:
+            self.db._write_appends(batch)
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            return
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self.flushes += 1
+            self.rows_written += rows
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retorna as métricas do escritor.
+        
+        Returns:
+            Dicionário com profundidade da fila, lotes gravados e latência dos flushes
+        """
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "appends": self.appends,
+                "rows_written": self.rows_written,
+                "flushes": self.flushes,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "last_flush_ms": self.last_flush_ms,
+                "avg_flush_ms": self._total_flush_ms / self.flushes if self.flushes else 0.0,
+                "max_flush_ms": self.max_flush_ms,
+                "durability": self.durability
+            }
@@ -0,0 +1,113 @@
+"""
+Testes para as estatísticas de conversas
+"""
+
+import os
+import tempfile
+import pytest
+from src.analytics import archive_stats, conversation_stats
+from src.database import ConversationDB
+from src.memory import Message
+from src.sharding import ShardedConversationDB
+from src.tokens import count_tokens
+
+class TestConversationStats:
+    """Testes para conversation_stats"""
+    
+    def test_empty_conversation(self):
+        """Teste conversa vazia"""
+        stats = conversation_stats([])
+        
+        assert stats['total_messages'] == 0
+        assert stats['estimated_tokens'] == 0
+        assert stats['start_time'] is None
+        assert stats['duration'] is None
+    
+    def test_single_pass_over_generator(self):
+        """Teste métricas calculadas a partir de um gerador (uma passagem)"""
+        messages = [
+            {"role": "user", "content": "Olá!", "timestamp": "2024-01-15T10:00:00Z"},
+            {"role": "assistant", "content": "Oi! Como posso ajudar?", "timestamp": "2024-01-15T10:00:05Z"},
+            {"role": "user", "content": "Qual a capital do Brasil?", "timestamp": "2024-01-15T10:01:30Z"}
+        ]
+        
+        stats = conversation_stats(message for message in messages)
+        
+        assert stats['total_messages'] == 3
+        assert stats['user_messages'] == 2
+        assert stats['assistant_messages'] == 1
+        assert stats['total_characters'] == sum(len(m['content']) for m in messages)
+        assert stats['estimated_tokens'] == sum(count_tokens(m['content']) for m in messages)
+        assert stats['start_time'] == "2024-01-15T10:00:00Z"
+        assert stats['end_time'] == "2024-01-15T10:01:30Z"
+        assert stats['duration'] == "0:01:30"
+    
+    def test_message_objects_and_bad_timestamps(self):
+        """Teste objetos Message e timestamps ausentes ou inválidos"""
+        stats = conversation_stats([Message("user", "Oi", 5, created=0), Message("assistant", "Olá", 5, created=60)])
+        assert stats['duration'] == "0:01:00"
+        
+        stats = conversation_stats([{"role": "user", "content": "Oi", "timestamp": "ontem"}])
+        assert stats['total_messages'] == 1
+        assert stats['duration'] is None
+
+class TestArchiveStats:
+    """Testes para archive_stats"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        pytest.importorskip("pandas")
+        self.tmpdir = tempfile.TemporaryDirectory()
+    
+    def teardown_method(self):
+        """Limpeza após cada teste"""
+        self.tmpdir.cleanup()
+    
+    def _populate(self, db):
+        """Salva três conversas de duas personalidades."""
+        db.save_conversation([
+            {"role": "user", "content": "Olá!", "timestamp": "2024-01-15T10:00:00"},
+            {"role": "assistant", "content": "Oi!", "timestamp": "2024-01-15T10:00:30"}
+        ], "assistente_geral")
+        db.save_conversation([
+            {"role": "user", "content": "Ajuda", "timestamp": "2024-01-15T11:00:00"},
+            {"role": "assistant", "content": "Claro", "timestamp": "2024-01-15T11:01:00"},
+            {"role": "user", "content": "Obrigado", "timestamp": "2024-01-15T11:01:30"}
+        ], "assistente_geral")
+        db.save_conversation([
+            {"role": "user", "content": "Conte uma piada", "timestamp": "2024-01-15T12:00:00"}
+        ], "humorista")
+    
+    def test_per_personality_in_chunks(self):
+        """Teste agregação por personalidade lendo uma conversa por lote"""
+        db = ConversationDB(os.path.join(self.tmpdir.name, 'conversations.db'), compression=True)
+        try:
+            self._populate(db)
+            stats = archive_stats(db, chunk_size=1)
+        finally:
+            db.close()
+        
+        geral = stats.loc['assistente_geral']
+        assert list(stats.index) == ['assistente_geral', 'humorista']
+        assert geral['conversations'] == 2
+        assert geral['messages'] == 5
+        assert geral['user_messages'] == 3
+        assert geral['characters'] == len("Olá!Oi!AjudaClaroObrigado")
+        assert geral['avg_turns'] == 1.5
+        assert geral['avg_duration_seconds'] == 60
+        assert geral['max_duration_seconds'] == 90
+        assert stats.loc['humorista', 'avg_duration_seconds'] == 0
+    
+    def test_sharded_and_empty_archives(self):
+        """Teste arquivo particionado e banco vazio"""
+        db = ShardedConversationDB(os.path.join(self.tmpdir.name, 'shards'), shards=3)
+        try:
+            assert archive_stats(db).empty
+            self._populate(db)
+            stats = archive_stats(db, chunk_size=2)
+        finally:
+            db.close()
+        
+        assert stats['conversations'].sum() == 3
+        assert stats['messages'].sum() == 6
+        assert stats.loc['assistente_geral', 'max_duration_seconds'] == 90
@@ -4,10 +4,31 @@ Testes para a classe ChatbotAI
 
 import pytest
 import os
-from unittest.mock import Mock, patch
-from src.chatbot import ChatbotAI
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
+import httpx
+import openai
+from src.chatbot import ChatbotAI, ResponseStreamError
+from src.async_chatbot import AsyncChatbotAI
+from src.client import AsyncClientPool, OpenAIClient
 from src.config import DEFAULT_CONFIG
 
+CREATE = 'openai.resources.chat.completions.Completions.create'
+ACREATE = 'openai.resources.chat.completions.AsyncCompletions.create'
+
+def api_error(error_class, status, message, headers=None):
+    """Cria um erro da API do OpenAI com a resposta HTTP correspondente."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return error_class(message, response=response, body=None)
+
+def stream_chunk(content):
+    """Cria um trecho de resposta em streaming."""
+    chunk = Mock()
+    chunk.choices = [Mock(delta=Mock(content=content))]
+    return chunk
+
 class TestChatbotAI:
     """Testes para a classe ChatbotAI"""
     
@@ -33,6 +54,67 @@ class TestChatbotAI:
         with pytest.raises(ValueError, match="OpenAI API Key não configurada"):
             ChatbotAI(config)
     
+    @patch(CREATE)
+    def test_per_instance_client(self, mock_openai):
+        """Teste que cada instância usa suas próprias credenciais"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Oi"
+        mock_openai.return_value = mock_response
+        
+        global_key = openai.api_key
+        tenant_a = ChatbotAI({**self.config, 'openai_api_key': 'sk-tenant-a'})
+        tenant_b = ChatbotAI({
+            **self.config,
+            'openai_api_key': 'sk-tenant-b',
+            'openai_api_base': 'http://localhost:8765/v1',
+            'request_timeout': 5
+        })
+        
+        tenant_a.generate_response("Olá")
+        tenant_b.generate_response("Olá")
+        assert mock_openai.call_count == 2
+        
+        # O estado global da biblioteca não é alterado
+        assert openai.api_key == global_key
+        
+        first = tenant_a.client._sync_client('sk-tenant-a')
+        second = tenant_b.client._sync_client('sk-tenant-b')
+        assert first.api_key == 'sk-tenant-a'
+        assert str(first.base_url) == 'https://api.openai.com/v1/'
+        assert second.api_key == 'sk-tenant-b'
+        assert str(second.base_url) == 'http://localhost:8765/v1/'
+        assert second.timeout == 5
+        # As novas tentativas ficam com a RetryPolicy, não com a biblioteca
+        assert second.max_retries == 0
+        
+        # Trocar a chave recria o cliente
+        tenant_a.update_config({'openai_api_key': 'sk-tenant-c'})
+        assert tenant_a.client.api_key == 'sk-tenant-c'
+    
+    def test_connection_pool_per_config(self):
+        """Teste que cada dimensionamento tem seu pool HTTP, reaproveitado pelos clientes"""
+        small = ChatbotAI({**self.config, 'http_pool_maxsize': 4})
+        large = ChatbotAI({**self.config, 'http_pool_maxsize': 64})
+        same = ChatbotAI({**self.config, 'http_pool_maxsize': 4, 'request_timeout': 5})
+        
+        assert small.client.connection_pool is same.client.connection_pool
+        assert small.client.connection_pool is not large.client.connection_pool
+        assert large.client.connection_pool.pool_maxsize == 64
+        
+        with patch('src.client.openai.OpenAI') as mock_client_class:
+            small.client._sync_client('test-key-123')
+            small.client._sync_client('test-key-123')
+            same.client._sync_client('test-key-123')
+            large.client._sync_client('test-key-123')
+        
+        # Um cliente da biblioteca por chave, montado sobre o httpx.Client do pool
+        http_clients = [call[1]['http_client'] for call in mock_client_class.call_args_list]
+        assert len(http_clients) == 3
+        assert http_clients[0] is http_clients[1] is small.client.connection_pool.get_client()
+        assert http_clients[2] is large.client.connection_pool.get_client()
+        assert http_clients[0] is not http_clients[2]
+    
     def test_set_personality(self):
         """Teste mudança de personalidade"""
         chatbot = ChatbotAI(self.config)
@@ -72,6 +154,30 @@ class TestChatbotAI:
         # Deve manter apenas as últimas mensagens
         assert len(chatbot.conversation_memory) <= 3
     
+    def test_memory_ring_buffer(self):
+        """Teste memória circular com mensagens compactas"""
+        config = {**self.config, 'max_conversation_history': 3}
+        chatbot = ChatbotAI(config)
+        
+        for i in range(5):
+            chatbot.add_to_memory("user", f"Mensagem {i}")
+        
+        assert [m['content'] for m in chatbot.conversation_memory] == [
+            "Mensagem 2", "Mensagem 3", "Mensagem 4"
+        ]
+        
+        message = chatbot.conversation_memory[-1]
+        assert not hasattr(message, '__dict__')
+        assert isinstance(message.created, float)
+        
+        # O histórico é enviado sem copiar os payloads armazenados
+        messages = chatbot.prepare_messages("Nova")
+        assert messages[-2] is message.api
+        
+        # Reduzir o limite mantém as mensagens mais recentes
+        chatbot.update_config({'max_conversation_history': 2})
+        assert [m['content'] for m in chatbot.conversation_memory] == ["Mensagem 3", "Mensagem 4"]
+    
     def test_clear_memory(self):
         """Teste limpeza de memória"""
         chatbot = ChatbotAI(self.config)
@@ -110,7 +216,79 @@ class TestChatbotAI:
         assert messages[-1]['role'] == 'user'
         assert messages[-1]['content'] == 'Nova mensagem'
     
-    @patch('openai.ChatCompletion.create')
+    def test_prepare_messages_token_budget(self):
+        """Teste preenchimento do histórico pelo orçamento de tokens"""
+        config = {**self.config, 'context_window_tokens': 1000, 'max_tokens': 200}
+        chatbot = ChatbotAI(config)
+        
+        chatbot.add_to_memory("user", "x" * 4000)  # colagem longa e antiga
+        for i in range(10):
+            chatbot.add_to_memory("user", f"Mensagem curta {i}")
+        
+        assert all('tokens' in msg for msg in chatbot.conversation_memory)
+        
+        messages = chatbot.prepare_messages("Nova mensagem")
+        history = messages[1:-1]
+        
+        # Mensagens curtas cabem todas; a colagem longa não
+        assert len(history) == 10
+        assert history[-1]['content'] == "Mensagem curta 9"
+        
+        # Orçamento reservado para a resposta é respeitado
+        from src.tokens import count_message_tokens
+        used = sum(count_message_tokens(m['content']) for m in messages)
+        assert used <= config['context_window_tokens'] - config['max_tokens']
+    
+    def test_incremental_prompt_prefix(self):
+        """Teste prefixo do prompt estável e reaproveitado entre turnos"""
+        chatbot = ChatbotAI(self.config)
+        
+        first = chatbot.prepare_messages("Pergunta 1")
+        chatbot.add_to_memory("user", "Pergunta 1")
+        chatbot.add_to_memory("assistant", "Resposta 1")
+        
+        second = chatbot.prepare_messages("Pergunta 2")
+        
+        # O prompt do sistema é o mesmo objeto e a requisição anterior é prefixo da atual
+        assert second[0] is first[0]
+        assert second[:len(first)] == first
+        
+        stats = chatbot.get_prefix_stats()
+        assert stats['reused_messages'] == 2
+        assert stats['total_messages'] == 4
+        assert 0 < stats['reuse_ratio'] < 1
+        assert stats['requests'] == 2
+        
+        # Trocar a personalidade reconstrói o prefixo
+        chatbot.set_personality("desenvolvedor")
+        third = chatbot.prepare_messages("Pergunta 3")
+        assert len(third) == 2
+        assert chatbot.get_prefix_stats()['reused_messages'] == 0
+    
+    def test_prompt_prefix_trims_in_blocks(self):
+        """Teste corte do histórico em bloco, mantendo o prefixo estável depois"""
+        config = {
+            **self.config,
+            'context_window_tokens': 600,
+            'max_tokens': 100,
+            'max_conversation_history': 100
+        }
+        chatbot = ChatbotAI(config)
+        
+        sizes = []
+        for i in range(40):
+            chatbot.prepare_messages(f"Pergunta {i}")
+            chatbot.add_to_memory("user", f"Pergunta {i} " + "x" * 40)
+            sizes.append(len(chatbot.prepare_messages("Próxima")))
+        
+        # O histórico cresce até o limite e então cai várias mensagens de uma vez
+        steps = [sizes[i] - sizes[i - 1] for i in range(1, len(sizes))]
+        drops = [step for step in steps if step < 0]
+        assert drops
+        assert all(step < -1 for step in drops)
+        assert all(step == 1 for step in steps if step >= 0)
+    
+    @patch(CREATE)
     def test_generate_response_success(self, mock_openai):
         """Teste geração de resposta com sucesso"""
         # Mock da resposta da OpenAI
@@ -131,17 +309,552 @@ class TestChatbotAI:
         assert call_args['model'] == self.config['openai_model']
         assert call_args['max_tokens'] == self.config['max_tokens']
     
-    @patch('openai.ChatCompletion.create')
+    @patch(CREATE)
     def test_generate_response_api_error(self, mock_openai):
         """Teste tratamento de erro da API"""
-        import openai
-        mock_openai.side_effect = openai.error.AuthenticationError("Invalid API key")
+        mock_openai.side_effect = api_error(openai.AuthenticationError, 401, "Invalid API key")
         
         chatbot = ChatbotAI(self.config)
         response = chatbot.generate_response("Olá")
         
         assert "Erro de autenticação" in response
     
+    @patch(CREATE)
+    def test_stream_response(self, mock_openai):
+        """Teste geração de resposta em modo streaming"""
+        chunks = [stream_chunk(content) for content in [None, "Olá", ", tudo bem?", None]]
+        mock_openai.return_value = iter(chunks)
+        
+        chatbot = ChatbotAI(self.config)
+        stream = chatbot.stream_response("Oi")
+        
+        assert next(stream) == "Olá"
+        # A resposta só vai para a memória quando o stream termina
+        assert len(chatbot.conversation_memory) == 1
+        
+        assert list(stream) == [", tudo bem?"]
+        assert len(chatbot.conversation_memory) == 2
+        assert chatbot.conversation_memory[-1]['content'] == "Olá, tudo bem?"
+        assert mock_openai.call_args[1]['stream'] is True
+        
+        # A mensagem do usuário não deve ser enviada duas vezes
+        sent = mock_openai.call_args[1]['messages']
+        assert [m['content'] for m in sent].count("Oi") == 1
+    
+    @patch(ACREATE, new_callable=AsyncMock)
+    @patch(CREATE)
+    def test_abandoned_stream_settles_quota(self, mock_openai, mock_acreate):
+        """Teste que um stream interrompido pelo consumidor acerta a cota diária"""
+        stream = Mock()
+        stream.__iter__ = Mock(return_value=iter([stream_chunk("Olá"), stream_chunk(" mundo")]))
+        mock_openai.return_value = stream
+        
+        async def astream():
+            for content in ["Olá", " mundo"]:
+                yield stream_chunk(content)
+        mock_acreate.side_effect = lambda **kwargs: astream()
+        
+        config = {
+            **self.config,
+            'max_tokens': 1000,
+            'max_tokens_per_day': 100000,
+            'rate_limit_persistent': False,
+            'cache_enabled': False
+        }
+        
+        chatbot = ChatbotAI({**config, 'rate_limit_key': 'stream-sync'})
+        deltas = chatbot.stream_response("Oi")
+        assert next(deltas) == "Olá"
+        deltas.close()
+        
+        # Só o prompt e o trecho gerado contam, não a reserva de max_tokens
+        assert 0 < chatbot.rate_limiter.usage(chatbot.rate_limit_key)['tokens_today'] < config['max_tokens']
+        stream.close.assert_called_once()
+        assert len(chatbot.conversation_memory) == 1
+        
+        async def run():
+            chatbot = AsyncChatbotAI({**config, 'rate_limit_key': 'stream-async'}, pool=AsyncClientPool(limit=2))
+            deltas = chatbot.astream_response("Oi")
+            assert await deltas.__anext__() == "Olá"
+            await deltas.aclose()
+            await chatbot.pool.close()
+            return chatbot.rate_limiter.usage(chatbot.rate_limit_key)['tokens_today']
+        
+        assert 0 < asyncio.run(run()) < config['max_tokens']
+    
+    @patch(CREATE)
+    def test_stream_response_error(self, mock_openai):
+        """Teste tratamento de erro no modo streaming"""
+        mock_openai.side_effect = api_error(openai.RateLimitError, 429, "Too many requests")
+        
+        chatbot = ChatbotAI(self.config)
+        with pytest.raises(ResponseStreamError, match="Limite de requisições"):
+            list(chatbot.stream_response("Olá"))
+        
+        # O erro não é gravado como resposta do assistente
+        assert len(chatbot.conversation_memory) == 1
+    
+    @patch('src.resilience.time.sleep')
+    def test_retry_and_failover(self, mock_sleep):
+        """Teste novas tentativas com Retry-After e failover de chave e modelo"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta reserva"
+        
+        rate_limited = api_error(openai.RateLimitError, 429, "Too many requests", {'retry-after': '2'})
+        outcomes = [
+            rate_limited,
+            api_error(openai.AuthenticationError, 401, "Invalid key"),
+            rate_limited, rate_limited, rate_limited,
+            mock_response
+        ]
+        calls = []
+        
+        def sync_client(client, api_key):
+            def create(**kwargs):
+                calls.append((api_key, kwargs['model']))
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+            return Mock(**{'chat.completions.create.side_effect': create})
+        
+        config = {
+            **self.config,
+            'openai_api_keys': 'sk-reserva',
+            'fallback_models': 'gpt-4o-mini',
+            'max_retries': 2
+        }
+        chatbot = ChatbotAI(config)
+        
+        with patch.object(OpenAIClient, '_sync_client', sync_client):
+            assert chatbot.generate_response("Olá") == "Resposta reserva"
+        
+        assert calls == [
+            ('test-key-123', 'gpt-3.5-turbo'),
+            ('test-key-123', 'gpt-3.5-turbo'),
+            ('sk-reserva', 'gpt-3.5-turbo'),
+            ('sk-reserva', 'gpt-3.5-turbo'),
+            ('sk-reserva', 'gpt-3.5-turbo'),
+            ('test-key-123', 'gpt-4o-mini')
+        ]
+        # Retry-After é respeitado
+        assert mock_sleep.call_args_list[0][0][0] == 2.0
+    
+    @patch('src.resilience.time.sleep')
+    @patch(CREATE)
+    def test_circuit_breaker(self, mock_openai, mock_sleep):
+        """Teste abertura do circuito após falhas seguidas do endpoint"""
+        mock_openai.side_effect = api_error(openai.InternalServerError, 503, "Overloaded")
+        
+        config = {
+            **self.config,
+            'openai_api_base': 'http://circuit-breaker.test/v1',
+            'max_retries': 1,
+            'circuit_failure_threshold': 3
+        }
+        chatbot = ChatbotAI(config)
+        
+        chatbot.generate_response("Olá")
+        chatbot.generate_response("Olá")
+        assert mock_openai.call_count == 3
+        
+        # Com o circuito aberto, a API nem é chamada
+        response = chatbot.generate_response("Olá")
+        assert mock_openai.call_count == 3
+        assert "temporariamente indisponível" in response
+    
+    @patch('src.resilience.time.monotonic')
+    def test_circuit_breaker_single_probe(self, mock_monotonic):
+        """Teste que o circuito meio-aberto libera uma única chamada de teste"""
+        from src.resilience import CircuitBreaker
+        mock_monotonic.return_value = 100.0
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        assert not breaker.allow_request()
+        
+        mock_monotonic.return_value = 131.0
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        
+        # Falha do teste reabre o circuito
+        breaker.record_failure()
+        assert not breaker.allow_request()
+        
+        # Teste sem veredito libera outro; sucesso fecha o circuito
+        mock_monotonic.return_value = 162.0
+        assert breaker.allow_request()
+        breaker.release()
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.allow_request() and breaker.allow_request()
+        
+        # Teste abandonado expira depois de reset_timeout
+        breaker.record_failure()
+        mock_monotonic.return_value = 193.0
+        assert breaker.allow_request()
+        mock_monotonic.return_value = 224.0
+        assert breaker.allow_request()
+    
+    @patch(CREATE)
+    def test_generate_many(self, mock_openai):
+        """Teste geração em lote com paralelismo limitado"""
+        import time as time_module
+        
+        def fake_create(**kwargs):
+            prompt = kwargs['messages'][-1]['content']
+            # Contexto independente: só system prompt + o próprio prompt
+            assert len(kwargs['messages']) == 2
+            if prompt == "falha":
+                raise api_error(openai.BadRequestError, 400, "Prompt inválido")
+            time_module.sleep(0.01 * (5 - int(prompt[-1])))
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = f"Resposta para {prompt}"
+            return response
+        
+        mock_openai.side_effect = fake_create
+        
+        chatbot = ChatbotAI(self.config)
+        chatbot.add_to_memory("user", "Histórico que não deve vazar")
+        
+        prompts = [f"Prompt {i}" for i in range(5)] + ["falha"]
+        with patch.object(OpenAIClient, 'from_config') as mock_from_config:
+            results = chatbot.generate_many(prompts, personality="desenvolvedor", max_concurrency=3)
+        
+        # Os itens usam o cliente desta instância, sem criar chatbots por prompt
+        mock_from_config.assert_not_called()
+        
+        assert [r['prompt'] for r in results] == prompts
+        assert [r['response'] for r in results[:5]] == [f"Resposta para Prompt {i}" for i in range(5)]
+        assert results[5]['response'] is None
+        assert "BadRequestError" in results[5]['error']
+        assert all(r['personality'] == "desenvolvedor" and r['latency'] >= 0 for r in results)
+        
+        # A memória da instância original não é alterada
+        assert len(chatbot.conversation_memory) == 1
+    
+    @patch(CREATE)
+    def test_generate_many_waits_for_rate_limit(self, mock_openai):
+        """Teste que o lote espera o limite de requisições em vez de falhar"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta"
+        mock_openai.return_value = mock_response
+        
+        config = {
+            **self.config,
+            'max_requests_per_minute': 1,
+            'rate_limit_persistent': False,
+            'rate_limit_key': 'lote',
+            'cache_enabled': False
+        }
+        chatbot = ChatbotAI(config)
+        now = [1000.0]
+        chatbot.rate_limiter.clock = lambda: now[0]
+        
+        def sleep(seconds):
+            now[0] += seconds
+        
+        try:
+            with patch('src.chatbot.time.sleep', side_effect=sleep) as mock_sleep:
+                results = chatbot.generate_many(["Um", "Dois", "Três"], max_concurrency=1)
+        finally:
+            chatbot.rate_limiter.clock = time.time
+        
+        assert [r['response'] for r in results] == ["Resposta"] * 3
+        assert all(r['error'] is None for r in results)
+        assert mock_openai.call_count == 3
+        assert mock_sleep.call_count == 2
+    
+    @patch(ACREATE, new_callable=AsyncMock)
+    def test_agenerate_response(self, mock_acreate):
+        """Teste geração assíncrona de respostas com pool compartilhado"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta assíncrona"
+        mock_acreate.return_value = mock_response
+        
+        pool = AsyncClientPool(limit=10)
+        
+        async def run():
+            chatbots = [AsyncChatbotAI(self.config, pool=pool) for _ in range(3)]
+            responses = await asyncio.gather(*(c.agenerate_response("Olá") for c in chatbots))
+            http_client = await pool.get_client()
+            await pool.close()
+            return chatbots, responses, http_client
+        
+        chatbots, responses, http_client = asyncio.run(run())
+        
+        assert responses == ["Resposta assíncrona"] * 3
+        assert all(len(c.conversation_memory) == 2 for c in chatbots)
+        assert mock_acreate.await_count == 3
+        assert http_client.is_closed
+    
+    @patch(CREATE)
+    def test_response_cache(self, mock_openai, tmp_path):
+        """Teste cache de respostas em memória e em SQLite"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta cacheada"
+        mock_openai.return_value = mock_response
+        
+        config = {
+            **self.config,
+            'temperature': 0.0,
+            'database_path': str(tmp_path / 'conversations.db')
+        }
+        
+        chatbot = ChatbotAI(config)
+        assert chatbot.generate_response("Qual a capital do Brasil?") == "Resposta cacheada"
+        
+        # Pergunta quase idêntica em outra sessão deve vir do cache
+        other = ChatbotAI(config)
+        assert other.generate_response("  Qual a capital do   Brasil? ") == "Resposta cacheada"
+        assert mock_openai.call_count == 1
+        assert len(other.conversation_memory) == 2
+        
+        # Bypass por requisição
+        other.clear_memory()
+        other.generate_response("Qual a capital do Brasil?", use_cache=False)
+        assert mock_openai.call_count == 2
+        
+        stats = other.response_cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        
+        # A camada persistente sobrevive a um cache novo em memória
+        from src.cache import ResponseCache
+        new_session = ChatbotAI(config)
+        key = new_session._cache_key(new_session.prepare_messages("Qual a capital do Brasil?"))
+        fresh = ResponseCache(db_path=config['database_path'])
+        assert fresh.get(key) == "Resposta cacheada"
+        assert fresh.stats()['disk_hits'] == 1
+        
+        # Só os espaços são normalizados: a caixa diferencia perguntas
+        new_session.generate_response("QUAL a capital do Brasil?")
+        assert mock_openai.call_count == 3
+        
+        # Respostas expiradas são removidas do disco
+        expired = ResponseCache(ttl_seconds=-1, db_path=config['database_path'])
+        expired.set("antiga", "Resposta expirada")
+        assert expired.get("antiga") is None
+        assert expired.purge_expired() == 1
+        assert fresh.get(key) == "Resposta cacheada"
+    
+    @patch(ACREATE, new_callable=AsyncMock)
+    def test_astream_response_uses_cache(self, mock_acreate, tmp_path):
+        """Teste cache de respostas também no streaming assíncrono"""
+        async def stream():
+            for content in ["Olá", "!"]:
+                yield stream_chunk(content)
+        mock_acreate.side_effect = lambda **kwargs: stream()
+        
+        config = {**self.config, 'temperature': 0.0, 'database_path': str(tmp_path / 'conversations.db')}
+        
+        async def run():
+            pool = AsyncClientPool(limit=2)
+            first, second = AsyncChatbotAI(config, pool=pool), AsyncChatbotAI(config, pool=pool)
+            deltas = [[d async for d in chatbot.astream_response("Oi")] for chatbot in (first, second)]
+            await pool.close()
+            return deltas
+        
+        assert asyncio.run(run()) == [["Olá", "!"], ["Olá!"]]
+        assert mock_acreate.await_count == 1
+    
+    @patch(ACREATE, new_callable=AsyncMock)
+    def test_async_cache_off_event_loop(self, mock_acreate, tmp_path):
+        """Teste que o cache em SQLite é consultado fora do event loop"""
+        import threading
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta"
+        mock_acreate.return_value = mock_response
+        
+        config = {**self.config, 'temperature': 0.0, 'database_path': str(tmp_path / 'conversations.db')}
+        threads = []
+        
+        async def run():
+            chatbot = AsyncChatbotAI(config, pool=AsyncClientPool(limit=2))
+            cache = chatbot.response_cache
+            get, set_ = cache.get, cache.set
+            with patch.object(cache, 'get', lambda key: threads.append(threading.current_thread()) or get(key)), \
+                 patch.object(cache, 'set', lambda key, value: threads.append(threading.current_thread()) or set_(key, value)):
+                await chatbot.agenerate_response("Oi")
+            await chatbot.pool.close()
+            return threading.current_thread()
+        
+        loop_thread = asyncio.run(run())
+        assert len(threads) == 2
+        assert all(thread is not loop_thread for thread in threads)
+    
+    def test_async_pool_client_per_loop(self):
+        """Teste que cada event loop tem seu cliente HTTP e os de loops encerrados são descartados"""
+        pool = AsyncClientPool(limit=2)
+        
+        first = asyncio.run(pool.get_client())
+        second = asyncio.run(pool.get_client())
+        assert first is not second
+        
+        async def close():
+            client = await pool.get_client()
+            # Só o cliente do loop atual continua registrado
+            assert list(pool._clients.items()) == [(asyncio.get_running_loop(), client)]
+            await pool.close()
+            return client
+        
+        assert asyncio.run(close()).is_closed
+        assert len(pool._clients) == 0
+    
+    @patch(CREATE)
+    def test_rate_limit_shared_between_sessions(self, mock_openai, tmp_path):
+        """Teste limite de requisições e cota diária antes da chamada à API"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta"
+        mock_openai.return_value = mock_response
+        
+        config = {
+            **self.config,
+            'database_path': str(tmp_path / 'conversations.db'),
+            'max_requests_per_minute': 2,
+            'max_tokens_per_day': 100000,
+            'cache_enabled': False
+        }
+        
+        # Duas sessões com a mesma chave de API dividem o mesmo balde
+        first, second = ChatbotAI(config), ChatbotAI(config)
+        assert first.generate_response("Pergunta 1") == "Resposta"
+        assert second.generate_response("Pergunta 2") == "Resposta"
+        assert "Limite de requisições" in first.generate_response("Pergunta 3")
+        assert mock_openai.call_count == 2
+        
+        # A reserva (prompt + max_tokens) é trocada pelo uso real
+        usage = first.rate_limiter.usage(first.rate_limit_key)
+        assert usage['requests_available'] == 0
+        assert 0 < usage['tokens_today'] < 2 * config['max_tokens']
+        
+        # Outro usuário tem limites próprios; a cota esgotada bloqueia a chamada
+        other = ChatbotAI({**config, 'rate_limit_key': 'maria', 'max_tokens_per_day': 10})
+        assert "Cota diária" in other.generate_response("Pergunta 4")
+        assert mock_openai.call_count == 2
+    
+    @patch(ACREATE, new_callable=AsyncMock)
+    def test_async_rate_limit(self, mock_acreate, tmp_path):
+        """Teste limite de requisições (em SQLite) nas chamadas assíncronas"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta"
+        mock_acreate.return_value = mock_response
+        
+        config = {
+            **self.config,
+            'database_path': str(tmp_path / 'conversations.db'),
+            'max_requests_per_minute': 1,
+            'cache_enabled': False
+        }
+        
+        async def run():
+            chatbot = AsyncChatbotAI(config, pool=AsyncClientPool(limit=2))
+            first = await chatbot.agenerate_response("Pergunta 1")
+            try:
+                with pytest.raises(ResponseStreamError, match="Limite de requisições"):
+                    [delta async for delta in chatbot.astream_response("Pergunta 2")]
+            finally:
+                await chatbot.pool.close()
+            return first
+        
+        assert asyncio.run(run()) == "Resposta"
+        assert mock_acreate.await_count == 1
+    
+    @patch(CREATE)
+    def test_response_cache_skips_sampled_responses(self, mock_openai):
+        """Teste que respostas com temperature > 0 não são cacheadas"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resposta"
+        mock_openai.return_value = mock_response
+        
+        chatbot = ChatbotAI(self.config)
+        chatbot.generate_response("Olá")
+        chatbot.clear_memory()
+        chatbot.generate_response("Olá")
+        
+        assert mock_openai.call_count == 2
+    
+    @patch(CREATE)
+    def test_history_summarization(self, mock_openai):
+        """Teste resumo em segundo plano das mensagens antigas"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resumo da conversa"
+        mock_openai.return_value = mock_response
+        
+        config = {
+            **self.config,
+            'summarize_history': True,
+            'summary_threshold': 4,
+            'summary_keep_recent': 2,
+            'max_requests_per_minute': 5,
+            'rate_limit_persistent': False,
+            'rate_limit_key': 'resumo'
+        }
+        chatbot = ChatbotAI(config)
+        
+        for i in range(3):
+            chatbot.add_to_memory("user", f"Pergunta {i}")
+            chatbot.add_to_memory("assistant", f"Resposta {i}")
+        
+        future = chatbot.maybe_summarize_history()
+        assert future is not None
+        chatbot.wait_for_summary(timeout=5)
+        
+        assert chatbot.history_summary == "Resumo da conversa"
+        assert [m['content'] for m in chatbot.conversation_memory] == ["Pergunta 2", "Resposta 2"]
+        # O resumo passa pelo limite de requisições
+        assert chatbot.rate_limiter.usage(chatbot.rate_limit_key)['requests_available'] == 4
+        
+        messages = chatbot.prepare_messages("Nova pergunta")
+        assert messages[1]['role'] == 'system'
+        assert "Resumo da conversa" in messages[1]['content']
+        
+        # Limpar a memória também descarta o resumo
+        chatbot.clear_memory()
+        assert chatbot.history_summary == ""
+    
+    @patch(CREATE)
+    def test_history_summary_applied_on_conversation_thread(self, mock_openai):
+        """Teste que a thread de resumo não altera a memória da conversa"""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Resumo"
+        mock_openai.return_value = mock_response
+        
+        config = {**self.config, 'summarize_history': True, 'summary_threshold': 4, 'summary_keep_recent': 2}
+        chatbot = ChatbotAI(config)
+        for i in range(3):
+            chatbot.add_to_memory("user", f"Pergunta {i}")
+            chatbot.add_to_memory("assistant", f"Resposta {i}")
+        
+        chatbot.maybe_summarize_history().result(timeout=5)
+        chatbot.add_to_memory("user", "Pergunta 3")
+        
+        # Resumo pronto, mas ainda não aplicado
+        assert len(chatbot.conversation_memory) == 7
+        assert chatbot.history_summary == ""
+        
+        messages = chatbot.prepare_messages("Pergunta 4")
+        assert [m['content'] for m in chatbot.conversation_memory] == ["Pergunta 2", "Resposta 2", "Pergunta 3"]
+        assert "Resumo" in messages[1]['content']
+    
+    def test_history_summarization_disabled_by_default(self):
+        """Teste que o resumo do histórico é opcional"""
+        chatbot = ChatbotAI(self.config)
+        for i in range(30):
+            chatbot.add_to_memory("user", f"Mensagem {i}")
+        
+        assert chatbot.maybe_summarize_history() is None
+    
     def test_get_conversation_summary(self):
         """Teste resumo da conversa"""
         chatbot = ChatbotAI(self.config)
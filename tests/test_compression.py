@@ -0,0 +1,54 @@
+"""
+Testes para a compressão do conteúdo das mensagens
+"""
+
+import pytest
+from src.compression import FORMAT_ZLIB, HEADER, ContentCodec, train_dictionary
+
+class TestContentCodec:
+    """Testes para a classe ContentCodec"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.samples = [
+            f"Olá! Como posso ajudar você hoje com o imposto de renda de {2000 + i}? "
+            "O imposto de renda é calculado sobre a renda tributável do ano."
+            for i in range(100)
+        ]
+        self.codec = ContentCodec()
+    
+    def test_round_trip_with_dictionary(self):
+        """Teste compressão com dicionário e cabeçalho de formato"""
+        without_dictionary = self.codec.encode(self.samples[0])
+        
+        self.codec.add_dictionary(7, "zlib", train_dictionary(self.samples, 2048, "zlib"))
+        blob = self.codec.encode(self.samples[0])
+        
+        assert isinstance(blob, bytes)
+        assert HEADER.unpack_from(blob) == (FORMAT_ZLIB, 7)
+        assert len(blob) < len(without_dictionary)
+        assert self.codec.decode(blob) == self.samples[0]
+    
+    def test_short_or_plain_content(self):
+        """Teste conteúdo que não compensa comprimir e conteúdo em texto"""
+        assert self.codec.encode("oi") == "oi"
+        assert self.codec.decode("texto antigo") == "texto antigo"
+        assert self.codec.decode(None) is None
+    
+    def test_loads_missing_dictionary(self):
+        """Teste busca sob demanda de dicionários de outro processo"""
+        dictionary = train_dictionary(self.samples, 2048, "zlib")
+        writer = ContentCodec()
+        writer.add_dictionary(3, "zlib", dictionary)
+        blob = writer.encode(self.samples[1])
+        
+        reader = ContentCodec(loader=lambda dictionary_id: ("zlib", dictionary) if dictionary_id == 3 else None)
+        assert reader.decode(blob) == self.samples[1]
+        
+        with pytest.raises(ValueError):
+            ContentCodec().decode(blob)
+    
+    def test_unknown_format_version(self):
+        """Teste versão de formato desconhecida"""
+        with pytest.raises(ValueError):
+            self.codec.decode(HEADER.pack(99, 0) + b"dados")
@@ -0,0 +1,528 @@
+"""
+Testes para a classe ConversationDB
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from src.database import ConversationDB
+
+class TestConversationDB:
+    """Testes para a classe ConversationDB"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'data', 'conversations.db')
+        self.db = ConversationDB(self.db_path)
+        self.messages = [
+            {"role": "user", "content": "Olá!", "timestamp": "2024-01-15T10:00:00"},
+            {"role": "assistant", "content": "Oi! Como posso ajudar?", "timestamp": "2024-01-15T10:00:05"}
+        ]
+    
+    def teardown_method(self):
+        """Limpeza após cada teste"""
+        self.db.close()
+        self.tmpdir.cleanup()
+    
+    def test_save_and_load_conversation(self):
+        """Teste salvar e carregar conversa"""
+        conversation_id = self.db.save_conversation(self.messages, "assistente_geral")
+        
+        conversation = self.db.load_conversation(conversation_id)
+        
+        assert conversation['personality'] == "assistente_geral"
+        assert conversation['message_count'] == 2
+        assert [m['content'] for m in conversation['messages']] == ["Olá!", "Oi! Como posso ajudar?"]
+        assert conversation['history_summary'] == ""
+    
+    def test_history_summary_persisted(self):
+        """Teste persistência do resumo do histórico"""
+        conversation_id = self.db.save_conversation(
+            self.messages, "assistente_geral", history_summary="Usuário pediu ajuda com impostos."
+        )
+        
+        conversation = self.db.load_conversation(conversation_id)
+        assert conversation['history_summary'] == "Usuário pediu ajuda com impostos."
+    
+    def test_migrates_database_without_summary_column(self):
+        """Teste migração de bancos antigos sem a coluna de resumo"""
+        legacy_path = os.path.join(self.tmpdir.name, 'legacy.db')
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute("""
+                CREATE TABLE conversations (
+                    id TEXT PRIMARY KEY, personality TEXT NOT NULL, start_time TEXT NOT NULL,
+                    end_time TEXT, message_count INTEGER DEFAULT 0,
+                    created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+                )
+            """)
+        
+        db = ConversationDB(legacy_path)
+        conversation_id = db.save_conversation(self.messages, "desenvolvedor", history_summary="Resumo")
+        
+        assert db.load_conversation(conversation_id)['history_summary'] == "Resumo"
+    
+    def test_load_missing_conversation(self):
+        """Teste carregar conversa inexistente"""
+        assert self.db.load_conversation("nao-existe") is None
+    
+    def test_list_and_statistics(self):
+        """Teste listagem e estatísticas"""
+        self.db.save_conversation(self.messages, "assistente_geral")
+        self.db.save_conversation(self.messages, "desenvolvedor")
+        self.db.save_conversation(self.messages, "desenvolvedor")
+        
+        assert len(self.db.list_conversations()) == 3
+        assert len(self.db.list_conversations(personality="desenvolvedor")) == 2
+        
+        stats = self.db.get_statistics()
+        assert stats['total_conversations'] == 3
+        assert stats['total_messages'] == 6
+        assert stats['conversations_by_personality'] == {"desenvolvedor": 2, "assistente_geral": 1}
+    
+    def test_persistent_wal_connection(self):
+        """Teste conexão persistente por thread em modo WAL"""
+        conn = self.db._connect()
+        assert self.db._connect() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.db._connect()))
+        thread.start()
+        thread.join()
+        assert other[0] is not conn
+        
+        # A conexão da thread encerrada é fechada na próxima abertura
+        thread = threading.Thread(target=self.db._connect)
+        thread.start()
+        thread.join()
+        with pytest.raises(sqlite3.ProgrammingError):
+            other[0].execute("SELECT 1")
+        assert list(self.db._connections.values()) == [conn, self.db._connections[thread]]
+    
+    def test_readers_do_not_wait_for_writer(self):
+        """Teste que leituras não esperam por uma transação de escrita aberta"""
+        self.db.save_conversation(self.messages, "assistente_geral")
+        
+        writer = sqlite3.connect(self.db_path)
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("DELETE FROM messages")
+        
+        reader = ConversationDB(self.db_path, busy_timeout_ms=100)
+        try:
+            # Com o journal de rollback padrão, estas leituras falhariam com "database is locked"
+            assert len(reader.list_conversations()) == 1
+            assert reader.get_statistics()['total_messages'] == 2
+        finally:
+            writer.rollback()
+            writer.close()
+            reader.close()
+    
+    def test_append_messages(self):
+        """Teste gravação incremental de mensagens"""
+        conversation_id = "sessao-123"
+        
+        assert self.db.append_messages(conversation_id, self.messages[:1], "desenvolvedor") == 1
+        self.db.append_messages(conversation_id, self.messages[1:], "desenvolvedor")
+        self.db.append_messages(conversation_id, [], history_summary="Resumo parcial")
+        
+        conversation = self.db.load_conversation(conversation_id)
+        assert conversation['personality'] == "desenvolvedor"
+        assert conversation['message_count'] == 2
+        assert conversation['start_time'] == "2024-01-15T10:00:00"
+        assert conversation['end_time'] == "2024-01-15T10:00:05"
+        assert conversation['history_summary'] == "Resumo parcial"
+        assert len(conversation['messages']) == 2
+        
+        # Gravar a mesma sessão de novo não cria conversas duplicadas
+        assert len(self.db.list_conversations()) == 1
+    
+    def test_search_ignores_accents_and_case(self):
+        """Teste busca sem diferenciar acentos e maiúsculas"""
+        conversation_id = self.db.save_conversation([
+            {"role": "user", "content": "Qual a situação da Declaração de Imposto?", "timestamp": "2024-01-15T10:00:00"},
+            {"role": "assistant", "content": "A declaração vence em abril.", "timestamp": "2024-01-15T10:00:05"}
+        ], "assistente_geral")
+        
+        page = self.db.search_messages("declaracao")
+        
+        assert len(page['results']) == 2
+        assert {r['conversation_id'] for r in page['results']} == {conversation_id}
+        assert page['next_cursor'] is None
+        assert self.db.search_messages("SITUACAO imposto")['results'][0]['role'] == "user"
+        assert self.db.search_messages("situação abril")['results'] == []
+        assert self.db.search_messages('"(*')['results'] == []
+    
+    def test_search_filters_by_personality(self):
+        """Teste filtro de personalidade na busca"""
+        self.db.save_conversation(self.messages, "assistente_geral")
+        self.db.save_conversation(self.messages, "desenvolvedor")
+        
+        page = self.db.search_messages("ajudar", personality="desenvolvedor")
+        
+        assert [r['personality'] for r in page['results']] == ["desenvolvedor"]
+    
+    def test_search_pagination(self):
+        """Teste paginação da busca por cursor"""
+        for i in range(5):
+            self.db.save_conversation(
+                [{"role": "user", "content": f"pergunta {i} sobre python", "timestamp": f"2024-01-15T10:00:0{i}"}],
+                "desenvolvedor"
+            )
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self.db.search_messages("python", limit=2, cursor=cursor)
+            seen.extend(r['message_id'] for r in page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+    
+    def test_search_index_follows_deletes_and_backfill(self):
+        """Teste sincronização do índice e reindexação de bancos antigos"""
+        conversation_id = self.db.save_conversation(self.messages, "assistente_geral")
+        self.db.delete_conversation(conversation_id)
+        assert self.db.search_messages("ajudar")['results'] == []
+        
+        self.db.save_conversation(self.messages, "assistente_geral")
+        with self.db._connect() as conn:
+            # Simula mensagens gravadas antes de o índice existir
+            conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('delete-all')")
+        assert self.db.search_messages("ajudar")['results'] == []
+        
+        assert self.db.rebuild_search_index() == 2
+        assert len(self.db.search_messages("ajudar")['results']) == 1
+    
+    def test_list_conversations_pagination(self):
+        """Teste paginação da listagem por cursor"""
+        ids = [self.db.save_conversation(self.messages, "professor" if i % 2 else "desenvolvedor")
+               for i in range(7)]
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self.db.list_conversations_page(limit=3, cursor=cursor)
+            seen.extend(c['id'] for c in page['conversations'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert sorted(seen) == sorted(ids)
+        assert len(seen) == 7
+        created = [self.db.load_conversation(i)['created_at'] for i in seen]
+        assert created == sorted(created, reverse=True)
+        
+        first = self.db.list_conversations_page(limit=2, personality="professor")
+        second = self.db.list_conversations_page(limit=2, personality="professor", cursor=first['next_cursor'])
+        assert len(first['conversations']) == 2
+        assert len(second['conversations']) == 1
+        assert second['next_cursor'] is None
+        assert all(c['personality'] == "professor" for c in first['conversations'] + second['conversations'])
+    
+    def test_list_conversations_uses_covering_index(self):
+        """Teste listagem sem ordenação em memória"""
+        for personality in (None, "professor"):
+            query = "SELECT id, personality, start_time, end_time, message_count, created_at FROM conversations"
+            params = []
+            if personality:
+                query += " WHERE personality = ?"
+                params.append(personality)
+            query += " ORDER BY created_at DESC, id DESC LIMIT 10"
+            
+            with self.db._connect() as conn:
+                plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+            
+            assert "COVERING INDEX" in plan
+            assert "TEMP B-TREE" not in plan
+    
+    def test_statistics_follow_inserts_and_deletes(self):
+        """Teste contadores de estatísticas mantidos pelos triggers"""
+        first = self.db.save_conversation(self.messages, "professor")
+        self.db.save_conversation(self.messages, "professor")
+        self.db.append_messages("sessao-1", self.messages[:1], "desenvolvedor")
+        self.db.append_messages("sessao-1", self.messages[1:])
+        
+        stats = self.db.get_statistics()
+        assert stats['total_conversations'] == 3
+        assert stats['total_messages'] == 6
+        assert stats['conversations_by_personality'] == {"professor": 2, "desenvolvedor": 1}
+        
+        self.db.delete_conversation(first)
+        self.db.delete_conversation("sessao-1")
+        
+        stats = self.db.get_statistics()
+        assert stats['total_conversations'] == 1
+        assert stats['total_messages'] == 2
+        assert stats['conversations_by_personality'] == {"professor": 1}
+    
+    def test_rebuild_statistics(self):
+        """Teste recálculo dos contadores"""
+        self.db.save_conversation(self.messages, "professor")
+        with self.db._connect() as conn:
+            conn.execute("UPDATE statistics SET value = 99")
+            conn.execute("DELETE FROM personality_statistics")
+        
+        stats = self.db.rebuild_statistics()
+        
+        assert stats['total_conversations'] == 1
+        assert stats['total_messages'] == 2
+        assert stats['conversations_by_personality'] == {"professor": 1}
+    
+    def test_statistics_counted_for_existing_database(self):
+        """Teste contagem inicial em bancos criados antes dos contadores"""
+        self.db.save_conversation(self.messages, "professor")
+        with self.db._connect() as conn:
+            conn.execute("DROP TABLE statistics")
+            conn.execute("DROP TABLE personality_statistics")
+        
+        reopened = ConversationDB(self.db_path)
+        try:
+            stats = reopened.get_statistics()
+        finally:
+            reopened.close()
+        
+        assert stats['total_conversations'] == 1
+        assert stats['total_messages'] == 2
+    
+    def _age_conversations(self, days: int) -> None:
+        """Move a data de criação de todas as conversas para 'days' dias atrás"""
+        old_date = (datetime.now() - timedelta(days=days)).isoformat()
+        with self.db._connect() as conn:
+            conn.execute("UPDATE conversations SET created_at = ?", (old_date,))
+    
+    def test_cleanup_old_conversations_in_batches(self):
+        """Teste remoção de conversas antigas em lotes, com cascata e vacuum"""
+        long_messages = [
+            {"role": "user", "content": "x" * 2000, "timestamp": "2024-01-15T10:00:00"}
+            for _ in range(5)
+        ]
+        for _ in range(25):
+            self.db.save_conversation(long_messages, "professor")
+        self._age_conversations(45)
+        recent_id = self.db.save_conversation(self.messages, "professor")
+        
+        report = self.db.cleanup_old_conversations(days_old=30, batch_size=10)
+        
+        assert report['conversations'] == 25
+        assert report['messages'] == 125
+        assert report['batches'] == 3
+        assert report['bytes_reclaimed'] > 0
+        
+        stats = self.db.get_statistics()
+        assert stats['total_conversations'] == 1
+        assert stats['total_messages'] == 2
+        assert self.db.load_conversation(recent_id) is not None
+        
+        with self.db._connect() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 2
+    
+    def test_cleanup_handles_any_number_of_days(self):
+        """Teste cálculo da data de corte para qualquer número de dias"""
+        self.db.save_conversation(self.messages, "professor")
+        self._age_conversations(400)
+        
+        assert self.db.cleanup_old_conversations(days_old=365)['conversations'] == 1
+        assert self.db.cleanup_old_conversations(days_old=0)['conversations'] == 0
+    
+    def test_migrates_messages_to_cascade(self):
+        """Teste migração da tabela de mensagens para ON DELETE CASCADE"""
+        legacy_path = os.path.join(self.tmpdir.name, 'legacy_fk.db')
+        with sqlite3.connect(legacy_path) as conn:
+            conn.executescript("""
+                CREATE TABLE conversations (
+                    id TEXT PRIMARY KEY, personality TEXT NOT NULL, start_time TEXT NOT NULL,
+                    end_time TEXT, message_count INTEGER DEFAULT 0,
+                    created_at TEXT NOT NULL, updated_at TEXT NOT NULL
+                );
+                CREATE TABLE messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT NOT NULL,
+                    role TEXT NOT NULL, content TEXT NOT NULL, timestamp TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    FOREIGN KEY (conversation_id) REFERENCES conversations (id)
+                );
+                INSERT INTO conversations VALUES ('antiga', 'professor', 't0', 't1', 2, '2020-01-01', '2020-01-01');
+                INSERT INTO messages (conversation_id, role, content, timestamp, created_at)
+                VALUES ('antiga', 'user', 'Olá', 't0', 'c'), ('antiga', 'assistant', 'Oi', 't1', 'c');
+            """)
+        
+        legacy = ConversationDB(legacy_path)
+        try:
+            assert legacy.get_statistics()['total_messages'] == 2
+            assert len(legacy.search_messages("ola")['results']) == 1
+            assert legacy.delete_conversation('antiga')
+            assert legacy.get_statistics()['total_messages'] == 0
+            with legacy._connect() as conn:
+                assert conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0] == 0
+        finally:
+            legacy.close()
+    
+    def test_write_behind_flush(self):
+        """Teste gravação em segundo plano com flush explícito"""
+        writer = self.db.start_writer(flush_interval_ms=1000, max_batch_rows=1000)
+        
+        for i in range(10):
+            assert self.db.append_messages(f"sessao-{i % 2}", self.messages, "professor") == 2
+        
+        assert self.db.flush(timeout=5)
+        
+        stats = writer.stats()
+        assert stats['appends'] == 10
+        assert stats['rows_written'] == 20
+        assert stats['queue_depth'] == 0
+        assert stats['errors'] == 0
+        # As gravações foram agrupadas em poucas transações
+        assert 1 <= stats['flushes'] < 10
+        assert self.db.load_conversation("sessao-0")['message_count'] == 10
+    
+    def test_write_behind_batches_by_rows(self):
+        """Teste gravação de um lote ao atingir o limite de mensagens"""
+        writer = self.db.start_writer(flush_interval_ms=60000, max_batch_rows=4)
+        
+        self.db.append_messages("sessao", self.messages, "professor")
+        self.db.append_messages("sessao", self.messages, "professor")
+        
+        deadline = time.monotonic() + 5
+        while writer.stats()['rows_written'] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        
+        assert writer.stats()['rows_written'] == 4
+        assert writer.stats()['flushes'] == 1
+    
+    def test_write_behind_close_flushes(self):
+        """Teste que close() grava as mensagens pendentes"""
+        self.db.start_writer(flush_interval_ms=60000, durability="full")
+        self.db.append_messages("sessao", self.messages, "professor")
+        
+        self.db.close()
+        
+        reopened = ConversationDB(self.db_path)
+        try:
+            assert reopened.load_conversation("sessao")['message_count'] == 2
+        finally:
+            reopened.close()
+    
+    def test_write_behind_invalid_durability(self):
+        """Teste modo de durabilidade inválido"""
+        with pytest.raises(ValueError):
+            self.db.start_writer(durability="talvez")
+    
+    def _long_conversation(self, turns: int) -> str:
+        """Grava uma conversa com 'turns' mensagens com timestamps fora de ordem"""
+        messages = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensagem {i}",
+             "timestamp": f"2024-01-15T10:00:{59 - i % 60:02d}"}
+            for i in range(turns)
+        ]
+        return self.db.save_conversation(messages, "professor")
+    
+    def test_iter_messages_in_insertion_order(self):
+        """Teste leitura das mensagens em lotes, na ordem de inserção"""
+        conversation_id = self._long_conversation(25)
+        
+        messages = list(self.db.iter_messages(conversation_id, batch=7))
+        assert [m['content'] for m in messages] == [f"mensagem {i}" for i in range(25)]
+        
+        resumed = list(self.db.iter_messages(conversation_id, after_id=messages[19]['id'], batch=7))
+        assert [m['content'] for m in resumed] == [f"mensagem {i}" for i in range(20, 25)]
+        
+        loaded = self.db.load_conversation(conversation_id)
+        assert [m['content'] for m in loaded['messages']] == [f"mensagem {i}" for i in range(25)]
+    
+    def test_load_tail(self):
+        """Teste carregamento das últimas mensagens"""
+        conversation_id = self._long_conversation(25)
+        
+        tail = self.db.load_tail(conversation_id, 5)
+        assert [m['content'] for m in tail] == [f"mensagem {i}" for i in range(20, 25)]
+        
+        older = self.db.load_tail(conversation_id, 5, before_id=tail[0]['id'])
+        assert [m['content'] for m in older] == [f"mensagem {i}" for i in range(15, 20)]
+        
+        assert self.db.load_tail("inexistente", 5) == []
+    
+    def test_tail_uses_conversation_index(self):
+        """Teste cauda da conversa lida pelo índice (conversation_id, id)"""
+        with self.db._connect() as conn:
+            plan = " ".join(row[3] for row in conn.execute("""
+                EXPLAIN QUERY PLAN
+                SELECT id, role, content, timestamp FROM messages
+                WHERE conversation_id = ? ORDER BY id DESC LIMIT 5
+            """, ("x",)))
+        
+        assert "idx_messages_conversation" in plan
+        assert "TEMP B-TREE" not in plan
+    
+    def _chat_messages(self, count: int) -> list:
+        """Mensagens repetitivas, como as de um chat real"""
+        return [
+            {"role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Olá! Poderia me ajudar com a declaração do imposto de renda de {2000 + i}? "
+                        "Preciso saber quais documentos são necessários para a declaração.",
+             "timestamp": f"2024-01-15T10:{i // 60 % 60:02d}:{i % 60:02d}"}
+            for i in range(count)
+        ]
+    
+    def test_compressed_content_round_trip(self):
+        """Teste gravação comprimida e leitura transparente"""
+        db = ConversationDB(os.path.join(self.tmpdir.name, 'compressed.db'), compression=True)
+        try:
+            messages = self._chat_messages(4)
+            conversation_id = db.save_conversation(messages, "professor")
+            
+            with db._connect() as conn:
+                types = {row[0] for row in conn.execute("SELECT typeof(content) FROM messages")}
+            assert types == {"blob"}
+            
+            loaded = db.load_conversation(conversation_id)
+            assert [m['content'] for m in loaded['messages']] == [m['content'] for m in messages]
+            assert [m['content'] for m in db.load_tail(conversation_id, 2)] == [m['content'] for m in messages[2:]]
+            
+            results = db.search_messages("documentos necessarios")['results']
+            assert len(results) == 4
+            assert "[documentos]" in results[0]['snippet']
+            
+            assert db.delete_conversation(conversation_id)
+            assert db.search_messages("documentos")['results'] == []
+        finally:
+            db.close()
+    
+    def test_enable_compression_on_existing_database(self):
+        """Teste ativação da compressão com dicionário treinado em um banco existente"""
+        conversation_id = self.db.save_conversation(self._chat_messages(200), "professor")
+        self.db.close()
+        
+        self.db = ConversationDB(self.db_path, compression=True)
+        assert len(self.db.search_messages("declaracao", limit=500)['results']) == 200
+        
+        dictionary_id = self.db.train_compression_dictionary(dict_size=4096)
+        report = self.db.recompress_messages(batch_size=64)
+        
+        assert dictionary_id == 1
+        assert report['messages'] == 200
+        assert report['rewritten'] == 200
+        assert report['bytes_after'] < report['bytes_before'] / 3
+        
+        loaded = self.db.load_conversation(conversation_id)
+        assert [m['content'] for m in loaded['messages']] == [m['content'] for m in self._chat_messages(200)]
+        assert len(self.db.search_messages("declaracao", limit=500)['results']) == 200
+        
+        # Outro processo sem compressão continua lendo o conteúdo comprimido
+        reader = ConversationDB(self.db_path)
+        try:
+            assert reader.load_tail(conversation_id, 1)[0]['content'] == self._chat_messages(200)[-1]['content']
+        finally:
+            reader.close()
+    
+    def test_recompress_requires_compression(self):
+        """Teste que a regravação exige a compressão ativa"""
+        with pytest.raises(RuntimeError):
+            self.db.recompress_messages()
@@ -0,0 +1,100 @@
+"""
+Testes para a exportação de conversas em NDJSON
+"""
+
+import gzip
+import io
+import json
+import os
+import tempfile
+from src.cli import main as cli_main
+from src.database import ConversationDB
+from src.export import encode_ndjson, export_ndjson, iter_export_records
+from src.sharding import ShardedConversationDB
+
+def read_records(data: bytes):
+    """Lê os registros de um NDJSON (com ou sem gzip)."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return [json.loads(line) for line in data.decode('utf-8').splitlines()]
+
+class TestExport:
+    """Testes para export_ndjson e iter_export_records"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = ConversationDB(os.path.join(self.tmpdir.name, 'conversations.db'), compression=True)
+        self.first = self.db.save_conversation([
+            {"role": "user", "content": "Olá! \"Aspas\" e\nquebra de linha", "timestamp": "2024-01-15T10:00:00"},
+            {"role": "assistant", "content": "Oi! 🚀", "timestamp": "2024-01-15T10:00:05"}
+        ], "assistente_geral", history_summary="Cumprimentos")
+        self.second = self.db.save_conversation([
+            {"role": "user", "content": "Conte uma piada", "timestamp": "2024-01-16T10:00:00"}
+        ], "humorista")
+    
+    def teardown_method(self):
+        """Limpeza após cada teste"""
+        self.db.close()
+        self.tmpdir.cleanup()
+    
+    def test_records_in_order(self):
+        """Teste cabeçalho, conversas e mensagens na ordem"""
+        records = list(iter_export_records(self.db, batch=1))
+        
+        assert records[0]['type'] == 'export'
+        assert [r['type'] for r in records[1:]] == ['conversation', 'message', 'message', 'conversation', 'message']
+        assert records[1]['id'] == self.first
+        assert records[1]['history_summary'] == "Cumprimentos"
+        assert records[2]['content'] == "Olá! \"Aspas\" e\nquebra de linha"
+        assert records[3]['conversation_id'] == self.first
+    
+    def test_filters(self):
+        """Teste filtros por id, personalidade e data de criação"""
+        def conversations(**filters):
+            return [r['id'] for r in iter_export_records(self.db, **filters) if r['type'] == 'conversation']
+        
+        assert conversations(conversation_ids=[self.second, "inexistente"]) == [self.second]
+        assert conversations(personality="humorista") == [self.second]
+        
+        created = {r['id']: r['created_at'] for r in iter_export_records(self.db) if r['type'] == 'conversation'}
+        assert conversations(created_after=created[self.second]) == [self.second]
+        assert conversations(created_before=created[self.second]) == [self.first]
+    
+    def test_gzip_file_and_stream(self):
+        """Teste arquivo .ndjson.gz e blocos pequenos em arquivo aberto"""
+        path = os.path.join(self.tmpdir.name, 'export.ndjson.gz')
+        report = export_ndjson(self.db, path)
+        
+        assert report['conversations'] == 2
+        assert report['messages'] == 3
+        with open(path, 'rb') as f:
+            records = read_records(f.read())
+        assert records[5]['content'] == "Conte uma piada"
+        
+        buffer = io.BytesIO()
+        export_ndjson(self.db, buffer, personality="assistente_geral")
+        assert [r['type'] for r in read_records(buffer.getvalue())] == ['export', 'conversation', 'message', 'message']
+        
+        blocks = list(encode_ndjson(iter_export_records(self.db), compress=True, chunk_size=16))
+        assert len(blocks) > 1
+        assert read_records(b"".join(blocks))[1:] == records[1:]
+    
+    def test_sharded_and_cli(self):
+        """Teste exportação de banco particionado pela linha de comando"""
+        shard_dir = os.path.join(self.tmpdir.name, 'shards')
+        sharded = ShardedConversationDB(shard_dir, shards=3)
+        ids = [sharded.save_conversation([{"role": "user", "content": f"Mensagem {i}", "timestamp": "2024-01-15T10:00:00"}],
+                                         "assistente_geral") for i in range(5)]
+        sharded.close()
+        
+        path = os.path.join(self.tmpdir.name, 'shards.ndjson')
+        assert cli_main(["--db", shard_dir, "export", path, "--conversation", ids[0], "--conversation", ids[3]]) == 0
+        with open(path, 'rb') as f:
+            records = read_records(f.read())
+        assert sorted(r['id'] for r in records if r['type'] == 'conversation') == sorted([ids[0], ids[3]])
+        
+        gz_path = os.path.join(self.tmpdir.name, 'all.ndjson')
+        assert cli_main(["--db", shard_dir, "export", gz_path, "--gzip"]) == 0
+        with open(gz_path, 'rb') as f:
+            assert sum(r['type'] == 'message' for r in read_records(f.read())) == 5
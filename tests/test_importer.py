@@ -0,0 +1,205 @@
+"""
+Testes para a importação em massa de conversas
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import pytest
+from src.cli import main as cli_main
+from src.database import ConversationDB
+from src.export import export_ndjson
+from src.importer import bulk_import, iter_file_conversations, normalize_conversation
+from src.sharding import ShardedConversationDB
+
+def export_conversation(messages):
+    """Mesmo formato de src.utils.export_conversation (sem depender do Streamlit)."""
+    return json.dumps({
+        "export_info": {"timestamp": "2024-01-15T10:01:00", "total_messages": len(messages), "app_version": "1.0.0"},
+        "conversation": messages
+    }, indent=2, ensure_ascii=False)
+
+class TestBulkImport:
+    """Testes para bulk_import e parse_file"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive = os.path.join(self.tmpdir.name, 'archive')
+        os.makedirs(self.archive)
+        self.db = ConversationDB(os.path.join(self.tmpdir.name, 'conversations.db'))
+        self.messages = [
+            {"role": "user", "content": "Olá!", "timestamp": "2024-01-15T10:00:00"},
+            {"role": "assistant", "content": "Oi! Como posso ajudar?", "timestamp": "2024-01-15T10:00:05"}
+        ]
+    
+    def teardown_method(self):
+        """Limpeza após cada teste"""
+        self.db.close()
+        self.tmpdir.cleanup()
+    
+    def write(self, name, text, compress=False):
+        """Grava um arquivo no diretório do arquivo de conversas."""
+        path = os.path.join(self.archive, name)
+        with (gzip.open(path, 'wt', encoding='utf-8') if compress else open(path, 'w', encoding='utf-8')) as f:
+            f.write(text)
+        return path
+    
+    def test_validation(self):
+        """Teste esquema das conversas"""
+        conversation = normalize_conversation({"messages": self.messages, "personality": "professor"})
+        assert conversation['personality'] == "professor"
+        assert conversation['id'] == normalize_conversation({"messages": self.messages, "personality": "professor"})['id']
+        
+        with pytest.raises(ValueError, match="papel inválido"):
+            normalize_conversation({"messages": [{"role": "robot", "content": "x", "timestamp": "t"}]})
+        with pytest.raises(ValueError, match="sem lista"):
+            normalize_conversation({"messages": []})
+        
+        self.write('bad.json', '{"foo": 1}')
+        self.write('broken.json', '{"conversation": [')
+        for name in ('bad.json', 'broken.json'):
+            [(conversation, error, offset)] = iter_file_conversations(os.path.join(self.archive, name))
+            assert conversation is None and error and offset is None
+    
+    def test_formats_dedupe_and_resume(self):
+        """Teste formatos de exportação, deduplicação e retomada"""
+        self.write('app.json', export_conversation(self.messages))
+        self.write('copy.json.gz', export_conversation(self.messages), compress=True)
+        self.write('list.json', json.dumps([{"role": "user", "content": "Só uma pergunta", "timestamp": "2024-01-16T09:00:00"}]))
+        self.write('chatbot.json', json.dumps({
+            "messages": self.messages + [{"role": "user", "content": "Obrigado"}],
+            "history_summary": "Resumo",
+            "chatbot_config": {"personality": "professor"}
+        }))
+        self.write('invalid.json', '{"conversation": [{"role": "user"}]}')
+        state = os.path.join(self.tmpdir.name, 'import.state')
+        
+        report = bulk_import(self.db, [self.archive], workers=1, batch_size=2, state_path=state)
+        
+        assert report['files'] == 5
+        assert report['conversations'] == 3
+        assert report['duplicates'] == 1
+        assert report['error_count'] == 1
+        stats = self.db.get_statistics()
+        assert stats['total_conversations'] == 3
+        assert stats['conversations_by_personality'] == {"assistente_geral": 2, "professor": 1}
+        assert self.db.search_messages("Obrigado")['results']
+        
+        # Reexecutar pula os arquivos concluídos; um arquivo novo com conteúdo
+        # repetido é ignorado pelo hash
+        self.write('later.json', export_conversation(self.messages))
+        report = bulk_import(self.db, [self.archive], workers=1, state_path=state)
+        assert report['files_skipped'] == 5
+        assert report['files_imported'] == 1
+        assert report['conversations'] == 0
+        assert report['duplicates'] == 1
+    
+    def test_ndjson_roundtrip_into_shards_with_process_pool(self):
+        """Teste exportação NDJSON reimportada em banco particionado, com processos"""
+        ids = [self.db.save_conversation(self.messages[:1] + [{**self.messages[1], "content": f"Resposta {i}"}],
+                                         "humorista", history_summary=f"Resumo {i}") for i in range(5)]
+        export_ndjson(self.db, os.path.join(self.archive, 'backup.ndjson.gz'))
+        
+        sharded = ShardedConversationDB(os.path.join(self.tmpdir.name, 'shards'), shards=3)
+        try:
+            report = bulk_import(sharded, [os.path.join(self.archive, '*.ndjson.gz')], workers=2)
+            assert report['conversations'] == 5
+            assert report['messages'] == 10
+            
+            restored = sharded.load_conversation(ids[2])
+            assert restored['history_summary'] == "Resumo 2"
+            assert [m['content'] for m in restored['messages']] == ["Olá!", "Resposta 2"]
+            
+            # Mesmo conteúdo com outro id (outro shard) também é duplicado
+            again = bulk_import(sharded, [self.archive], workers=1)
+            assert again['duplicates'] == 5
+            assert sharded.get_statistics()['total_conversations'] == 5
+        finally:
+            sharded.close()
+    
+    def test_large_file_batches_and_resume(self):
+        """Teste lotes dentro de um arquivo e retomada pela posição gravada"""
+        for i in range(7):
+            self.db.save_conversation([{**self.messages[0], "content": f"Pergunta {i}"}], "professor")
+        path = os.path.join(self.archive, 'backup.ndjson.gz')
+        export_ndjson(self.db, path)
+        
+        target = ConversationDB(os.path.join(self.tmpdir.name, 'target.db'))
+        state = os.path.join(self.tmpdir.name, 'import.state')
+        
+        def interrupt(report):
+            raise KeyboardInterrupt
+        
+        try:
+            with pytest.raises(KeyboardInterrupt):
+                bulk_import(target, [path], workers=1, batch_size=3, state_path=state, progress=interrupt)
+            assert target.get_statistics()['total_conversations'] == 3
+            with open(state, encoding='utf-8') as f:
+                assert json.loads(f.read())['offset'] > 0
+            
+            report = bulk_import(target, [path], workers=1, batch_size=3, state_path=state)
+            assert report['conversations'] == 4
+            assert report['duplicates'] == 0
+            assert report['files_imported'] == 1
+            assert target.get_statistics()['total_conversations'] == 7
+        finally:
+            target.close()
+        
+        # Reimportar no banco de origem: mesmos ids e conteúdo, sem hash gravado
+        report = bulk_import(self.db, [path], workers=1)
+        assert report['duplicates'] == 7
+        assert report['conflicts'] == 0
+    
+    def test_unreadable_file_retried_on_resume(self):
+        """Teste que um arquivo com erro de leitura não é marcado como concluído"""
+        for i in range(7):
+            self.db.save_conversation([{**self.messages[0], "content": f"Pergunta {i}"}], "professor")
+        path = os.path.join(self.archive, 'backup.ndjson.gz')
+        export_ndjson(self.db, path)
+        # gzip truncado: o fim do arquivo não pode ser lido
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 12)
+        
+        target = ConversationDB(os.path.join(self.tmpdir.name, 'target.db'))
+        state = os.path.join(self.tmpdir.name, 'import.state')
+        try:
+            report = bulk_import(target, [path], workers=1, batch_size=3, state_path=state)
+            assert report['files_failed'] == 1
+            assert report['files_imported'] == 0
+            assert report['error_count'] == 1
+            with open(state, encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f]
+            # Só posições de lotes gravados, nenhuma marca de concluído
+            assert entries and all('offset' in entry for entry in entries)
+            
+            # A próxima execução tenta o arquivo de novo
+            report = bulk_import(target, [path], workers=1, batch_size=3, state_path=state)
+            assert report['files_skipped'] == 0
+            assert report['files_failed'] == 1
+        finally:
+            target.close()
+    
+    def test_id_conflict_reported_separately(self):
+        """Teste id já existente com outro conteúdo"""
+        conversation_id = self.db.save_conversation(self.messages, "assistente_geral")
+        self.write('other.json', json.dumps({"id": conversation_id, "messages": self.messages[:1]}))
+        
+        report = bulk_import(self.db, [self.archive], workers=1)
+        assert report['conflicts'] == 1
+        assert report['duplicates'] == 0
+        assert len(self.db.load_conversation(conversation_id)['messages']) == 2
+    
+    def test_cli(self):
+        """Teste subcomando import"""
+        self.write('app.json', export_conversation(self.messages))
+        db_path = os.path.join(self.tmpdir.name, 'cli.db')
+        
+        assert cli_main(["--db", db_path, "import", self.archive, "--workers", "1"]) == 0
+        db = ConversationDB(db_path)
+        assert db.get_statistics()['total_conversations'] == 1
+        db.close()
+        
+        self.write('bad.json', '{"foo": 1}')
+        assert cli_main(["--db", db_path, "import", self.archive, "--workers", "1"]) == 1
@@ -0,0 +1,117 @@
+"""
+Testes para o limitador de requisições e cota diária
+"""
+
+import os
+import tempfile
+import pytest
+from src.ratelimit import RateLimiter, RateLimitExceeded, get_rate_limiter, rate_limit_key
+
+class FakeClock:
+    """Relógio controlado pelos testes"""
+    
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+class TestRateLimiter:
+    """Testes para a classe RateLimiter"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'data', 'conversations.db')
+        self.clock = FakeClock()
+    
+    def teardown_method(self):
+        """Limpeza após cada teste"""
+        self.tmpdir.cleanup()
+    
+    @pytest.mark.parametrize("persistent", [False, True])
+    def test_token_bucket_refills(self, persistent):
+        """Teste rajada, recusa com tempo de espera e reposição gradual"""
+        limiter = RateLimiter(max_requests=3, window_seconds=60,
+                              db_path=self.db_path if persistent else None, clock=self.clock)
+        
+        for _ in range(3):
+            limiter.acquire("ana")
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.acquire("ana")
+        assert exc_info.value.limit == 'requests'
+        assert exc_info.value.retry_after == pytest.approx(20)
+        
+        # Outra chave não é afetada
+        limiter.acquire("bruno")
+        
+        # Uma requisição a cada 20s
+        self.clock.now += 20
+        limiter.acquire("ana")
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("ana")
+        
+        assert limiter.usage("ana")['requests_available'] == 0
+    
+    def test_daily_quota_and_adjustment(self):
+        """Teste cota diária com reserva, devolução e virada do dia UTC"""
+        limiter = RateLimiter(max_requests=0, tokens_per_day=1000,
+                              db_path=self.db_path, clock=self.clock)
+        
+        limiter.acquire("ana", tokens=600)
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.acquire("ana", tokens=600)
+        assert exc_info.value.limit == 'tokens'
+        assert 0 < exc_info.value.retry_after <= 86400
+        
+        # Uso real menor que o reservado libera a diferença
+        limiter.adjust_tokens("ana", -300)
+        limiter.acquire("ana", tokens=600)
+        assert limiter.usage("ana") == {"requests_available": None, "tokens_today": 900, "tokens_remaining": 100}
+        
+        self.clock.now += exc_info.value.retry_after
+        assert limiter.usage("ana")['tokens_today'] == 0
+        limiter.acquire("ana", tokens=1000)
+    
+    def test_shared_between_processes_through_sqlite(self):
+        """Teste estado compartilhado entre instâncias do mesmo arquivo"""
+        first = RateLimiter(max_requests=2, db_path=self.db_path, clock=self.clock)
+        second = RateLimiter(max_requests=2, db_path=self.db_path, clock=self.clock)
+        
+        first.acquire("ana")
+        second.acquire("ana")
+        with pytest.raises(RateLimitExceeded):
+            first.acquire("ana")
+        
+        second.reset("ana")
+        first.acquire("ana")
+    
+    @pytest.mark.parametrize("persistent", [False, True])
+    def test_prune_idle_keys(self, persistent):
+        """Teste remoção das chaves sem uso há mais de um dia"""
+        limiter = RateLimiter(max_requests=3, tokens_per_day=100,
+                              db_path=self.db_path if persistent else None, clock=self.clock)
+        limiter.acquire("ana", tokens=50)
+        self.clock.now += 3600
+        limiter.acquire("bia", tokens=50)
+        
+        self.clock.now += 86400 - 1800
+        limiter.prune()
+        
+        if persistent:
+            rows = limiter._connect().execute("SELECT key FROM rate_limits").fetchall()
+            assert [row[0] for row in rows] == ["bia"]
+        else:
+            assert list(limiter._states) == ["bia"]
+    
+    def test_config_helpers(self):
+        """Teste chave do limite e limitador desativado sem configuração"""
+        assert rate_limit_key({'openai_api_key': 'sk-123'}).startswith("api:")
+        assert 'sk-123' not in rate_limit_key({'openai_api_key': 'sk-123'})
+        assert rate_limit_key({'openai_api_key': 'sk-123', 'rate_limit_key': 'ana'}) == "user:ana"
+        
+        limiter = get_rate_limiter({'database_path': self.db_path})
+        assert not limiter.enabled
+        assert limiter.db_path is None
+        for _ in range(100):
+            limiter.acquire("ana", tokens=10 ** 9)
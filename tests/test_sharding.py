@@ -0,0 +1,112 @@
+"""
+Testes para o banco particionado ShardedConversationDB
+"""
+
+import os
+import tempfile
+import pytest
+from src.database import ConversationDB
+from src.sharding import ShardedConversationDB, reshard, shard_for
+
+class TestShardedConversationDB:
+    """Testes para a classe ShardedConversationDB"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.shard_dir = os.path.join(self.tmpdir.name, 'shards')
+        self.db = ShardedConversationDB(self.shard_dir, shards=4)
+        self.messages = [
+            {"role": "user", "content": "Olá! Preciso de ajuda com a declaração.", "timestamp": "2024-01-15T10:00:00"},
+            {"role": "assistant", "content": "Claro! Como posso ajudar?", "timestamp": "2024-01-15T10:00:05"}
+        ]
+    
+    def teardown_method(self):
+        """Limpeza após cada teste"""
+        self.db.close()
+        self.tmpdir.cleanup()
+    
+    def test_conversations_spread_across_shards(self):
+        """Teste distribuição das conversas entre os arquivos"""
+        ids = [self.db.save_conversation(self.messages, "professor") for _ in range(40)]
+        
+        used = {shard_for(conversation_id, 4) for conversation_id in ids}
+        assert len(used) > 1
+        
+        for conversation_id in ids[:5]:
+            conversation = self.db.load_conversation(conversation_id)
+            assert conversation['message_count'] == 2
+            assert self.db.shard(conversation_id).load_conversation(conversation_id) is not None
+        
+        assert shard_for("conversa-fixa", 4) == shard_for("conversa-fixa", 4)
+    
+    def test_statistics_and_listing_merge_shards(self):
+        """Teste estatísticas e listagem combinadas de todos os shards"""
+        for i in range(9):
+            self.db.save_conversation(self.messages, "professor" if i % 3 else "desenvolvedor")
+        
+        stats = self.db.get_statistics()
+        assert stats['total_conversations'] == 9
+        assert stats['total_messages'] == 18
+        assert stats['conversations_by_personality'] == {"professor": 6, "desenvolvedor": 3}
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self.db.list_conversations_page(limit=4, cursor=cursor)
+            seen.extend((c['created_at'], c['id']) for c in page['conversations'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert len(seen) == 9
+        assert seen == sorted(seen, reverse=True)
+        assert len(self.db.list_conversations(limit=5, personality="desenvolvedor")) == 3
+    
+    def test_search_pages_across_shards(self):
+        """Teste busca paginada em todos os shards"""
+        for _ in range(7):
+            self.db.save_conversation(self.messages, "professor")
+        
+        seen = []
+        cursor = None
+        while True:
+            page = self.db.search_messages("declaracao", limit=3, cursor=cursor)
+            seen.extend((r['shard'], r['message_id']) for r in page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+    
+    def test_shard_count_mismatch(self):
+        """Teste abertura com número de shards diferente do registrado"""
+        with pytest.raises(ValueError):
+            ShardedConversationDB(self.shard_dir, shards=8)
+    
+    def test_reshard_single_file(self):
+        """Teste redistribuição de um banco de arquivo único"""
+        source_path = os.path.join(self.tmpdir.name, 'conversations.db')
+        source = ConversationDB(source_path)
+        ids = [source.save_conversation(self.messages, "professor", history_summary=f"resumo {i}")
+               for i in range(12)]
+        original = source.load_conversation(ids[0])
+        source.close()
+        
+        target_dir = os.path.join(self.tmpdir.name, 'resharded')
+        copied = reshard(source_path, target_dir, shards=3, batch_size=5)
+        
+        assert copied == {"conversations": 12, "messages": 24}
+        
+        target = ShardedConversationDB(target_dir)
+        try:
+            assert target.shard_count == 3
+            assert target.get_statistics()['total_messages'] == 24
+            assert target.load_conversation(ids[0]) == original
+            assert len(target.search_messages("ajudar", limit=50)['results']) == 12
+        finally:
+            target.close()
+        
+        with pytest.raises(ValueError):
+            reshard(source_path, target_dir, shards=2)
@@ -0,0 +1,65 @@
+"""
+Testes para a contagem de tokens
+"""
+
+import logging
+
+import src.tokens as tokens
+from src.tokens import TokenCounter, heuristic_count
+
+class TestTokenCounter:
+    """Testes para a classe TokenCounter"""
+    
+    def setup_method(self):
+        """Setup para cada teste"""
+        self.counter = TokenCounter(cache_size=3, use_tokenizer=False)
+    
+    def test_heuristic_handles_accents_code_and_emoji(self):
+        """Teste heurística em português, código e emoji"""
+        assert heuristic_count("") == 0
+        assert heuristic_count("Hello world, how are you?") == 7
+        assert heuristic_count("1234567") == 3
+        
+        # Acentos e emoji custam mais que len(text) // 4
+        portuguese = "Olá! Você poderia me ajudar com a declaração do imposto?"
+        assert heuristic_count(portuguese) > len(portuguese) // 4
+        assert heuristic_count("🚀🎉") >= 2
+        assert heuristic_count("def foo(x):\n    return x**2 + 1") > len("def foo(x):") // 4
+    
+    def test_cache_by_content(self):
+        """Teste cache LRU das contagens"""
+        assert self.counter.count("Olá, tudo bem?") == self.counter.count("Olá, tudo bem?")
+        
+        stats = self.counter.stats()
+        assert stats['backend'] == "heuristic"
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        
+        for text in ("a b", "c d", "e f"):
+            self.counter.count(text)
+        assert self.counter.stats()['entries'] == 3
+    
+    def test_count_batch(self):
+        """Teste contagem em lote com textos repetidos e vazios"""
+        texts = ["Bom dia!", "", "Como vai você?", "Bom dia!"]
+        
+        counts = self.counter.count_batch(texts)
+        
+        assert counts == [heuristic_count(text) for text in texts]
+        assert counts[1] == 0
+        # O texto repetido foi contado uma única vez
+        assert self.counter.stats()['misses'] == 2
+    
+    def test_fallback_warns_once(self, monkeypatch, caplog):
+        """Teste aviso único ao usar a heurística sem o tiktoken"""
+        monkeypatch.setattr(tokens, "tiktoken", None)
+        monkeypatch.setattr(tokens, "_fallback_warned", False)
+        
+        with caplog.at_level(logging.WARNING, logger="src.tokens"):
+            assert TokenCounter().backend == "heuristic"
+            TokenCounter()
+            TokenCounter(use_tokenizer=False)
+        
+        warnings = [r for r in caplog.records if r.name == "src.tokens"]
+        assert len(warnings) == 1
+        assert "tiktoken" in warnings[0].getMessage()